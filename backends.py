@@ -0,0 +1,310 @@
+import requests
+import tracing
+from abc import ABC, abstractmethod
+from cache import CATEGORY, LINK, LEGACY, LRUCache, TieredPageCache
+from dumps import LinkGraph
+from fetcher import AsyncFetcher, RateLimiter
+from landmarks import LandmarkTable
+from filters import excluded, is_allowed
+from mediawiki import MediaWikiClient, PageRecord, normalize_title
+from typing import Dict, Iterable, List, Optional
+
+class GraphBackend(ABC):
+    """Where path search reads the page graph from.
+
+    Subclasses provide a page's raw links, categories, backlinks and summary; the game's
+    filtering of meta pages is applied on top by `neighbours` and `reverse_neighbours`,
+    so every backend yields the same edges.
+    """
+
+    @abstractmethod
+    def links(self, title: str) -> List[str]:
+        """Article links on `title`, unfiltered."""
+
+    @abstractmethod
+    def categories(self, title: str) -> List[str]:
+        """Categories of `title`, without their namespace, unfiltered."""
+
+    @abstractmethod
+    def summary(self, title: str) -> str:
+        """Text describing `title`, used to rank candidates against it as a goal."""
+
+    def edges(self, title: str, hard_mode: bool = False) -> List[str]:
+        """Everything the search may follow out of `title` before filtering."""
+        if hard_mode:
+            return self.links(title)
+        return self.links(title) + self.categories(title)
+
+    def neighbours(self, title: str, hard_mode: bool = False) -> List[str]:
+        """Pages one hop from `title`: links, plus thematic categories outside hard mode."""
+        return [link for link in self.edges(title, hard_mode) if link != title and is_allowed(link, hard_mode)]
+
+    @abstractmethod
+    def backlinks(self, title: str, hard_mode: bool = False) -> List[str]:
+        """Pages linking to `title` (or, outside hard mode, in the category `title`), unfiltered."""
+
+    def reverse_neighbours(self, title: str, hard_mode: bool = False) -> List[str]:
+        """Pages one hop before `title`: those whose neighbours include it."""
+        if not is_allowed(title, hard_mode):
+            return []
+        # Meta pages are never entered going forwards, so they never come before a page either
+        sources = [source for source in self.backlinks(title, hard_mode) if is_allowed(source, hard_mode)]
+        return [source for source in dict.fromkeys(sources) if source != title]
+
+    def has_edge(self, source: str, dest: str, hard_mode: bool = False) -> bool:
+        return dest in self.neighbours(source, hard_mode)
+
+    def verify_path(self, path: List[str], hard_mode: bool = False) -> bool:
+        """Whether every hop of `path` is an edge the search may follow in this mode."""
+        return all(self.has_edge(source, dest, hard_mode) for source, dest in zip(path, path[1:]))
+
+    def landmarks(self, hard_mode: bool = False) -> Optional[LandmarkTable]:
+        """Precomputed landmark distances over this backend's pages, if there are any."""
+        return None
+
+    def prefetch(self, titles: Iterable[str]):
+        """Hint that `titles` are about to be expanded. Backends without I/O ignore it."""
+
+    def prefetch_backlinks(self, titles: Iterable[str]):
+        """Hint that `titles` are about to be expanded backwards."""
+
+class DictBackend(GraphBackend):
+    """A fixed graph held in memory, as `{title: {"links": [...], "categories": [...], "summary": "..."}}`."""
+
+    def __init__(self, pages: Dict[str, Dict]):
+        self.pages = pages
+        self._reverse: Dict[bool, Dict[str, List[str]]] = {}
+
+    def links(self, title: str) -> List[str]:
+        return list(self.pages.get(title, {}).get("links", []))
+
+    def categories(self, title: str) -> List[str]:
+        return list(self.pages.get(title, {}).get("categories", []))
+
+    def summary(self, title: str) -> str:
+        return self.pages.get(title, {}).get("summary", "")
+
+    def backlinks(self, title: str, hard_mode: bool = False) -> List[str]:
+        if hard_mode not in self._reverse:
+            reverse: Dict[str, List[str]] = {}
+            for source in self.pages:
+                for dest in self.edges(source, hard_mode):
+                    reverse.setdefault(dest, []).append(source)
+            self._reverse[hard_mode] = reverse
+        return list(self._reverse[hard_mode].get(title, []))
+
+class ApiBackend(GraphBackend):
+    """Pages straight from the MediaWiki API, with recently fetched ones kept in memory.
+
+    Titles the API does not know are dead ends: no links, categories or summary.
+    Backlinks come from `prop=linkshere`, which lists linking articles but not category members.
+    With `limiter`, every request waits for a slot from it, e.g. the host's shared limiter.
+    """
+
+    def __init__(self, client: MediaWikiClient, cache_size: int = 256, limiter: Optional[RateLimiter] = None):
+        self.client = client
+        self.limiter = limiter
+        self.records = LRUCache(cache_size)
+        self.linkshere = LRUCache(cache_size)
+
+    def record(self, title: str) -> Optional[PageRecord]:
+        record = self.records.get(title)
+        if record is None:
+            record = self.fetch_pages([title]).get(title)
+            if record is not None:
+                self.records.put(title, record)
+        return record
+
+    def fetch_pages(self, titles: List[str]) -> Dict[str, Optional[PageRecord]]:
+        """Records for `titles`, None for pages that do not exist. Empty if the request failed."""
+        with tracing.phase("network"):
+            if self.limiter is not None:
+                self.limiter.wait()
+            try:
+                return self.client.fetch_pages(titles)
+            except requests.RequestException:
+                return {}
+
+    def links(self, title: str) -> List[str]:
+        record = self.record(title)
+        return list(record.links) if record else []
+
+    def categories(self, title: str) -> List[str]:
+        record = self.record(title)
+        return list(record.categories) if record else []
+
+    def summary(self, title: str) -> str:
+        record = self.record(title)
+        return record.summary if record else ""
+
+    def backlinks(self, title: str, hard_mode: bool = False) -> List[str]:
+        sources = self.linkshere.get(title)
+        if sources is None:
+            self.prefetch_backlinks([title])
+            sources = self.linkshere.get(title, [])
+        return list(sources)
+
+    def fetch_backlinks(self, titles: List[str]) -> Dict[str, Optional[List[str]]]:
+        with tracing.phase("network"):
+            if self.limiter is not None:
+                self.limiter.wait()
+            try:
+                return self.client.fetch_backlinks(titles)
+            except requests.RequestException:
+                return {}
+
+    def prefetch(self, titles: Iterable[str]):
+        missing = [title for title in dict.fromkeys(titles) if title not in self.records]
+        for title, record in (self.fetch_pages(missing) if missing else {}).items():
+            if record is not None:
+                self.records.put(title, record)
+
+    def prefetch_backlinks(self, titles: Iterable[str]):
+        missing = [title for title in dict.fromkeys(titles) if title not in self.linkshere]
+        for title, sources in (self.fetch_backlinks(missing) if missing else {}).items():
+            self.linkshere.put(title, sources or [])
+
+class CacheBackend(GraphBackend):
+    """Pages read from the SQLite page cache, filled from the API on a miss.
+
+    Backlinks are read from the reverse index over every cached edge, after the page's
+    `linkshere` list has been added to it once. Fills go through `fetcher` and
+    `backlink_fetcher`, whose batch functions are expected to write into `store`, or else
+    through `source`. Pages the API does not have are stored with no edges, so a red link is
+    asked about once, until the revalidator evicts it as stale.
+    Neighbours are read pre-filtered, using the filter flags the cache stores with each page.
+    Hard mode is a view over the same rows: link edges only, excluding only meta pages.
+    """
+
+    def __init__(self, store: TieredPageCache, source: ApiBackend, fetcher: Optional[AsyncFetcher] = None, backlink_fetcher: Optional[AsyncFetcher] = None):
+        self.store = store
+        self.source = source
+        self.fetcher = fetcher
+        self.backlink_fetcher = backlink_fetcher
+
+    def _cached(self, title: str, kinds, exclude: int = 0) -> List[str]:
+        # Pages are stored under their normalized title, the key fetches are shared by
+        title = normalize_title(title)
+        links = self.store.get_links(title, kinds, exclude)
+
+        # Fetch through the shared in-flight table, so a page that another search (or a
+        # prefetch) is already loading is joined rather than requested twice
+        if links is None and self.fetcher is not None:
+            with tracing.phase("network"):
+                self.fetcher.fetch([title])
+        elif links is None:
+            records = self.source.fetch_pages([title])
+            # A failed fetch stores nothing, so the next search asks again
+            if title in records:
+                record = records[title]
+                if record is None:
+                    self.store.put(title, [], [])
+                else:
+                    self.store.put(title, record.links, record.categories, record.revid)
+        if links is None:
+            links = self.store.get_links(title, kinds, exclude) or []
+        return links
+
+    def links(self, title: str) -> List[str]:
+        return self._cached(title, (LINK,))
+
+    def categories(self, title: str) -> List[str]:
+        return self._cached(title, (CATEGORY,))
+
+    def summary(self, title: str) -> str:
+        return self.source.summary(title)
+
+    def edges(self, title: str, hard_mode: bool = False) -> List[str]:
+        return self._cached(title, (LINK,) if hard_mode else (LINK, CATEGORY, LEGACY))
+
+    def neighbours(self, title: str, hard_mode: bool = False) -> List[str]:
+        links = self._cached(title, (LINK,) if hard_mode else (LINK, CATEGORY, LEGACY), excluded(hard_mode))
+        return [link for link in links if link != title]
+
+    def _backlinks(self, title: str, hard_mode: bool, exclude: int = 0) -> List[str]:
+        title = normalize_title(title)
+        if not self.store.has_backlinks(title) and self.backlink_fetcher is not None:
+            with tracing.phase("network"):
+                self.backlink_fetcher.fetch([title])
+        if not self.store.has_backlinks(title):
+            backlinks = self.source.fetch_backlinks([title])
+            # A failed fetch stores nothing, so the next search asks again
+            if title in backlinks:
+                self.store.put_backlinks(title, backlinks[title] or [])
+        return self.store.get_backlinks(title, (LINK,) if hard_mode else (LINK, CATEGORY, LEGACY), exclude)
+
+    def backlinks(self, title: str, hard_mode: bool = False) -> List[str]:
+        return self._backlinks(title, hard_mode)
+
+    def reverse_neighbours(self, title: str, hard_mode: bool = False) -> List[str]:
+        if not is_allowed(title, hard_mode):
+            return []
+        sources = self._backlinks(title, hard_mode, excluded(hard_mode))
+        return [source for source in dict.fromkeys(sources) if source != title]
+
+    def verify_path(self, path: List[str], hard_mode: bool = False) -> bool:
+        # Load every page on the path that is not cached yet in one batch, then check the hops against stored edges
+        missing = [title for title in dict.fromkeys(map(normalize_title, path[:-1])) if not self.store.is_cached(title)]
+        if missing and self.fetcher is not None:
+            with tracing.phase("network"):
+                self.fetcher.fetch(missing)
+        return super().verify_path(path, hard_mode)
+
+    def prefetch(self, titles: Iterable[str]):
+        missing = [title for title in dict.fromkeys(map(normalize_title, titles)) if not self.store.is_cached(title)]
+        if missing and self.fetcher is not None:
+            self.fetcher.prefetch(missing)
+
+    def prefetch_backlinks(self, titles: Iterable[str]):
+        missing = [title for title in dict.fromkeys(map(normalize_title, titles)) if not self.store.has_backlinks(title)]
+        if missing and self.backlink_fetcher is not None:
+            self.backlink_fetcher.prefetch(missing)
+
+class LinkGraphBackend(GraphBackend):
+    """Pages from an offline link graph built by dumps.py. Pages outside it go to `fallback`, if any.
+
+    Dumps carry no summaries, so without a fallback a page's title stands in for its summary.
+    Landmark tables built for the graph by landmarks.py are loaded along with it.
+    """
+
+    def __init__(self, graph: LinkGraph, fallback: Optional[GraphBackend] = None):
+        self.graph = graph
+        self.fallback = fallback
+        self.landmark_tables = {hard_mode: LandmarkTable.load(graph, hard_mode) for hard_mode in (False, True)}
+
+    def _neighbours(self, title: str, kinds) -> List[str]:
+        if title in self.graph:
+            return self.graph.neighbours(title, kinds)
+        if self.fallback is not None:
+            return self.fallback.links(title) if kinds == (LINK,) else self.fallback.categories(title)
+        return []
+
+    def links(self, title: str) -> List[str]:
+        return self._neighbours(title, (LINK,))
+
+    def categories(self, title: str) -> List[str]:
+        return self._neighbours(title, (CATEGORY,))
+
+    def summary(self, title: str) -> str:
+        return self.fallback.summary(title) if self.fallback is not None else title
+
+    def edges(self, title: str, hard_mode: bool = False) -> List[str]:
+        if title in self.graph:
+            return self.graph.neighbours(title, (LINK,) if hard_mode else (LINK, CATEGORY))
+        return self.fallback.edges(title, hard_mode) if self.fallback is not None else []
+
+    def backlinks(self, title: str, hard_mode: bool = False) -> List[str]:
+        if title in self.graph:
+            return self.graph.reverse_neighbours(title, (LINK,) if hard_mode else (LINK, CATEGORY))
+        return self.fallback.backlinks(title, hard_mode) if self.fallback is not None else []
+
+    def landmarks(self, hard_mode: bool = False) -> Optional[LandmarkTable]:
+        return self.landmark_tables[hard_mode]
+
+    def prefetch(self, titles: Iterable[str]):
+        if self.fallback is not None:
+            self.fallback.prefetch(title for title in titles if title not in self.graph)
+
+    def prefetch_backlinks(self, titles: Iterable[str]):
+        if self.fallback is not None:
+            self.fallback.prefetch_backlinks(title for title in titles if title not in self.graph)
@@ -0,0 +1,287 @@
+import argparse
+import embeddings
+import json
+import numpy as np
+import random
+import sys
+import tempfile
+import threading
+import time
+import tracing
+from backends import DictBackend, GraphBackend
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from main import path_length
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+from wiki import find_short_path, search_trees, verify_path
+
+SHAPES = ("small_world", "hubs")
+
+# Pages per community: neighbouring pages share a topic, so ranking by similarity has something to go on
+COMMUNITY_SIZE = 50
+
+class SyntheticPage(NamedTuple):
+    """Stands in for a wikipedia page: the search only reads the title and summary."""
+    title: str
+    summary: str
+
+def _title(node: int, community: int) -> str:
+    return f"n{node} c{community}"
+
+def generate_graph(nodes: int, degree: int = 8, shape: str = "small_world", seed: int = 0, rewire: float = 0.1, reciprocity: float = 0.5) -> Dict[str, Dict]:
+    """A directed link graph in DictBackend's format, the same for the same arguments.
+
+    "small_world" is a ring where each page links to the `degree` pages nearest it, with a
+    `rewire` fraction of links sent anywhere instead (Watts-Strogatz): short paths, local clusters.
+    "hubs" adds pages one at a time, each linking to `degree` earlier pages picked in proportion
+    to the links they already have, and linked back by each with probability `reciprocity`
+    (Price's model): a few pages with very many links, most with few.
+    """
+    if shape not in SHAPES:
+        raise ValueError(f"Unknown graph shape {shape!r}, expected one of {SHAPES}")
+    rng = random.Random(seed)
+    links: List[List[int]] = [[] for _ in range(nodes)]
+    if shape == "small_world":
+        half = max(degree // 2, 1)
+        for node in range(nodes):
+            for offset in range(1, half + 1):
+                for dest in ((node + offset) % nodes, (node - offset) % nodes):
+                    links[node].append(rng.randrange(nodes) if rng.random() < rewire else dest)
+        communities = [node * max(nodes // COMMUNITY_SIZE, 1) // nodes for node in range(nodes)]
+    else:
+        seed_size = min(degree + 1, nodes)
+        for node in range(seed_size):
+            links[node] = [dest for dest in range(seed_size) if dest != node]
+        # Every link's destination, once per link, so a uniform draw picks pages by in-degree
+        targets = [dest for node in range(seed_size) for dest in links[node]] + list(range(seed_size))
+        for node in range(seed_size, nodes):
+            chosen = set()
+            while len(chosen) < min(degree, node):
+                chosen.add(rng.choice(targets))
+            for dest in chosen:
+                links[node].append(dest)
+                if rng.random() < reciprocity:
+                    links[dest].append(node)
+                    targets.append(node)
+            targets.extend(chosen)
+            targets.append(node)
+        communities = [node % max(nodes // COMMUNITY_SIZE, 1) for node in range(nodes)]
+
+    titles = [_title(node, community) for node, community in enumerate(communities)]
+    pages = {}
+    for node, title in enumerate(titles):
+        community = communities[node]
+        pages[title] = {
+            "links": [titles[dest] for dest in dict.fromkeys(links[node]) if dest != node],
+            "categories": [],
+            "summary": f"c{max(community - 1, 0)} c{community} c{community} c{community + 1}",
+        }
+    return pages
+
+def community_vectors(pages: Dict[str, Dict], dim: int = 16, seed: int = 0) -> Dict[str, np.ndarray]:
+    """Word vectors for the community tokens in `pages`, where nearby communities get nearby vectors."""
+    count = 1 + max(int(title.rsplit("c", 1)[1]) for title in pages)
+    rng = np.random.default_rng(seed)
+    walk = np.cumsum(rng.normal(size=(count + 1, dim)), axis=0).astype(np.float32)
+    return {f"c{community}": walk[community] for community in range(count + 1)}
+
+def sample_pairs(pages: Dict[str, Dict], count: int, seed: int = 0, per_start: int = 1) -> List[Tuple[str, str]]:
+    """`count` fixed (start, target) pairs of distinct pages, `per_start` in a row from each start page."""
+    rng = random.Random(seed)
+    titles = sorted(pages)
+    pairs = []
+    while len(pairs) < count:
+        start = rng.choice(titles)
+        targets = rng.sample([title for title in titles if title != start], min(per_start, count - len(pairs)))
+        pairs.extend((start, target) for target in targets)
+    return pairs
+
+class LatencyBackend(GraphBackend):
+    """Serves another backend's pages as if each fetch went over the network.
+
+    The first read of a page's links (or its backlinks) sleeps `latency` seconds; later reads
+    are free, as with a warm cache. Prefetches load their pages in the background as one
+    request per batch, like the batched API. `reset` forgets everything loaded, so every
+    query can start cold. `fetches` counts pages loaded and `requests` round trips.
+    """
+
+    def __init__(self, graph: GraphBackend, latency: float = 0.02, workers: int = 8):
+        self.graph = graph
+        self.latency = latency
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="benchmark-fetch")
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._loaded: Dict[Tuple[str, str], threading.Event] = {}
+            self.fetches = 0
+            self.requests = 0
+
+    def _load(self, kind: str, titles: Iterable[str]):
+        """Wait until `titles` are loaded, fetching the ones nobody has asked for yet as one request."""
+        with self._lock:
+            mine, others = [], []
+            for title in dict.fromkeys(titles):
+                event = self._loaded.get((kind, title))
+                if event is None:
+                    event = self._loaded[(kind, title)] = threading.Event()
+                    mine.append(event)
+                else:
+                    others.append(event)
+            if mine:
+                self.fetches += len(mine)
+                self.requests += 1
+        with tracing.phase("network"):
+            if mine:
+                time.sleep(self.latency)
+                for event in mine:
+                    event.set()
+            for event in others:
+                event.wait()
+
+    def links(self, title: str) -> List[str]:
+        self._load("page", [title])
+        return self.graph.links(title)
+
+    def categories(self, title: str) -> List[str]:
+        self._load("page", [title])
+        return self.graph.categories(title)
+
+    def summary(self, title: str) -> str:
+        self._load("page", [title])
+        return self.graph.summary(title)
+
+    def backlinks(self, title: str, hard_mode: bool = False) -> List[str]:
+        self._load("backlinks", [title])
+        return self.graph.backlinks(title, hard_mode)
+
+    def verify_path(self, path: List[str], hard_mode: bool = False) -> bool:
+        # Like the page cache, load the path's pages in one batch before checking its hops
+        self._load("page", path[:-1])
+        return super().verify_path(path, hard_mode)
+
+    def prefetch(self, titles: Iterable[str]):
+        self.pool.submit(self._load, "page", list(titles))
+
+    def prefetch_backlinks(self, titles: Iterable[str]):
+        self.pool.submit(self._load, "backlinks", list(titles))
+
+def _percentile(values: List[float], q: float) -> Optional[float]:
+    return round(float(np.percentile(values, q)), 6) if values else None
+
+def _mean(values: List[float]) -> Optional[float]:
+    return round(sum(values) / len(values), 4) if values else None
+
+@contextmanager
+def synthetic_embeddings(pages: Dict[str, Dict], seed: int = 0):
+    """Rank with fixed community vectors, kept in a throwaway store, for the duration of the block."""
+    previous = embeddings.vectorizer, embeddings.embedding_store
+    with tempfile.TemporaryDirectory() as store_path:
+        embeddings.set_vectorizer(embeddings.StaticVectorizer(community_vectors(pages, seed=seed), name="benchmark"), store_path)
+        try:
+            yield
+        finally:
+            embeddings.vectorizer, embeddings.embedding_store = previous
+
+def run_benchmark(pages: Dict[str, Dict], pairs: List[Tuple[str, str]], latency: float = 0.02, hard_mode: bool = False, warm: bool = False, resume: bool = True) -> Dict[str, Any]:
+    """Run `find_short_path` over each pair against `pages` behind simulated latency.
+
+    Each query starts with nothing loaded unless `warm`, and without `resume` also with no
+    exploration kept from earlier searches. Returns per-query results and a summary.
+    """
+    graph = DictBackend(pages)
+    network = LatencyBackend(graph, latency)
+    queries, traces = [], []
+    try:
+        for start, target in pairs:
+            if not warm:
+                network.reset()
+            if not resume:
+                search_trees.clear()
+            fetches, requests = network.fetches, network.requests
+            trace = tracing.Trace(start, target, hard_mode)
+            began = time.perf_counter()
+            path = find_short_path(SyntheticPage(start, pages[start]["summary"]), SyntheticPage(target, pages[target]["summary"]), hard_mode, network, trace=trace)
+            seconds = time.perf_counter() - began
+            traces.append(trace)
+            queries.append({
+                "start": start,
+                "target": target,
+                "seconds": round(seconds, 6),
+                "reason": trace.reason,
+                "fetches": network.fetches - fetches,
+                "requests": network.requests - requests,
+                "expansions": trace.summary()["expansions"],
+                "path_length": path_length(path),
+                "valid": verify_path(path, start, target, hard_mode, graph),
+            })
+    finally:
+        network.pool.shutdown(wait=True)
+
+    seconds = [query["seconds"] for query in queries]
+    valid = [query for query in queries if query["valid"]]
+    summary = {
+        "queries": len(queries),
+        "found": sum(1 for query in queries if query["reason"] == "found"),
+        "valid": len(valid),
+        "valid_ratio": round(len(valid) / len(queries), 4) if queries else None,
+        "p50_seconds": _percentile(seconds, 50),
+        "p95_seconds": _percentile(seconds, 95),
+        "mean_seconds": _mean(seconds),
+        "mean_fetches": _mean([query["fetches"] for query in queries]),
+        "mean_requests": _mean([query["requests"] for query in queries]),
+        "mean_path_length": _mean([query["path_length"] for query in valid]),
+        "phases": tracing.summarize(traces)["phases"],
+    }
+    return {"summary": summary, "queries": queries}
+
+def regressions(report: Dict[str, Any], baseline: Dict[str, Any], tolerance: float = 0.2) -> List[str]:
+    """Ways `report` is worse than `baseline`: slower or more fetches beyond `tolerance`, or fewer valid paths."""
+    problems = []
+    current, before = report["summary"], baseline["summary"]
+    for key in ("p50_seconds", "p95_seconds", "mean_fetches"):
+        if current[key] is not None and before[key] and current[key] > before[key] * (1 + tolerance):
+            problems.append(f"{key} rose from {before[key]} to {current[key]}")
+    if (current["valid_ratio"] or 0) < (before["valid_ratio"] or 0):
+        problems.append(f"valid_ratio fell from {before['valid_ratio']} to {current['valid_ratio']}")
+    return problems
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark path finding on synthetic link graphs, without the network.")
+    parser.add_argument("--nodes", type=int, default=2000, help="pages in the graph")
+    parser.add_argument("--degree", type=int, default=8, help="links per page")
+    parser.add_argument("--shape", choices=SHAPES, default="small_world")
+    parser.add_argument("--pairs", type=int, default=50, help="start/target pairs to search")
+    parser.add_argument("--per-start", type=int, default=1, help="targets searched in a row from each start page")
+    parser.add_argument("--latency", type=float, default=0.02, help="simulated seconds per request")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--hard", action="store_true", help="search in hard mode")
+    parser.add_argument("--warm", action="store_true", help="keep pages loaded between queries")
+    parser.add_argument("--no-resume", dest="resume", action="store_false", help="start every search from scratch")
+    parser.add_argument("--out", help="write the JSON report here instead of stdout")
+    parser.add_argument("--baseline", help="an earlier report; exit 1 if this run is worse")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="slowdown allowed against the baseline")
+    args = parser.parse_args()
+
+    pages = generate_graph(args.nodes, args.degree, args.shape, args.seed)
+    with synthetic_embeddings(pages, args.seed):
+        report = run_benchmark(pages, sample_pairs(pages, args.pairs, args.seed, args.per_start), args.latency, args.hard, args.warm, args.resume)
+    report["config"] = {key: value for key, value in vars(args).items() if key not in ("out", "baseline", "tolerance")}
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            problems = regressions(report, json.load(f), args.tolerance)
+        for problem in problems:
+            print(f"Regression: {problem}", file=sys.stderr)
+        if problems:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,824 @@
+import json
+import queue
+import sqlite3
+import threading
+import time
+import tracing
+import weakref
+from collections import OrderedDict
+import filters
+from dataclasses import dataclass, field
+from mediawiki import normalize_title
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+# Edge kinds. LEGACY edges come from the old JSON blob, which mixed links and categories together.
+LINK = 0
+CATEGORY = 1
+LEGACY = 2
+
+def _create_schema(conn: sqlite3.Connection):
+    # One statement at a time: executescript would commit the migration's transaction first
+    conn.execute(
+        """CREATE TABLE pages (
+            id INTEGER PRIMARY KEY,
+            title TEXT NOT NULL,
+            fetched INTEGER NOT NULL DEFAULT 0
+        )"""
+    )
+    conn.execute("CREATE UNIQUE INDEX pages_title ON pages (title)")
+    conn.execute(
+        """CREATE TABLE edges (
+            src_id INTEGER NOT NULL REFERENCES pages (id),
+            dst_id INTEGER NOT NULL REFERENCES pages (id),
+            kind INTEGER NOT NULL
+        )"""
+    )
+    conn.execute("CREATE UNIQUE INDEX edges_forward ON edges (src_id, kind, dst_id)")
+    conn.execute("CREATE INDEX edges_reverse ON edges (dst_id, kind, src_id)")
+
+def _migrate_legacy(conn: sqlite3.Connection):
+    """Move rows from the old `pages (name, links)` table into the normalized tables."""
+    conn.execute("ALTER TABLE pages RENAME TO legacy_pages")
+    _create_schema(conn)
+    for name, links in conn.execute("SELECT name, links FROM legacy_pages").fetchall():
+        try:
+            titles = [title for title in json.loads(links) if isinstance(title, str)]
+        except (TypeError, ValueError):
+            continue
+        # Plain SQL against the first schema: the write helpers below follow the latest one.
+        # Flags for these pages are filled in by refresh_flags once every migration has run
+        conn.executemany("INSERT OR IGNORE INTO pages (title) VALUES (?)", [(name,)] + [(title,) for title in titles])
+        conn.execute("UPDATE pages SET fetched = 1 WHERE title = ?", (name,))
+        conn.executemany(
+            "INSERT OR IGNORE INTO edges (src_id, dst_id, kind) SELECT src.id, dst.id, ? FROM pages src, pages dst WHERE src.title = ? AND dst.title = ?",
+            [(LEGACY, name, title) for title in titles],
+        )
+    conn.execute("DROP TABLE legacy_pages")
+
+def _add_freshness(conn: sqlite3.Connection):
+    """Record when each page was fetched and at which revision, so entries can expire."""
+    conn.execute("ALTER TABLE pages ADD COLUMN fetched_at REAL")
+    conn.execute("ALTER TABLE pages ADD COLUMN revid INTEGER")
+
+def _add_backlinks(conn: sqlite3.Connection):
+    """Record when each page's full list of backlinks was fetched."""
+    conn.execute("ALTER TABLE pages ADD COLUMN backlinks_at REAL")
+
+def _add_words(conn: sqlite3.Connection):
+    """Remember which page each dictionary word resolves to; a NULL title means none does."""
+    conn.execute("CREATE TABLE words (word TEXT PRIMARY KEY, title TEXT, resolved_at REAL NOT NULL)")
+
+def _add_titles(conn: sqlite3.Connection):
+    """Remember what each requested name resolved to, including names that found no page."""
+    conn.execute("CREATE TABLE titles (name TEXT PRIMARY KEY, folded TEXT NOT NULL, title TEXT, resolved_at REAL NOT NULL)")
+    conn.execute("CREATE INDEX titles_folded ON titles (folded)")
+
+def _add_flags(conn: sqlite3.Connection):
+    """Store each page's filter flags (see filters.py), so reads can skip filtered edges in SQL."""
+    conn.execute("ALTER TABLE pages ADD COLUMN flags INTEGER NOT NULL DEFAULT 0")
+    conn.execute("CREATE TABLE settings (key TEXT PRIMARY KEY, value TEXT)")
+
+def _add_results(conn: sqlite3.Connection):
+    """Remember verified search results, so a (start, target, mode) searched before is answered at once."""
+    conn.execute(
+        """CREATE TABLE results (
+            start TEXT NOT NULL,
+            target TEXT NOT NULL,
+            hard_mode INTEGER NOT NULL,
+            path TEXT NOT NULL,
+            found_at REAL NOT NULL,
+            PRIMARY KEY (start, target, hard_mode)
+        )"""
+    )
+
+def _create_or_convert(conn: sqlite3.Connection):
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(pages)")]
+    if columns == ["name", "links"]:
+        _migrate_legacy(conn)
+    elif not columns:
+        _create_schema(conn)
+
+# Each step upgrades the schema by one version, recorded in PRAGMA user_version
+MIGRATIONS = [_create_or_convert, _add_freshness, _add_backlinks, _add_words, _add_titles, _add_flags, _add_results]
+SCHEMA_VERSION = len(MIGRATIONS)
+
+def migrate(conn: sqlite3.Connection):
+    """Bring a page cache up to the current schema, converting old JSON-blob caches in place.
+
+    Each step commits together with its version bump, or not at all.
+    """
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    for step in range(version, SCHEMA_VERSION):
+        # sqlite3 only opens transactions before data changes, so DDL would otherwise autocommit
+        conn.execute("BEGIN")
+        try:
+            MIGRATIONS[step](conn)
+            conn.execute(f"PRAGMA user_version = {step + 1}")
+        except BaseException:
+            conn.rollback()
+            raise
+        conn.commit()
+
+def refresh_flags(conn: sqlite3.Connection):
+    """Recompute every page's filter flags if they were stored under other filter rules.
+
+    Stored results are dropped too: other rules may rule out pages on their paths.
+    """
+    row = conn.execute("SELECT value FROM settings WHERE key = 'filter_rules'").fetchone()
+    if row and row[0] == filters.engine.version:
+        return
+    with conn:
+        rows = conn.execute("SELECT id, title FROM pages").fetchall()
+        conn.executemany("UPDATE pages SET flags = ? WHERE id = ?", [(filters.flags(title), page_id) for page_id, title in rows])
+        conn.execute("DELETE FROM results")
+        conn.execute("INSERT OR REPLACE INTO settings (key, value) VALUES ('filter_rules', ?)", (filters.engine.version,))
+
+def connect(path: str = "pages.db") -> sqlite3.Connection:
+    """Open the page cache at `path`, migrating it to the current schema if needed."""
+    conn = sqlite3.connect(path)
+    migrate(conn)
+    refresh_flags(conn)
+    return conn
+
+def _page_id(conn: sqlite3.Connection, title: str, fetched: bool = False) -> int:
+    # An upsert rather than INSERT OR REPLACE: the row keeps its id, and so every edge pointing at it
+    conn.execute(
+        "INSERT INTO pages (title, fetched, flags) VALUES (?, ?, ?) ON CONFLICT (title) DO UPDATE SET fetched = MAX(fetched, excluded.fetched)",
+        (title, int(fetched), filters.flags(title)),
+    )
+    return conn.execute("SELECT id FROM pages WHERE title = ?", (title,)).fetchone()[0]
+
+def _page_ids(conn: sqlite3.Connection, titles: List[str]) -> Dict[str, int]:
+    conn.executemany("INSERT OR IGNORE INTO pages (title, flags) VALUES (?, ?)", [(title, filters.flags(title)) for title in titles])
+    ids = {}
+    # Stay well under SQLite's limit on bound parameters
+    for i in range(0, len(titles), 500):
+        chunk = titles[i:i + 500]
+        placeholders = ",".join("?" * len(chunk))
+        ids.update(conn.execute(f"SELECT title, id FROM pages WHERE title IN ({placeholders})", chunk).fetchall())
+    return ids
+
+def _insert_edges(conn: sqlite3.Connection, src_id: int, titles: List[str], kind: int):
+    ids = _page_ids(conn, titles)
+    conn.executemany(
+        "INSERT OR IGNORE INTO edges (src_id, dst_id, kind) VALUES (?, ?, ?)",
+        [(src_id, ids[title], kind) for title in titles],
+    )
+
+def is_cached(conn: sqlite3.Connection, title: str) -> bool:
+    """True if the page's own links have been fetched, not just seen as someone else's link."""
+    row = conn.execute("SELECT fetched FROM pages WHERE title = ?", (title,)).fetchone()
+    return bool(row and row[0])
+
+@dataclass
+class CachedPage:
+    """A cached page's outgoing edges by kind, and when (and at which revision) it was fetched.
+
+    `flags` holds each linked title's filter flags, worked out once when the page is stored.
+    """
+    edges: Dict[int, List[str]]
+    fetched_at: Optional[float] = None
+    revid: Optional[int] = None
+    flags: Dict[str, int] = field(default_factory=dict)
+
+    def answers(self, kinds: Sequence[int]) -> bool:
+        """False for pages from the old cache asked for links or categories alone: it mixed the two."""
+        return LEGACY in kinds or not self.edges.get(LEGACY)
+
+    def links(self, kinds: Sequence[int] = (LINK, CATEGORY, LEGACY), exclude: int = 0) -> List[str]:
+        """Edges of the given kinds, leaving out titles flagged with any reason in `exclude`."""
+        titles = [title for kind in (LINK, CATEGORY, LEGACY) if kind in kinds for title in self.edges.get(kind, [])]
+        if exclude:
+            titles = [title for title in titles if not self.flags.get(title, 0) & exclude]
+        return titles
+
+    def is_stale(self, ttl: float, now: Optional[float] = None) -> bool:
+        # Pages migrated from the old cache have no fetch time and are always stale
+        return self.fetched_at is None or (now or time.time()) - self.fetched_at > ttl
+
+def _write_page(conn: sqlite3.Connection, title: str, page: CachedPage):
+    """Insert or update a page in place. Concurrent writers of one title leave one row, the last write winning."""
+    conn.execute(
+        """INSERT INTO pages (title, fetched, fetched_at, revid, flags) VALUES (?, 1, ?, ?, ?)
+           ON CONFLICT (title) DO UPDATE SET fetched = 1, fetched_at = excluded.fetched_at, revid = excluded.revid""",
+        (title, page.fetched_at, page.revid, filters.flags(title)),
+    )
+    page_id = conn.execute("SELECT id FROM pages WHERE title = ?", (title,)).fetchone()[0]
+    conn.execute("DELETE FROM edges WHERE src_id = ?", (page_id,))
+    _insert_edges(conn, page_id, page.edges.get(LINK, []), LINK)
+    _insert_edges(conn, page_id, page.edges.get(CATEGORY, []), CATEGORY)
+
+def store_page(conn: sqlite3.Connection, title: str, links: List[str], categories: List[str], revid: Optional[int] = None, fetched_at: Optional[float] = None):
+    """Record a fetched page's links and categories as separate edge kinds."""
+    with conn:
+        _write_page(conn, title, _new_page(links, categories, revid, fetched_at))
+
+def touch_page(conn: sqlite3.Connection, title: str, revid: Optional[int], fetched_at: Optional[float] = None):
+    """Mark a cached page as fresh without rewriting its edges."""
+    with conn:
+        conn.execute("UPDATE pages SET fetched_at = ?, revid = ? WHERE title = ?", (fetched_at or time.time(), revid, title))
+
+def evict_page(conn: sqlite3.Connection, title: str):
+    """Forget a page's own edges and freshness, as if it had never been fetched.
+
+    The row stays, since other pages' edges may still point at it.
+    """
+    with conn:
+        row = conn.execute("SELECT id FROM pages WHERE title = ?", (title,)).fetchone()
+        if row is None:
+            return
+        conn.execute("DELETE FROM edges WHERE src_id = ?", (row[0],))
+        conn.execute("UPDATE pages SET fetched = 0, fetched_at = NULL, revid = NULL WHERE id = ?", (row[0],))
+
+def _new_page(links: List[str], categories: List[str], revid: Optional[int], fetched_at: Optional[float]) -> CachedPage:
+    flags = {title: filters.flags(title) for title in [*links, *categories]}
+    return CachedPage({LINK: list(links), CATEGORY: list(categories), LEGACY: []}, fetched_at or time.time(), revid, {title: mask for title, mask in flags.items() if mask})
+
+def get_links(conn: sqlite3.Connection, title: str, kinds: Sequence[int] = (LINK, CATEGORY, LEGACY), exclude: int = 0) -> Optional[List[str]]:
+    """Outgoing edges of the given kinds, in stored order, or None if the page is not cached
+    (or only in the old format, when LEGACY is not among `kinds`).
+
+    Targets whose stored filter flags include any reason in `exclude` are left out.
+    """
+    if not is_cached(conn, title):
+        return None
+    if LEGACY not in kinds and conn.execute(
+        "SELECT 1 FROM pages JOIN edges ON edges.src_id = pages.id WHERE pages.title = ? AND edges.kind = ? LIMIT 1", (title, LEGACY)
+    ).fetchone():
+        return None
+    placeholders = ",".join("?" * len(kinds))
+    rows = conn.execute(
+        f"""SELECT dst.title FROM pages src
+            JOIN edges ON edges.src_id = src.id
+            JOIN pages dst ON dst.id = edges.dst_id
+            WHERE src.title = ? AND edges.kind IN ({placeholders}) AND dst.flags & ? = 0
+            ORDER BY edges.rowid""",
+        (title, *kinds, exclude),
+    ).fetchall()
+    return [row[0] for row in rows]
+
+def get_backlinks(conn: sqlite3.Connection, title: str, kinds: Sequence[int] = (LINK, CATEGORY, LEGACY), exclude: int = 0) -> List[str]:
+    """Pages with a stored edge of the given kinds to `title`, read from the reverse index.
+
+    Sources whose stored filter flags include any reason in `exclude` are left out.
+    """
+    placeholders = ",".join("?" * len(kinds))
+    rows = conn.execute(
+        f"""SELECT DISTINCT src.title FROM pages dst
+            JOIN edges ON edges.dst_id = dst.id
+            JOIN pages src ON src.id = edges.src_id
+            WHERE dst.title = ? AND edges.kind IN ({placeholders}) AND src.flags & ? = 0
+            ORDER BY src.id""",
+        (title, *kinds, exclude),
+    ).fetchall()
+    return [row[0] for row in rows]
+
+def has_backlinks(conn: sqlite3.Connection, title: str) -> bool:
+    """True if the pages linking to `title` have been fetched into the reverse index,
+    up to the fetch's limit per page."""
+    row = conn.execute("SELECT backlinks_at FROM pages WHERE title = ?", (title,)).fetchone()
+    return bool(row and row[0] is not None)
+
+def store_backlinks(conn: sqlite3.Connection, title: str, sources: List[str], fetched_at: Optional[float] = None):
+    """Record that each of `sources` links to `title`.
+
+    The edges join the sources' forward edges, which are replaced wholesale once a
+    source page itself is fetched.
+    """
+    with conn:
+        dst_id = _page_id(conn, title)
+        ids = _page_ids(conn, sources)
+        conn.executemany(
+            "INSERT OR IGNORE INTO edges (src_id, dst_id, kind) VALUES (?, ?, ?)",
+            [(ids[source], dst_id, LINK) for source in sources],
+        )
+        conn.execute("UPDATE pages SET backlinks_at = ? WHERE id = ?", (fetched_at or time.time(), dst_id))
+
+def get_words(conn: sqlite3.Connection) -> Dict[str, Optional[str]]:
+    """Every resolved word and the title it resolved to (None when it has no page)."""
+    return dict(conn.execute("SELECT word, title FROM words").fetchall())
+
+def store_words(conn: sqlite3.Connection, titles: Dict[str, Optional[str]], resolved_at: Optional[float] = None):
+    resolved_at = resolved_at or time.time()
+    with conn:
+        conn.executemany(
+            "INSERT INTO words (word, title, resolved_at) VALUES (?, ?, ?) ON CONFLICT (word) DO UPDATE SET title = excluded.title, resolved_at = excluded.resolved_at",
+            [(word, title, resolved_at) for word, title in titles.items()],
+        )
+
+def get_title(conn: sqlite3.Connection, name: str) -> Optional[Tuple[Optional[str], float]]:
+    """What `name` resolved to and when: a title, or None if it found no page. None if never resolved.
+
+    Names match after MediaWiki's normalization, then ignoring case, so "river bank" and
+    "RIVER BANK" both find an earlier "River_bank". Only found titles match ignoring case.
+    """
+    name = normalize_title(name)
+    row = conn.execute("SELECT title, resolved_at FROM titles WHERE name = ?", (name,)).fetchone()
+    if row is None:
+        row = conn.execute(
+            "SELECT title, resolved_at FROM titles WHERE folded = ? AND title IS NOT NULL ORDER BY resolved_at DESC LIMIT 1",
+            (name.casefold(),),
+        ).fetchone()
+    return row
+
+def store_title(conn: sqlite3.Connection, name: str, title: Optional[str], resolved_at: Optional[float] = None):
+    """Record that `name` resolves to `title` (None: no page). A found title also resolves to itself."""
+    resolved_at = resolved_at or time.time()
+    names = dict.fromkeys([normalize_title(name)] + ([title] if title is not None else []))
+    with conn:
+        conn.executemany(
+            "INSERT INTO titles (name, folded, title, resolved_at) VALUES (?, ?, ?, ?) ON CONFLICT (name) DO UPDATE SET title = excluded.title, resolved_at = excluded.resolved_at",
+            [(key, key.casefold(), title, resolved_at) for key in names],
+        )
+
+def get_result(conn: sqlite3.Connection, start: str, target: str, hard_mode: bool = False) -> Optional[Tuple[List[str], float]]:
+    """The verified path stored for this search and when it was found, or None."""
+    row = conn.execute("SELECT path, found_at FROM results WHERE start = ? AND target = ? AND hard_mode = ?", (start, target, int(hard_mode))).fetchone()
+    return (json.loads(row[0]), row[1]) if row else None
+
+def store_result(conn: sqlite3.Connection, start: str, target: str, hard_mode: bool, path: List[str], found_at: Optional[float] = None):
+    """Record a path whose every hop has been checked against stored edges."""
+    with conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO results (start, target, hard_mode, path, found_at) VALUES (?, ?, ?, ?, ?)",
+            (start, target, int(hard_mode), json.dumps(path), found_at or time.time()),
+        )
+
+def get_page(conn: sqlite3.Connection, title: str) -> Optional[CachedPage]:
+    """A page's edges grouped by kind along with its freshness, or None if the page is not cached."""
+    row = conn.execute("SELECT fetched, fetched_at, revid FROM pages WHERE title = ?", (title,)).fetchone()
+    if not row or not row[0]:
+        return None
+    page = CachedPage({LINK: [], CATEGORY: [], LEGACY: []}, row[1], row[2])
+    rows = conn.execute(
+        """SELECT edges.kind, dst.title, dst.flags FROM pages src
+           JOIN edges ON edges.src_id = src.id
+           JOIN pages dst ON dst.id = edges.dst_id
+           WHERE src.title = ?
+           ORDER BY edges.rowid""",
+        (title,),
+    ).fetchall()
+    for kind, dst, flags in rows:
+        page.edges[kind].append(dst)
+        if flags:
+            page.flags[dst] = flags
+    return page
+
+class _ConnectionOwner:
+    """Kept in a thread's locals so the thread's connection can be closed once they are dropped."""
+
+class PageStore:
+    """The page cache as a shared object: one reusable connection per thread, and batched writes.
+
+    The database runs in WAL mode, so readers on other threads never wait for the writer.
+    Writes are held in memory (and served from there) until `flush_size` pages are pending
+    or `flush_interval` seconds have passed, then committed in a single transaction. One
+    flusher thread, started with the first write, commits them on the interval.
+    The database is opened on first use, not on construction, and a thread's connection is
+    closed when the thread exits.
+    """
+
+    def __init__(self, path: str = "pages.db", flush_size: int = 50, flush_interval: float = 1.0):
+        self.path = path
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._pending: Dict[str, CachedPage] = {}
+        # Pages being committed right now; still served from memory until the commit lands
+        self._flushing: Dict[str, CachedPage] = {}
+        self._lock = threading.Lock()
+        # Wakes the flusher when the first page of a batch arrives, or the store closes
+        self._wake = threading.Condition(self._lock)
+        self._due = 0.0
+        self._flusher: Optional[threading.Thread] = None
+        self._closed = False
+
+    def connection(self) -> sqlite3.Connection:
+        """This thread's connection, opened and migrated on first use."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # Only this thread uses it, but close() may run on another one
+            conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("PRAGMA synchronous = NORMAL")
+            migrate(conn)
+            refresh_flags(conn)
+            self._local.conn = conn
+            # Thread-local values are dropped when their thread exits, and the connection with them
+            self._local.owner = _ConnectionOwner()
+            weakref.finalize(self._local.owner, self._release, conn)
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    def _release(self, conn: sqlite3.Connection):
+        with self._lock:
+            if conn not in self._connections:
+                return
+            self._connections.remove(conn)
+        conn.close()
+
+    def _unflushed(self, title: str) -> Optional[CachedPage]:
+        with self._lock:
+            return self._pending.get(title) or self._flushing.get(title)
+
+    def is_cached(self, title: str) -> bool:
+        return self._unflushed(title) is not None or is_cached(self.connection(), title)
+
+    def get(self, title: str) -> Optional[CachedPage]:
+        return self._unflushed(title) or get_page(self.connection(), title)
+
+    def get_links(self, title: str, kinds: Sequence[int] = (LINK, CATEGORY, LEGACY), exclude: int = 0) -> Optional[List[str]]:
+        page = self._unflushed(title)
+        if page is not None:
+            return page.links(kinds, exclude)
+        return get_links(self.connection(), title, kinds, exclude)
+
+    def get_backlinks(self, title: str, kinds: Sequence[int] = (LINK, CATEGORY, LEGACY), exclude: int = 0) -> List[str]:
+        """Pages known to link to `title`, including pages whose writes are still pending."""
+        with self._lock:
+            unflushed = {**self._flushing, **self._pending}
+        # An unflushed page replaces whatever edges the database still holds for it
+        sources = [source for source in get_backlinks(self.connection(), title, kinds, exclude) if source not in unflushed]
+        sources.extend(source for source, page in unflushed.items() if title in page.links(kinds) and not filters.flags(source) & exclude)
+        return sources
+
+    def has_backlinks(self, title: str) -> bool:
+        return has_backlinks(self.connection(), title)
+
+    def put_backlinks(self, title: str, sources: List[str], fetched_at: Optional[float] = None):
+        store_backlinks(self.connection(), title, sources, fetched_at)
+
+    def get_words(self) -> Dict[str, Optional[str]]:
+        return get_words(self.connection())
+
+    def put_words(self, titles: Dict[str, Optional[str]], resolved_at: Optional[float] = None):
+        store_words(self.connection(), titles, resolved_at)
+
+    def get_title(self, name: str) -> Optional[Tuple[Optional[str], float]]:
+        return get_title(self.connection(), name)
+
+    def put_title(self, name: str, title: Optional[str], resolved_at: Optional[float] = None):
+        store_title(self.connection(), name, title, resolved_at)
+
+    def get_result(self, start: str, target: str, hard_mode: bool = False) -> Optional[Tuple[List[str], float]]:
+        return get_result(self.connection(), start, target, hard_mode)
+
+    def put_result(self, start: str, target: str, hard_mode: bool, path: List[str], found_at: Optional[float] = None):
+        store_result(self.connection(), start, target, hard_mode, path, found_at)
+
+    def put(self, title: str, links: List[str], categories: List[str], revid: Optional[int] = None, fetched_at: Optional[float] = None) -> CachedPage:
+        """Queue a page for writing; it is readable from the store straight away."""
+        page = _new_page(links, categories, revid, fetched_at)
+        with self._lock:
+            if not self._pending:
+                self._due = time.monotonic() + self.flush_interval
+                self._wake.notify()
+            self._pending[title] = page
+            full = len(self._pending) >= self.flush_size
+            if self._flusher is None and not self._closed:
+                self._flusher = threading.Thread(target=self._flush_when_due, name="page-store-flusher", daemon=True)
+                self._flusher.start()
+        if full:
+            self.flush()
+        return page
+
+    def _flush_when_due(self):
+        """The flusher thread: commit pending pages once the first of them has waited `flush_interval` seconds."""
+        while True:
+            with self._lock:
+                while not self._closed and (not self._pending or time.monotonic() < self._due):
+                    self._wake.wait(self._due - time.monotonic() if self._pending else None)
+                if self._closed:
+                    return
+            try:
+                self.flush()
+            except sqlite3.Error:
+                # Only that batch is lost; later writes still get flushed
+                continue
+
+    def touch(self, title: str, revid: Optional[int], fetched_at: Optional[float] = None):
+        """Mark a page as fresh without rewriting its edges."""
+        fetched_at = fetched_at or time.time()
+        with self._lock:
+            page = self._pending.get(title) or self._flushing.get(title)
+            if page is not None:
+                page.fetched_at, page.revid = fetched_at, revid
+        touch_page(self.connection(), title, revid, fetched_at)
+
+    def evict(self, title: str):
+        """Drop a page, including any write of it still pending."""
+        with self._lock:
+            self._pending.pop(title, None)
+            self._flushing.pop(title, None)
+        evict_page(self.connection(), title)
+
+    def flush(self):
+        """Commit every pending page in one transaction."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._flushing.update(pending)
+        if not pending:
+            return
+        conn = self.connection()
+        try:
+            with conn:
+                for title, page in pending.items():
+                    _write_page(conn, title, page)
+        finally:
+            with self._lock:
+                for title, entry in pending.items():
+                    if self._flushing.get(title) is entry:
+                        del self._flushing[title]
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            self._wake.notify()
+            flusher, self._flusher = self._flusher, None
+        if flusher is not None and flusher is not threading.current_thread():
+            flusher.join()
+        self.flush()
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            conn.close()
+
+class LRUCache:
+    """A thread-safe least-recently-used cache bounded by a size budget.
+
+    `sizeof` measures each value against `max_size`; by default every entry counts as 1.
+    """
+
+    def __init__(self, max_size: int, sizeof: Callable[[Any], int] = lambda value: 1):
+        self.max_size = max_size
+        self.sizeof = sizeof
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[Any, Tuple[Any, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key) -> bool:
+        return key in self._entries
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value):
+        size = self.sizeof(value)
+        with self._lock:
+            if key in self._entries:
+                self.size -= self._entries.pop(key)[1]
+            if size > self.max_size:
+                return
+            self._entries[key] = (value, size)
+            self.size += size
+            self._shrink()
+
+    def setdefault(self, key, value):
+        """The value cached under `key`, or `value` after caching it, in one step."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+            size = self.sizeof(value)
+            if size <= self.max_size:
+                self._entries[key] = (value, size)
+                self.size += size
+                self._shrink()
+            return value
+
+    def resize(self, key):
+        """Measure the value under `key` again, after it has grown or shrunk in place."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return
+            value, old = entry
+            size = self.sizeof(value)
+            self._entries[key] = (value, size)
+            self.size += size - old
+            self._shrink()
+
+    def _shrink(self):
+        while self.size > self.max_size:
+            _, (_, evicted) = self._entries.popitem(last=False)
+            self.size -= evicted
+            self.evictions += 1
+
+    def discard(self, key):
+        with self._lock:
+            if key in self._entries:
+                self.size -= self._entries.pop(key)[1]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions, "entries": len(self._entries), "size": self.size}
+
+def _page_size(page: CachedPage) -> int:
+    """Rough bytes held by a cached page: list slots plus the strings themselves, and its flag entries."""
+    return 320 + sum(56 + 8 * len(titles) + sum(49 + len(title) for title in titles) for titles in page.edges.values()) + 100 * len(page.flags)
+
+class TieredPageCache:
+    """A memory tier of parsed pages in front of a PageStore.
+
+    Repeat lookups of hot pages are answered from an LRU bounded by `memory_budget`
+    bytes; misses fall through to SQLite and are promoted into memory.
+
+    With a `ttl`, pages older than `ttl` seconds are still returned straight away, but
+    are also handed to `on_stale` so they can be refreshed in the background.
+    """
+
+    def __init__(self, store: PageStore, memory_budget: int = 64 * 1024 * 1024, ttl: Optional[float] = None, on_stale: Optional[Callable[[str], None]] = None):
+        self.store = store
+        self.memory = LRUCache(memory_budget, sizeof=_page_size)
+        self.ttl = ttl
+        self.on_stale = on_stale
+
+    def get(self, title: str) -> Optional[CachedPage]:
+        page = self.memory.get(title)
+        if page is not None:
+            tracing.count("cache_memory_hits")
+            return page
+        page = self.store.get(title)
+        if page is not None:
+            tracing.count("cache_disk_hits")
+            self.memory.put(title, page)
+        else:
+            tracing.count("cache_misses")
+        return page
+
+    def get_links(self, title: str, kinds: Sequence[int] = (LINK, CATEGORY, LEGACY), exclude: int = 0) -> Optional[List[str]]:
+        with tracing.phase("cache"):
+            page = self.get(title)
+        if page is None:
+            return None
+        if self.ttl is not None and self.on_stale is not None and page.is_stale(self.ttl):
+            self.on_stale(title)
+        return page.links(kinds, exclude) if page.answers(kinds) else None
+
+    def is_cached(self, title: str) -> bool:
+        return title in self.memory or self.store.is_cached(title)
+
+    def get_backlinks(self, title: str, kinds: Sequence[int] = (LINK, CATEGORY, LEGACY), exclude: int = 0) -> List[str]:
+        with tracing.phase("cache"):
+            return self.store.get_backlinks(title, kinds, exclude)
+
+    def has_backlinks(self, title: str) -> bool:
+        with tracing.phase("cache"):
+            return self.store.has_backlinks(title)
+
+    def put_backlinks(self, title: str, sources: List[str], fetched_at: Optional[float] = None):
+        self.store.put_backlinks(title, sources, fetched_at)
+
+    def get_words(self) -> Dict[str, Optional[str]]:
+        return self.store.get_words()
+
+    def put_words(self, titles: Dict[str, Optional[str]], resolved_at: Optional[float] = None):
+        self.store.put_words(titles, resolved_at)
+
+    def get_title(self, name: str) -> Optional[Tuple[Optional[str], float]]:
+        return self.store.get_title(name)
+
+    def put_title(self, name: str, title: Optional[str], resolved_at: Optional[float] = None):
+        self.store.put_title(name, title, resolved_at)
+
+    def get_result(self, start: str, target: str, hard_mode: bool = False) -> Optional[Tuple[List[str], float]]:
+        return self.store.get_result(start, target, hard_mode)
+
+    def put_result(self, start: str, target: str, hard_mode: bool, path: List[str], found_at: Optional[float] = None):
+        self.store.put_result(start, target, hard_mode, path, found_at)
+
+    def put(self, title: str, links: List[str], categories: List[str], revid: Optional[int] = None, fetched_at: Optional[float] = None):
+        self.memory.put(title, self.store.put(title, links, categories, revid, fetched_at))
+
+    def touch(self, title: str, revid: Optional[int], fetched_at: Optional[float] = None):
+        self.store.touch(title, revid, fetched_at)
+        self.memory.discard(title)
+
+    def evict(self, title: str):
+        self.store.evict(title)
+        self.memory.discard(title)
+
+    def flush(self):
+        self.store.flush()
+
+    def close(self):
+        self.store.close()
+
+    def stats(self) -> Dict[str, int]:
+        return self.memory.stats()
+
+class Revalidator:
+    """Refreshes stale pages on a background thread (stale-while-revalidate).
+
+    Stale titles are checked in batches against their latest revision id first, so pages
+    that have not changed are only re-stamped; just the changed ones are downloaded again.
+    Pages the API no longer has are evicted. After a failed batch, its titles are not
+    queued again for `retry_after` seconds.
+    """
+
+    def __init__(self, cache: TieredPageCache, fetch_revisions: Callable[[List[str]], Dict[str, Optional[int]]], fetch_pages: Callable[[List[str]], Dict[str, Any]], batch_size: int = 50, retry_after: float = 300.0):
+        self.cache = cache
+        self.fetch_revisions = fetch_revisions
+        self.fetch_pages = fetch_pages
+        self.batch_size = batch_size
+        self.retry_after = retry_after
+        self.refreshed = 0
+        self.revalidated = 0
+        self.evicted = 0
+        # When each title from a failed batch may be queued again
+        self._failed: Dict[str, float] = {}
+        self._queue: "queue.Queue[str]" = queue.Queue()
+        self._queued = set()
+        self._lock = threading.Lock()
+        self._worker: Optional[threading.Thread] = None
+
+    def submit(self, title: str):
+        """Queue a stale title for refresh; titles already queued are ignored."""
+        with self._lock:
+            if title in self._queued:
+                return
+            if title in self._failed:
+                if time.monotonic() < self._failed[title]:
+                    return
+                del self._failed[title]
+            self._queued.add(title)
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name="page-revalidator", daemon=True)
+                self._worker.start()
+        self._queue.put(title)
+
+    def join(self):
+        """Wait until every queued title has been processed."""
+        self._queue.join()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self.revalidate(batch)
+            except Exception:
+                # Keep serving the stale copy, and give the API a rest before asking again
+                retry_at = time.monotonic() + self.retry_after
+                with self._lock:
+                    self._failed.update(dict.fromkeys(batch, retry_at))
+            finally:
+                with self._lock:
+                    self._queued.difference_update(batch)
+                for _ in batch:
+                    self._queue.task_done()
+
+    def revalidate(self, titles: List[str]):
+        """Re-stamp unchanged pages, re-download changed ones and evict missing ones."""
+        revisions = self.fetch_revisions(titles)
+        changed = []
+        for title in titles:
+            page = self.cache.get(title)
+            revid = revisions.get(title)
+            if revid is None:
+                self._evict(title)
+            elif page is not None and revid == page.revid:
+                self.cache.touch(title, revid)
+                self.revalidated += 1
+            else:
+                changed.append(title)
+        if not changed:
+            return
+        records = self.fetch_pages(changed)
+        for title in changed:
+            record = records.get(title)
+            if record is None:
+                self._evict(title)
+            else:
+                self.cache.put(title, record.links, record.categories, record.revid)
+                self.refreshed += 1
+
+    def _evict(self, title: str):
+        self.cache.evict(title)
+        self.evicted += 1
@@ -1,3 +1,4 @@
+# Builds dictionary.txt ahead of time; the game never runs it, so nltk is not in requirements.txt
 import nltk
 
 # Download the brown corpus (only needed once)
@@ -0,0 +1,236 @@
+import argparse
+import gzip
+import json
+import os
+import re
+import numpy as np
+from array import array
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+from cache import CATEGORY, LINK
+
+# Values inside one `INSERT INTO ... VALUES (...),(...);` line of a MediaWiki SQL dump
+_TOKEN = re.compile(r"""\(|\)|'((?:[^'\\]|\\.)*)'|(NULL)|([-+0-9.eE]+)""")
+_ESCAPE = re.compile(r"\\(.)")
+_ESCAPES = {"0": "\0", "b": "\b", "n": "\n", "r": "\r", "t": "\t", "Z": "\x1a"}
+
+ARTICLE_NAMESPACE = 0
+
+def _open(path: str):
+    opener = gzip.open if path.endswith(".gz") else open
+    return opener(path, "rt", encoding="utf-8", errors="replace")
+
+def iter_rows(path: str, table: str) -> Iterator[Tuple]:
+    """Stream the rows of `table` from a SQL dump without loading the file into memory."""
+    prefix = f"INSERT INTO `{table}` VALUES "
+    with _open(path) as f:
+        for line in f:
+            if not line.startswith(prefix):
+                continue
+            row: Optional[List] = None
+            for match in _TOKEN.finditer(line, len(prefix)):
+                token = match.group(0)
+                if token == "(":
+                    row = []
+                elif token == ")":
+                    if row is not None:
+                        yield tuple(row)
+                    row = None
+                elif row is None:
+                    continue
+                elif match.group(1) is not None:
+                    row.append(_ESCAPE.sub(lambda m: _ESCAPES.get(m.group(1), m.group(1)), match.group(1)))
+                elif match.group(2):
+                    row.append(None)
+                else:
+                    row.append(_number(match.group(3)))
+
+def _number(text: str):
+    """An unquoted value as an int where it is one, else a float (as in `1e-05`), else the text itself."""
+    try:
+        return int(text)
+    except ValueError:
+        pass
+    try:
+        return float(text)
+    except ValueError:
+        return text
+
+def _title(raw: str) -> str:
+    # Dumps store titles with underscores; the API and the rest of the game use spaces
+    return raw.replace("_", " ")
+
+class _Builder:
+    """Assigns dense integer ids to titles and collects edges into compact typed arrays."""
+
+    def __init__(self):
+        self.ids: Dict[str, int] = {}
+        self.titles: List[str] = []
+        self.sources = array("i")
+        self.targets = array("i")
+        self.kinds = array("B")
+
+    def node(self, title: str) -> int:
+        node_id = self.ids.get(title)
+        if node_id is None:
+            node_id = self.ids[title] = len(self.titles)
+            self.titles.append(title)
+        return node_id
+
+    def edge(self, source: int, target: int, kind: int):
+        self.sources.append(source)
+        self.targets.append(target)
+        self.kinds.append(kind)
+
+def build_link_graph(page_dump: str, pagelinks_dump: str, out_dir: str, categorylinks_dump: Optional[str] = None, redirect_dump: Optional[str] = None, linktarget_dump: Optional[str] = None) -> "LinkGraph":
+    """Turn `page`, `pagelinks` and (optionally) `categorylinks` dumps into a CSR link graph.
+
+    Only articles are kept. Links to redirects are resolved when a `redirect` dump is given,
+    and the newer `pagelinks` layout, which points into `linktarget`, is supported as well.
+    """
+    builder = _Builder()
+    page_titles: Dict[int, str] = {}
+    redirect_ids = set()
+    for row in iter_rows(page_dump, "page"):
+        page_id, namespace, title, is_redirect = row[:4]
+        if namespace != ARTICLE_NAMESPACE:
+            continue
+        page_titles[page_id] = _title(title)
+        if is_redirect:
+            redirect_ids.add(page_id)
+        else:
+            builder.node(_title(title))
+
+    redirects: Dict[str, str] = {}
+    if redirect_dump:
+        for rd_from, namespace, title, *_ in iter_rows(redirect_dump, "redirect"):
+            if rd_from in page_titles and namespace == ARTICLE_NAMESPACE:
+                redirects[page_titles[rd_from]] = _title(title)
+
+    link_targets: Dict[int, str] = {}
+    if linktarget_dump:
+        for lt_id, namespace, title in iter_rows(linktarget_dump, "linktarget"):
+            if namespace == ARTICLE_NAMESPACE:
+                link_targets[lt_id] = _title(title)
+
+    for row in iter_rows(pagelinks_dump, "pagelinks"):
+        if len(row) >= 4:
+            source, namespace, title, _ = row[:4]
+            target = _title(title) if namespace == ARTICLE_NAMESPACE else None
+        else:
+            source, _, target_id = row
+            target = link_targets.get(target_id)
+        if target is None or source not in page_titles or source in redirect_ids:
+            continue
+        target = redirects.get(target, target)
+        if target in builder.ids:
+            builder.edge(builder.ids[page_titles[source]], builder.ids[target], LINK)
+
+    if categorylinks_dump:
+        for row in iter_rows(categorylinks_dump, "categorylinks"):
+            source, category = row[:2]
+            if source in page_titles and source not in redirect_ids:
+                # Categories are named without their namespace, like the `wikipedia` library does
+                builder.edge(builder.ids[page_titles[source]], builder.node(_title(category)), CATEGORY)
+
+    write_link_graph(builder, out_dir)
+    return LinkGraph(out_dir)
+
+def _csr(keys: np.ndarray, values: np.ndarray, kinds: np.ndarray, size: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Group `values` (and their `kinds`) by `keys` into offsets plus flat arrays."""
+    # A stable sort keeps each page's edges in dump order
+    order = np.argsort(keys, kind="stable")
+    offsets = np.zeros(size + 1, dtype=np.int64)
+    np.cumsum(np.bincount(keys, minlength=size), out=offsets[1:])
+    return offsets, values[order], kinds[order]
+
+def write_link_graph(builder: _Builder, out_dir: str):
+    os.makedirs(out_dir, exist_ok=True)
+    sources = np.frombuffer(builder.sources, dtype=np.int32) if builder.sources else np.zeros(0, np.int32)
+    targets = np.frombuffer(builder.targets, dtype=np.int32) if builder.targets else np.zeros(0, np.int32)
+    kinds = np.frombuffer(builder.kinds, dtype=np.uint8) if builder.kinds else np.zeros(0, np.uint8)
+    # The same edges twice: grouped by source for forward search, and by target for backward search
+    for prefix, keys, values in (("", sources, targets), ("reverse_", targets, sources)):
+        offsets, values, edge_kinds = _csr(keys, values, kinds, len(builder.titles))
+        np.save(os.path.join(out_dir, prefix + "offsets.npy"), offsets)
+        np.save(os.path.join(out_dir, prefix + "targets.npy"), values)
+        np.save(os.path.join(out_dir, prefix + "kinds.npy"), edge_kinds)
+    with open(os.path.join(out_dir, "titles.jsonl"), "w", encoding="utf-8") as f:
+        for title in builder.titles:
+            f.write(json.dumps(title) + "\n")
+
+class LinkGraph:
+    """A link graph in compressed sparse row form, memory-mapped from the files build_link_graph writes.
+
+    Page `i` links to `targets[offsets[i]:offsets[i + 1]]`, with the matching `kinds` telling
+    links and categories apart. The `reverse_` arrays hold the same edges grouped by target,
+    so backlinks are a slice too. Nothing here touches the network.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.offsets, self.targets, self.kinds = self._load("")
+        if os.path.exists(os.path.join(path, "reverse_offsets.npy")):
+            self.reverse_offsets, self.sources, self.reverse_kinds = self._load("reverse_")
+        else:
+            # Graphs written before backlinks were stored: group the edges by target in memory
+            keys = np.repeat(np.arange(len(self.offsets) - 1, dtype=np.int32), np.diff(self.offsets))
+            self.reverse_offsets, self.sources, self.reverse_kinds = _csr(np.asarray(self.targets), keys, np.asarray(self.kinds), len(self.offsets) - 1)
+        with open(os.path.join(path, "titles.jsonl"), encoding="utf-8") as f:
+            self.titles = [json.loads(line) for line in f]
+        self.ids = {title: node_id for node_id, title in enumerate(self.titles)}
+
+    def _load(self, prefix: str) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        return tuple(np.load(os.path.join(self.path, f"{prefix}{name}.npy"), mmap_mode="r") for name in ("offsets", "targets", "kinds"))
+
+    def __contains__(self, title: str) -> bool:
+        return title in self.ids
+
+    def __len__(self) -> int:
+        return len(self.titles)
+
+    @property
+    def num_edges(self) -> int:
+        return len(self.targets)
+
+    @staticmethod
+    def _slice(offsets: np.ndarray, values: np.ndarray, edge_kinds: np.ndarray, node_id: int, kinds: Sequence[int]) -> np.ndarray:
+        start, end = offsets[node_id], offsets[node_id + 1]
+        values = values[start:end]
+        if len(kinds) < 2:
+            values = values[np.isin(edge_kinds[start:end], kinds)]
+        return np.asarray(values)
+
+    def neighbour_ids(self, node_id: int, kinds: Sequence[int] = (LINK, CATEGORY)) -> np.ndarray:
+        return self._slice(self.offsets, self.targets, self.kinds, node_id, kinds)
+
+    def reverse_neighbour_ids(self, node_id: int, kinds: Sequence[int] = (LINK, CATEGORY)) -> np.ndarray:
+        return self._slice(self.reverse_offsets, self.sources, self.reverse_kinds, node_id, kinds)
+
+    def neighbours(self, title: str, kinds: Sequence[int] = (LINK, CATEGORY)) -> Optional[List[str]]:
+        """Titles `title` links to, or None if the page is not in the graph."""
+        node_id = self.ids.get(title)
+        if node_id is None:
+            return None
+        return [self.titles[target] for target in self.neighbour_ids(node_id, kinds)]
+
+    def reverse_neighbours(self, title: str, kinds: Sequence[int] = (LINK, CATEGORY)) -> Optional[List[str]]:
+        """Titles linking to `title`, or None if the page is not in the graph."""
+        node_id = self.ids.get(title)
+        if node_id is None:
+            return None
+        return [self.titles[source] for source in self.reverse_neighbour_ids(node_id, kinds)]
+
+def main():
+    parser = argparse.ArgumentParser(description="Build an offline link graph from Wikipedia SQL dumps.")
+    parser.add_argument("--page", required=True, help="page.sql(.gz) dump")
+    parser.add_argument("--pagelinks", required=True, help="pagelinks.sql(.gz) dump")
+    parser.add_argument("--categorylinks", help="categorylinks.sql(.gz) dump")
+    parser.add_argument("--redirect", help="redirect.sql(.gz) dump, to resolve links to redirects")
+    parser.add_argument("--linktarget", help="linktarget.sql(.gz) dump, for the newer pagelinks layout")
+    parser.add_argument("--out", default="graph", help="output directory")
+    args = parser.parse_args()
+    graph = build_link_graph(args.page, args.pagelinks, args.out, args.categorylinks, args.redirect, args.linktarget)
+    print(f"Wrote {len(graph)} pages and {graph.num_edges} edges to {args.out}")
+
+if __name__ == "__main__":
+    main()
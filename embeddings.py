@@ -0,0 +1,229 @@
+import json
+import numpy as np
+import os
+import re
+import threading
+import tracing
+from typing import Dict, List, Optional, Protocol, Tuple
+
+class Vectorizer(Protocol):
+    """Turns texts into fixed-length vectors. `name` keeps each vectorizer's embeddings apart."""
+    name: str
+
+    def vectorize(self, texts: List[str]) -> np.ndarray: ...
+
+class SpacyVectorizer:
+    """Embeds texts with a spacy pipeline that is only loaded the first time it is needed."""
+
+    # doc.vector only needs token vectors, so these components are never loaded
+    EXCLUDED_PIPES = ["tagger", "parser", "attribute_ruler", "lemmatizer", "ner", "senter"]
+
+    def __init__(self, model: str = "en_core_web_sm", batch_size: int = 256):
+        self.name = model
+        self.model = model
+        self.batch_size = batch_size
+        self._nlp = None
+        self._lock = threading.Lock()
+
+    @property
+    def nlp(self):
+        with self._lock:
+            if self._nlp is None:
+                import spacy  # Importing spacy alone takes seconds, so wait until it is used
+                self._nlp = spacy.load(self.model, exclude=self.EXCLUDED_PIPES)
+            return self._nlp
+
+    def vectorize(self, texts: List[str]) -> np.ndarray:
+        docs = self.nlp.pipe(texts, batch_size=self.batch_size)
+        return np.stack([doc.vector for doc in docs]).astype(np.float32)
+
+class StaticVectorizer:
+    """Averages per-word vectors from a fixed table, such as GloVe. No model, no startup cost."""
+
+    _WORD = re.compile(r"\w+")
+
+    def __init__(self, vectors: Dict[str, np.ndarray], name: str = "static"):
+        self.name = name
+        self.vectors = vectors
+        self.dim = len(next(iter(vectors.values()))) if vectors else 0
+
+    @classmethod
+    def from_text(cls, path: str, name: Optional[str] = None) -> "StaticVectorizer":
+        """Load a word-vector table in the GloVe text format: a word, then its components, per line."""
+        vectors = {}
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                word, *values = line.rstrip().split(" ")
+                vectors[word] = np.array(values, dtype=np.float32)
+        return cls(vectors, name or os.path.splitext(os.path.basename(path))[0])
+
+    def vectorize(self, texts: List[str]) -> np.ndarray:
+        rows = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for i, text in enumerate(texts):
+            known = [self.vectors[word] for word in self._WORD.findall(text.lower()) if word in self.vectors]
+            if known:
+                rows[i] = np.mean(known, axis=0)
+        return rows
+
+class EmbeddingStore:
+    """Embeddings persisted as rows of a memory-mapped `.npy` matrix, indexed by text.
+
+    `vectors.npy` holds the rows and `index.jsonl` lists the text for each row, in order.
+    Both only ever grow: a row's vector is written before its index line, so a reader
+    never sees a text whose vector is missing. Opened with `read_only=True`, the matrix is
+    mapped without copying, so worker processes share one copy through the page cache;
+    `refresh` picks up rows appended by the (single) writer since. A half-written last
+    line left by a writer that died is cut off by the next append.
+    """
+
+    def __init__(self, path: str, dtype: str = "float32", read_only: bool = False, initial_capacity: int = 1024):
+        self.path = path
+        self.dtype = np.dtype(dtype)
+        self.read_only = read_only
+        self.initial_capacity = initial_capacity
+        self.index: Dict[str, int] = {}
+        self._vectors: Optional[np.ndarray] = None
+        self._index_offset = 0
+        # Index lines read so far; line n names row n, even when it could not be parsed
+        self._rows = 0
+        self._lock = threading.Lock()
+        self.refresh()
+
+    @property
+    def _vectors_path(self) -> str:
+        return os.path.join(self.path, "vectors.npy")
+
+    @property
+    def _index_path(self) -> str:
+        return os.path.join(self.path, "index.jsonl")
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def __contains__(self, text: str) -> bool:
+        return text in self.index
+
+    def refresh(self):
+        """Load index lines and matrix growth written since the last call."""
+        with self._lock:
+            if not os.path.exists(self._index_path):
+                return
+            self._read_index()
+            if self._vectors is None or len(self._vectors) < self._rows:
+                self._vectors = np.load(self._vectors_path, mmap_mode="r" if self.read_only else "r+")
+
+    def _read_index(self):
+        if not os.path.exists(self._index_path):
+            return
+        with open(self._index_path, "rb") as f:
+            f.seek(self._index_offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # A line still being written
+                try:
+                    self.index.setdefault(json.loads(line), self._rows)
+                except ValueError:
+                    pass  # Garbled by an interrupted write; its row is never read
+                self._rows += 1
+                self._index_offset += len(line)
+
+    def get_many(self, texts: List[str]) -> np.ndarray:
+        """Rows for `texts`, which must all be stored, as float32."""
+        rows = [self.index[text] for text in texts]
+        return np.asarray(self._vectors[rows], dtype=np.float32)
+
+    def add_many(self, texts: List[str], vectors: np.ndarray):
+        """Append vectors for texts not stored yet."""
+        if self.read_only:
+            raise ValueError("Embedding store was opened read-only")
+        with self._lock:
+            self._read_index()
+            new = [(text, vector) for text, vector in zip(texts, vectors) if text not in self.index]
+            if not new:
+                return
+            self._reserve(self._rows + len(new), len(new[0][1]))
+            for offset, (_, vector) in enumerate(new):
+                self._vectors[self._rows + offset] = vector
+            self._vectors.flush()
+            with open(self._index_path, "ab") as f:
+                # Drop a line left unfinished by a writer that died mid-append, or the next line would join it
+                if f.tell() > self._index_offset:
+                    f.truncate(self._index_offset)
+                for text, _ in new:
+                    line = (json.dumps(text) + "\n").encode("utf-8")
+                    f.write(line)
+                    self._index_offset += len(line)
+                    self.index[text] = self._rows
+                    self._rows += 1
+
+    def _reserve(self, rows: int, dim: int):
+        """Make room for `rows` rows, doubling the file when it is full."""
+        if self._vectors is not None:
+            if self._vectors.shape[1] != dim:
+                raise ValueError(f"Embedding store holds {self._vectors.shape[1]}-dimensional vectors, got {dim}")
+            if len(self._vectors) >= rows:
+                return
+        os.makedirs(self.path, exist_ok=True)
+        capacity = max(rows, self.initial_capacity, 2 * (0 if self._vectors is None else len(self._vectors)))
+        grown_path = self._vectors_path + ".grow"
+        grown = np.lib.format.open_memmap(grown_path, mode="w+", dtype=self.dtype, shape=(capacity, dim))
+        if self._vectors is not None:
+            grown[:len(self._vectors)] = self._vectors
+        grown.flush()
+        del grown
+        os.replace(grown_path, self._vectors_path)
+        self._vectors = np.load(self._vectors_path, mmap_mode="r+")
+
+# Embeddings persist across restarts here, next to the page cache, one store per vectorizer
+EMBEDDING_STORE_PATH = os.environ.get("WIKIBACON_EMBEDDINGS", "embeddings")
+vectorizer: Vectorizer = SpacyVectorizer()
+embedding_store = EmbeddingStore(os.path.join(EMBEDDING_STORE_PATH, vectorizer.name))
+
+def set_vectorizer(new_vectorizer: Vectorizer, store_path: Optional[str] = None):
+    """Switch how texts are embedded, along with the store its embeddings are kept in."""
+    global vectorizer, embedding_store
+    vectorizer = new_vectorizer
+    embedding_store = EmbeddingStore(store_path or os.path.join(EMBEDDING_STORE_PATH, new_vectorizer.name))
+
+def embed_batch(texts: List[str]) -> np.ndarray:
+    """Embed many texts at once, one row per text. Only texts not seen before are vectorized."""
+    if not texts:
+        return np.zeros((0, 0), dtype=np.float32)
+    missing = [text for text in dict.fromkeys(texts) if text not in embedding_store]
+    if missing:
+        tracing.count("embeddings_computed", len(missing))
+        with tracing.phase("embedding"):
+            embedding_store.add_many(missing, vectorizer.vectorize(missing))
+    return embedding_store.get_many(texts)
+
+def encode_text(text: str) -> np.ndarray:
+    """Encode text using the current vectorizer"""
+    return embed_batch([text])
+
+def get_cached_embedding(text: str) -> np.ndarray:
+    """Get embedding with caching to avoid recomputation."""
+    return embed_batch([text])
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return np.divide(vectors, norms, out=np.zeros_like(vectors), where=norms > 0)
+
+def similarities(texts: List[str], goal_text: str) -> np.ndarray:
+    """Cosine similarity of every text to the goal, as one matrix-vector product."""
+    if not texts:
+        return np.zeros(0, dtype=np.float32)
+    goal = _normalize(embed_batch([goal_text])[0])
+    return _normalize(embed_batch(texts)) @ goal
+
+def rank_candidates(candidates: List[str], goal_text: str, top_k: Optional[int] = None) -> List[Tuple[str, float]]:
+    """The `top_k` candidates most similar to the goal text, best first."""
+    if top_k is not None and top_k <= 0:
+        return []
+    with tracing.phase("scoring"):
+        scores = similarities(candidates, goal_text)
+        if top_k is not None and top_k < len(candidates):
+            best = np.argpartition(-scores, top_k - 1)[:top_k]
+        else:
+            best = np.arange(len(candidates))
+        best = best[np.argsort(-scores[best], kind="stable")]
+        return [(candidates[i], float(scores[i])) for i in best]
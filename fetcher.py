@@ -0,0 +1,188 @@
+import asyncio
+import threading
+import time
+import tracing
+from concurrent.futures import Future
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple, TypeVar
+
+T = TypeVar("T")
+
+# Fetches one batch of titles; blocking, so it runs on the executor.
+BatchFn = Callable[[List[str]], Dict[str, Optional[T]]]
+# Maps a title to the key its in-flight fetch is shared under, e.g. its normalized form.
+KeyFn = Callable[[str], str]
+
+class SingleFlight:
+    """Runs at most one call per key at a time; callers arriving meanwhile wait for its result."""
+
+    def __init__(self, key: KeyFn = lambda title: title):
+        self.key = key
+        self._calls: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    def do(self, title: str, call: Callable[[], T]) -> T:
+        key = self.key(title)
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+        if not leader:
+            return future.result()
+        try:
+            result = call()
+        except BaseException as error:
+            future.set_exception(error)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+class RateLimiter:
+    """Spaces out requests to one host so they never exceed `requests_per_second`."""
+
+    _by_host: Dict[str, "RateLimiter"] = {}
+    _registry_lock = threading.Lock()
+
+    def __init__(self, requests_per_second: float):
+        self.interval = 1.0 / requests_per_second if requests_per_second > 0 else 0.0
+        self._next_slot = 0.0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def for_host(cls, host: str, requests_per_second: float) -> "RateLimiter":
+        """Share one limiter between every fetcher talking to the same host."""
+        with cls._registry_lock:
+            if host not in cls._by_host:
+                cls._by_host[host] = cls(requests_per_second)
+            return cls._by_host[host]
+
+    def reserve(self) -> float:
+        """Claim the next request slot and return how long to wait for it."""
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+            return slot - now
+
+    async def acquire(self):
+        delay = self.reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def wait(self):
+        """Block until the next request slot, for callers outside the event loop."""
+        delay = self.reserve()
+        if delay > 0:
+            time.sleep(delay)
+
+class AsyncFetcher:
+    """Fetches batches of titles concurrently on a background event loop.
+
+    Concurrency is bounded by a semaphore and requests are paced by a per-host rate limiter.
+    With `rate_limit`, this fetcher's own requests are also held to that many per second, so
+    background work takes only a small share of the host's budget.
+    `fetch` is a blocking facade for synchronous callers; `prefetch` schedules work and returns
+    at once, and `wait` lets a caller join a fetch that is already in flight. In-flight
+    fetches are shared by `key`, so differently spelled titles for one page are fetched once.
+    """
+
+    def __init__(self, fetch_batch: BatchFn, host: str = "", max_concurrency: int = 4, requests_per_second: float = 10.0, batch_size: int = 50, key: KeyFn = lambda title: title, rate_limit: Optional[float] = None):
+        self.fetch_batch = fetch_batch
+        self.key = key
+        self.max_concurrency = max_concurrency
+        self.batch_size = batch_size
+        self.limiter = RateLimiter.for_host(host, requests_per_second)
+        self.own_limiter = RateLimiter(rate_limit) if rate_limit is not None else None
+        self._in_flight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="page-fetcher", daemon=True).start()
+                self._semaphore = asyncio.Semaphore(self.max_concurrency)
+                self._loop = loop
+            return self._loop
+
+    async def _fetch_one_batch(self, batch: List[str], fetch_batch: BatchFn) -> Dict[str, Optional[T]]:
+        async with self._semaphore:
+            # Wait for this fetcher's own slot first, so it never holds one of the host's idle
+            if self.own_limiter is not None:
+                await self.own_limiter.acquire()
+            await self.limiter.acquire()
+            return await asyncio.get_running_loop().run_in_executor(None, fetch_batch, batch)
+
+    async def fetch_async(self, titles: List[str], fetch_batch: Optional[BatchFn] = None) -> Dict[str, Optional[T]]:
+        batches = [titles[i:i + self.batch_size] for i in range(0, len(titles), self.batch_size)]
+        results: Dict[str, Optional[T]] = {}
+        for batch_result in await asyncio.gather(*(self._fetch_one_batch(batch, fetch_batch or self.fetch_batch) for batch in batches)):
+            results.update(batch_result)
+        return results
+
+    def _start(self, titles: List[str]) -> Tuple[Optional[Future], Set[Future]]:
+        """Fetch the titles nobody is fetching yet; return that fetch and the ones joined instead."""
+        loop = self._ensure_loop()
+        # Check and register under one lock, so two callers never both fetch a title, and the
+        # done callback always sees the entries
+        with self._lock:
+            joined = {self._in_flight[self.key(title)] for title in titles if self.key(title) in self._in_flight}
+            missing = {self.key(title): title for title in titles if self.key(title) not in self._in_flight}
+            if not missing:
+                return None, joined
+            # The requests count toward the trace of whoever started the fetch
+            future = asyncio.run_coroutine_threadsafe(self.fetch_async(list(missing.values()), tracing.bind(self.fetch_batch)), loop)
+            for key in missing:
+                self._in_flight[key] = future
+
+        def done(_):
+            with self._lock:
+                for key in missing:
+                    if self._in_flight.get(key) is future:
+                        del self._in_flight[key]
+        future.add_done_callback(done)
+        return future, joined
+
+    def fetch(self, titles: Iterable[str]) -> Dict[str, Optional[T]]:
+        """Fetch `titles` concurrently and block until every batch has finished.
+
+        Titles already being fetched, by any caller, are joined rather than requested again.
+        """
+        titles = list(dict.fromkeys(titles))
+        if not titles:
+            return {}
+        future, joined = self._start(titles)
+        results: Dict[str, Optional[T]] = {}
+        for other in ([future] if future else []) + list(joined):
+            try:
+                batch_results = other.result()
+            except Exception:
+                if other is future:
+                    raise
+                continue  # Reported to whoever started that fetch; these titles come back as None
+            results.update((self.key(title), value) for title, value in batch_results.items())
+        return {title: results.get(self.key(title)) for title in titles}
+
+    def prefetch(self, titles: Iterable[str]):
+        """Start fetching any of `titles` not already in flight, without waiting."""
+        titles = list(dict.fromkeys(titles))
+        if titles:
+            self._start(titles)
+
+    def wait(self, title: str, timeout: Optional[float] = None) -> bool:
+        """Block until an in-flight fetch of `title` finishes. Returns False if none was running."""
+        with self._lock:
+            future = self._in_flight.get(self.key(title))
+        if future is None:
+            return False
+        try:
+            future.result(timeout)
+        except Exception:
+            return False
+        return True
@@ -0,0 +1,102 @@
+import hashlib
+import json
+import os
+import re
+from functools import lru_cache
+from typing import Any, Dict
+
+# Why a title is kept off paths, as bits of a mask
+META_PAGE = 1        # disambiguation, maintenance and namespace pages
+MALFORMED = 2        # too short, or too many parentheses
+META_CATEGORY = 4    # maintenance categories, like "Articles with dead links"
+WEAK_CATEGORY = 8    # namespaced categories without a thematic term
+
+# Pages with these reasons are never stepped onto; the others only rule out following categories
+PAGE_REASONS = META_PAGE | MALFORMED
+CATEGORY_REASONS = META_CATEGORY | WEAK_CATEGORY
+
+# The rules the game ships with
+RULES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "filters.json")
+
+def _alternation(terms) -> str:
+    # Longest first, so a match reports the longest term starting at its position
+    return "|".join(re.escape(term) for term in sorted(terms, key=len, reverse=True))
+
+class FilterEngine:
+    """Classifies titles against rules loaded from data, with every term list compiled into one regex.
+
+    Rules are a dict like filters.json: `meta_page` and `meta_category` list substrings
+    (matched case-insensitively), `weak_category` marks titles with its `prefix` unless
+    they contain one of its `unless` terms, and `min_length`/`max_parentheses` mark
+    malformed titles. `classify` returns a bitmask of the reasons a title matched.
+    """
+
+    def __init__(self, rules: Dict[str, Any]):
+        self.rules = rules
+        # Identifies the rules, so flags stored under other rules can be recomputed
+        self.version = hashlib.sha1(json.dumps(rules, sort_keys=True).encode()).hexdigest()[:16]
+        masks: Dict[str, int] = {}
+        for key, reason in (("meta_page", META_PAGE), ("meta_category", META_CATEGORY)):
+            for term in rules.get(key, []):
+                masks[term.lower()] = masks.get(term.lower(), 0) | reason
+        # Each position reports only its longest match, so give every term the reasons of the terms inside it
+        self._masks = {term: _union(mask for other, mask in masks.items() if other in term) for term in masks}
+        self._terms = re.compile(f"(?=({_alternation(masks)}))") if masks else None
+        weak = rules.get("weak_category", {})
+        self._weak_prefix = weak.get("prefix", "").lower()
+        self._weak_unless = re.compile(_alternation(term.lower() for term in weak["unless"])) if weak.get("unless") else None
+        self.min_length = rules.get("min_length", 0)
+        self.max_parentheses = rules.get("max_parentheses")
+        # Titles recur across every page that links to them, so each is classified once
+        self.classify = lru_cache(maxsize=1 << 17)(self._classify)
+
+    @classmethod
+    def load(cls, path: str = RULES_PATH) -> "FilterEngine":
+        with open(path) as f:
+            return cls(json.load(f))
+
+    def _classify(self, title: str) -> int:
+        lower = title.lower()
+        mask = 0
+        if self._terms is not None:
+            for match in self._terms.finditer(lower):
+                mask |= self._masks[match.group(1)]
+        if len(title) < self.min_length or (self.max_parentheses is not None and (title.count("(") > self.max_parentheses or title.count(")") > self.max_parentheses)):
+            mask |= MALFORMED
+        if self._weak_prefix and lower.startswith(self._weak_prefix) and not (self._weak_unless and self._weak_unless.search(lower)):
+            mask |= WEAK_CATEGORY
+        return mask
+
+def _union(masks) -> int:
+    result = 0
+    for mask in masks:
+        result |= mask
+    return result
+
+# The rules in use
+engine = FilterEngine.load()
+
+def use_rules(path: str = RULES_PATH):
+    """Filter with the rules in `path` from now on. Caches recompute their stored flags on next open."""
+    global engine
+    engine = FilterEngine.load(path)
+
+def excluded(hard_mode: bool = False) -> int:
+    """The reasons that keep a page off a path in this mode. Hard mode never follows categories."""
+    return PAGE_REASONS if hard_mode else PAGE_REASONS | CATEGORY_REASONS
+
+def flags(title: str) -> int:
+    """Every reason `title` matched, as a bitmask."""
+    return engine.classify(title)
+
+def is_allowed(title: str, hard_mode: bool = False) -> bool:
+    """Whether a search may step onto `title` in this mode."""
+    return not engine.classify(title) & excluded(hard_mode)
+
+def is_regular_page(page_name: str) -> bool:
+    """Filter out meta pages and disambiguation pages"""
+    return not engine.classify(page_name) & PAGE_REASONS
+
+def is_good_category(page_name: str) -> bool:
+    """Filter out meta categories that don't create meaningful thematic connections"""
+    return not engine.classify(page_name) & CATEGORY_REASONS
@@ -0,0 +1,154 @@
+import argparse
+import os
+import numpy as np
+from typing import List, Optional, Sequence, Tuple
+from cache import CATEGORY, LINK
+from dumps import LinkGraph
+from filters import is_allowed
+
+# Distances are stored in one byte; this marks "no path" (and anything 255 hops or longer)
+UNREACHABLE = 255
+
+def _kinds(hard_mode: bool) -> Sequence[int]:
+    return (LINK,) if hard_mode else (LINK, CATEGORY)
+
+def allowed_nodes(graph: LinkGraph, hard_mode: bool = False) -> np.ndarray:
+    """Which pages the game may step onto, as a mask: the same filtering as GraphBackend.neighbours."""
+    return np.array([is_allowed(title, hard_mode) for title in graph.titles], dtype=bool)
+
+def _expand(offsets: np.ndarray, values: np.ndarray, edge_kinds: np.ndarray, frontier: np.ndarray, kinds: Sequence[int]) -> np.ndarray:
+    """Every value in the CSR rows of `frontier`, as one array."""
+    starts, ends = offsets[frontier], offsets[frontier + 1]
+    counts = ends - starts
+    total = int(counts.sum())
+    if total == 0:
+        return np.zeros(0, dtype=values.dtype)
+    # Position of each edge: its row's start plus its index within the row
+    index = np.repeat(starts - np.cumsum(counts) + counts, counts) + np.arange(total)
+    found = values[index]
+    if len(kinds) < 2:
+        found = found[np.isin(edge_kinds[index], kinds)]
+    return found
+
+def bfs(graph: LinkGraph, source: int, allowed: np.ndarray, hard_mode: bool = False, reverse: bool = False) -> np.ndarray:
+    """Hops from `source` to every page (or, with `reverse`, from every page to `source`)."""
+    if reverse:
+        offsets, values, edge_kinds = graph.reverse_offsets, graph.sources, graph.reverse_kinds
+    else:
+        offsets, values, edge_kinds = graph.offsets, graph.targets, graph.kinds
+    distances = np.full(len(graph), UNREACHABLE, dtype=np.uint8)
+    distances[source] = 0
+    frontier = np.array([source])
+    depth = 0
+    while len(frontier) and depth < UNREACHABLE - 1:
+        depth += 1
+        found = np.unique(_expand(offsets, values, edge_kinds, frontier, _kinds(hard_mode)))
+        found = found[distances[found] == UNREACHABLE]
+        if reverse:
+            # Any page may link onto an allowed one, but only allowed pages can be passed through
+            distances[found] = depth
+            frontier = found[allowed[found]]
+        else:
+            found = found[allowed[found]]
+            distances[found] = depth
+            frontier = found
+    return distances
+
+def select_landmarks(graph: LinkGraph, count: int, allowed: np.ndarray) -> np.ndarray:
+    """The `count` allowed pages with the most links in and out."""
+    degree = np.diff(graph.offsets) + np.diff(graph.reverse_offsets)
+    candidates = np.flatnonzero(allowed)
+    best = candidates[np.argsort(-degree[candidates], kind="stable")[:count]]
+    return best.astype(np.int32)
+
+def build_landmarks(graph: LinkGraph, count: int = 32, hard_mode: bool = False, out_dir: Optional[str] = None) -> "LandmarkTable":
+    """Pick landmarks and store BFS distances from and to each of them for every page in `graph`."""
+    out_dir = out_dir or LandmarkTable.default_path(graph, hard_mode)
+    allowed = allowed_nodes(graph, hard_mode)
+    landmarks = select_landmarks(graph, count, allowed)
+    # One row per page, so every landmark distance for a page sits in one contiguous slice
+    from_landmarks = np.stack([bfs(graph, landmark, allowed, hard_mode) for landmark in landmarks], axis=1) if len(landmarks) else np.zeros((len(graph), 0), np.uint8)
+    to_landmarks = np.stack([bfs(graph, landmark, allowed, hard_mode, reverse=True) for landmark in landmarks], axis=1) if len(landmarks) else np.zeros((len(graph), 0), np.uint8)
+    os.makedirs(out_dir, exist_ok=True)
+    np.save(os.path.join(out_dir, "landmarks.npy"), landmarks)
+    np.save(os.path.join(out_dir, "from.npy"), from_landmarks)
+    np.save(os.path.join(out_dir, "to.npy"), to_landmarks)
+    return LandmarkTable(graph, out_dir)
+
+class LandmarkTable:
+    """Distances between every page and a few landmarks, for bounding path lengths.
+
+    By the triangle inequality, d(u, t) >= d(L, t) - d(L, u) and d(u, t) >= d(u, L) - d(t, L)
+    for every landmark L, while d(u, L) + d(L, t) is the length of an actual path.
+    Distances are in hops; a path of n hops has n + 1 pages.
+    """
+
+    def __init__(self, graph: LinkGraph, path: str):
+        self.graph = graph
+        self.path = path
+        self.landmarks = np.load(os.path.join(path, "landmarks.npy"))
+        self.from_landmarks = np.load(os.path.join(path, "from.npy"), mmap_mode="r")
+        self.to_landmarks = np.load(os.path.join(path, "to.npy"), mmap_mode="r")
+
+    @staticmethod
+    def default_path(graph: LinkGraph, hard_mode: bool) -> str:
+        return os.path.join(graph.path, "landmarks", "hard" if hard_mode else "normal")
+
+    @classmethod
+    def load(cls, graph: LinkGraph, hard_mode: bool = False) -> Optional["LandmarkTable"]:
+        """The tables built for `graph` in this mode, or None if there are none."""
+        path = cls.default_path(graph, hard_mode)
+        return cls(graph, path) if os.path.exists(os.path.join(path, "landmarks.npy")) else None
+
+    def _ids(self, titles: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+        ids = np.array([self.graph.ids.get(title, -1) for title in titles], dtype=np.int64)
+        return np.maximum(ids, 0), ids >= 0
+
+    def lower_bounds(self, sources: List[str], targets: List[str]) -> np.ndarray:
+        """Fewest hops from each source to each target, pairwise (either list may have length one).
+
+        Pages outside the graph get 0; pairs with provably no path get infinity.
+        """
+        source_ids, source_known = self._ids(sources)
+        target_ids, target_known = self._ids(targets)
+        from_source = self.from_landmarks[source_ids].astype(np.int16)
+        from_target = self.from_landmarks[target_ids].astype(np.int16)
+        to_source = self.to_landmarks[source_ids].astype(np.int16)
+        to_target = self.to_landmarks[target_ids].astype(np.int16)
+        known = (from_source != UNREACHABLE) & (from_target != UNREACHABLE)
+        bounds = np.where(known, from_target - from_source, 0).max(axis=1, initial=0)
+        known = (to_source != UNREACHABLE) & (to_target != UNREACHABLE)
+        bounds = np.maximum(bounds, np.where(known, to_source - to_target, 0).max(axis=1, initial=0)).astype(float)
+        # A landmark reaches the source but not the target, or the target reaches it but the source does not
+        unreachable = ((from_target == UNREACHABLE) & (from_source != UNREACHABLE)).any(axis=1)
+        unreachable |= ((to_source == UNREACHABLE) & (to_target != UNREACHABLE)).any(axis=1)
+        bounds[unreachable] = np.inf
+        bounds[~(source_known & target_known)] = 0
+        bounds[np.array(sources, dtype=object) == np.array(targets, dtype=object)] = 0
+        return bounds
+
+    def upper_bound(self, source: str, target: str) -> Optional[int]:
+        """Hops on the shortest path through a landmark, or None if no landmark connects them."""
+        if source not in self.graph or target not in self.graph:
+            return None
+        if source == target:
+            return 0
+        via = self.to_landmarks[self.graph.ids[source]].astype(np.int16) + self.from_landmarks[self.graph.ids[target]].astype(np.int16)
+        known = (self.to_landmarks[self.graph.ids[source]] != UNREACHABLE) & (self.from_landmarks[self.graph.ids[target]] != UNREACHABLE)
+        return int(via[known].min()) if known.any() else None
+
+    def estimate(self, source: str, target: str) -> Tuple[float, Optional[int]]:
+        """Lower and upper bounds on the hops from `source` to `target`."""
+        return float(self.lower_bounds([source], [target])[0]), self.upper_bound(source, target)
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute landmark distances for a link graph built by dumps.py.")
+    parser.add_argument("--graph", default="graph", help="link graph directory")
+    parser.add_argument("--count", type=int, default=32, help="number of landmarks")
+    parser.add_argument("--hard", action="store_true", help="build the tables for hard mode (links only)")
+    args = parser.parse_args()
+    table = build_landmarks(LinkGraph(args.graph), args.count, args.hard)
+    print(f"Wrote distances to {len(table.landmarks)} landmarks to {table.path}")
+
+if __name__ == "__main__":
+    main()
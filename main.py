@@ -1,15 +1,69 @@
-from wiki import get_page, find_short_path
+from wiki import get_page, find_short_paths, estimate_path_length, start_page_pool, use_link_graph
+import os
+import tracing
 import random
 import warnings
-import nltk
-import spacy
+from startpages import StartPagePool
+from typing import List, Optional
 
 # Suppress HTML parser warnings from wikipedia library and bs4
 warnings.filterwarnings("ignore", category=UserWarning, module="wikipedia")
 warnings.filterwarnings("ignore", category=UserWarning, module="bs4")
 warnings.filterwarnings("ignore", message=".*parser.*", category=UserWarning)
 
+# Where dumps.py writes the offline link graph (and landmarks.py its distance tables) by default
+GRAPH_PATH = "graph"
+
+# Set to a file path to append each round's search traces there, as JSON lines
+TRACE_PATH = os.environ.get("WIKIBACON_TRACE")
+
+def describe_estimate(estimate) -> str:
+    lower, upper = estimate
+    if lower == float("inf"):
+        return "no path"
+    if upper is None:
+        return f"at least {int(lower)}"
+    return str(upper) if upper == lower else f"{int(lower)} to {upper}"
+
+def random_page(words: List[str], attempts: int = 10, pool: Optional[StartPagePool] = None):
+    """A random page: one from `pool` when it has any, otherwise one for a random dictionary word.
+
+    Returns None if `attempts` words in a row found nothing.
+    """
+    title = pool.pop() if pool is not None else None
+    page = get_page(title) if title is not None else None
+    while page is None and attempts > 0:
+        page = get_page(random.choice(words))
+        attempts -= 1
+    return page
+
+def path_length(path: List[str], verified: bool = True) -> int:
+    """The score for a path: its number of pages, or 0 when the search failed or a hop could not be verified."""
+    if not verified or path[0].startswith("No path found") or path[0].startswith("Error:"):
+        return 0
+    return len(path)
+
+def show_path(path: List[str], verified: bool) -> int:
+    """Print a path and its score, and return the score."""
+    length = path_length(path, verified)
+    print(f"\n -> ".join(path))
+    if not verified and path_length(path):
+        print("(Not scored: a link on this path could not be verified)")
+    print(f"Length: {length}\n")
+    return length
+
+def winner(computer_length: int, user_length: int) -> Optional[str]:
+    """"computer" or "user", whoever has the longer path, or None for a tie."""
+    if computer_length > user_length:
+        return "computer"
+    if computer_length < user_length:
+        return "user"
+    return None
+
 def main():
+    if os.path.isdir(GRAPH_PATH):
+        use_link_graph(GRAPH_PATH)
+
     print("\n\n🥓 Welcome to WikiBacon! 🥓\n")
     print("In this game, we start from a random Wikipedia page, and then we compete to see who can name a page that is *farthest away* from the original page.\n")
     
@@ -31,16 +85,12 @@ def main():
     
     with open("dictionary.txt", "r") as f:
         common_words = f.read().splitlines()
+    # Resolves the dictionary in the background and keeps a few start pages loaded ahead of time
+    pool = start_page_pool(common_words).start()
 
     while True:
         # Get a valid start page
-        start_page = None
-        attempts = 0
-        while start_page is None and attempts < 10:
-            start_word = random.choice(common_words)
-            start_page = get_page(start_word)
-            attempts += 1
-        
+        start_page = random_page(common_words, pool=pool)
         if start_page is None: # If we couldn't find a valid starting page, try again. Chances of this happening are very low.
             print("Could not find a valid starting page. Please try again.")
             continue
@@ -49,13 +99,7 @@ def main():
         print(f"Summary: {start_page.summary[:500]}...\n")
 
         # Get a valid computer page
-        computer_page = None
-        attempts = 0
-        while computer_page is None and attempts < 10:
-            computer_word = random.choice(common_words)
-            computer_page = get_page(computer_word)
-            attempts += 1
-        
+        computer_page = random_page(common_words, pool=pool)
         if computer_page is None: # If we couldn't find a valid starting page, try again. Chances of this happening are very low.
             print("Could not find a valid computer page. Please try again.")
             continue
@@ -75,31 +119,32 @@ def main():
         print(f"Your page is: {user_page.title}\n")
         print(f"Summary: {user_page.summary[:500]}...\n")
 
+        # Landmark tables, when built, bound both scores instantly
+        computer_estimate = estimate_path_length(start_page.title, computer_page.title, hard_mode)
+        user_estimate = estimate_path_length(start_page.title, user_page.title, hard_mode)
+        if computer_estimate and user_estimate:
+            print(f"Estimated lengths: computer {describe_estimate(computer_estimate)}, you {describe_estimate(user_estimate)}\n")
+
         print("Calculating Bacon paths...\n")
 
-        computer_path = find_short_path(start_page, computer_page, hard_mode)
+        # Both searches run at once, so the round takes as long as the slower of the two
+        traces = [] if TRACE_PATH else None
+        verified = []
+        computer_path, user_path = find_short_paths(start_page, [computer_page, user_page], hard_mode, traces=traces, verified=verified)
+        computer_verified, user_verified = verified
+        if traces:
+            with open(TRACE_PATH, "a") as f:
+                tracing.write_jsonl(traces, f)
         print("Computer's path:")
-        if computer_path[0].startswith("No path found") or computer_path[0].startswith("Error:"):
-            print(computer_path[0])
-            computer_length = 0
-        else:
-            print(f"\n -> ".join(computer_path))
-            computer_length = len(computer_path)
-        print(f"Length: {computer_length}\n")
+        computer_length = show_path(computer_path, computer_verified)
 
-        user_path = find_short_path(start_page, user_page, hard_mode)
         print("Your path:")
-        if user_path[0].startswith("No path found") or user_path[0].startswith("Error:"):
-            print(user_path[0])
-            user_length = 0
-        else:
-            print(f"\n -> ".join(user_path))
-            user_length = len(user_path)
-        print(f"Length: {user_length}\n")
+        user_length = show_path(user_path, user_verified)
 
-        if computer_length > user_length:
+        result = winner(computer_length, user_length)
+        if result == "computer":
             print("I win!")
-        elif computer_length < user_length:
+        elif result == "user":
             print("You win!")
         else:
             print("It's a tie!")
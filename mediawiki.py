@@ -0,0 +1,190 @@
+import requests
+import tracing
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+API_URL = "https://en.wikipedia.org/w/api.php"
+USER_AGENT = "WikiBacon/1.0 (https://donate.wikimedia.org/)"
+
+# The action API accepts at most 50 titles per request for regular clients.
+MAX_BATCH_SIZE = 50
+
+@dataclass
+class PageRecord:
+    """Everything the game needs to know about a page, as plain data."""
+    title: str
+    links: List[str] = field(default_factory=list)
+    categories: List[str] = field(default_factory=list)
+    summary: str = ""
+    revid: Optional[int] = None
+
+def normalize_title(title: str) -> str:
+    """The title MediaWiki would resolve `title` to before any redirect: underscores
+    as spaces, runs of whitespace collapsed, and the first letter upper case."""
+    title = " ".join(title.replace("_", " ").split())
+    return title[:1].upper() + title[1:]
+
+def _strip_category_prefix(title: str) -> str:
+    # Match the `wikipedia` library, which reports categories without their namespace
+    return title[len("Category:"):] if title.startswith("Category:") else title
+
+def _resolve(title: str, aliases: Dict[str, str]) -> str:
+    """Follow normalization and redirect hops from a requested title to the page it landed on."""
+    seen = set()
+    while title in aliases and title not in seen:
+        seen.add(title)
+        title = aliases[title]
+    return title
+
+class MediaWikiClient:
+    """Fetches links, categories and summaries for many pages per `action=query` request."""
+
+    def __init__(self, api_url: str = API_URL, batch_size: int = MAX_BATCH_SIZE, timeout: float = 10.0, session: Optional[requests.Session] = None):
+        self.api_url = api_url
+        self.batch_size = min(batch_size, MAX_BATCH_SIZE)
+        self.timeout = timeout
+        self.session = session or requests.Session()
+        self.session.headers.setdefault("User-Agent", USER_AGENT)
+        self.requests_made = 0
+
+    def fetch_pages(self, titles: Iterable[str]) -> Dict[str, Optional[PageRecord]]:
+        """Fetch page data for `titles`, keyed by the title as requested. Missing pages map to None."""
+        titles = list(dict.fromkeys(titles))
+        results: Dict[str, Optional[PageRecord]] = {}
+        for i in range(0, len(titles), self.batch_size):
+            results.update(self._fetch_batch(titles[i:i + self.batch_size]))
+        return results
+
+    def _fetch_batch(self, titles: List[str]) -> Dict[str, Optional[PageRecord]]:
+        params = {
+            "action": "query",
+            "prop": "info|links|categories|extracts",
+            "titles": "|".join(titles),
+            "redirects": 1,
+            "plnamespace": 0,
+            "pllimit": "max",
+            "cllimit": "max",
+            "exintro": 1,
+            "explaintext": 1,
+            "exlimit": "max",
+        }
+        aliases: Dict[str, str] = {}
+        records: Dict[str, PageRecord] = {}
+        for query in self._query(params):
+            for entry in query.get("normalized", []) + query.get("redirects", []):
+                aliases[entry["from"]] = entry["to"]
+            for page in query.get("pages", []):
+                if page.get("missing") or page.get("invalid"):
+                    continue
+                record = records.setdefault(page["title"], PageRecord(page["title"]))
+                record.links.extend(link["title"] for link in page.get("links", []))
+                record.categories.extend(_strip_category_prefix(cat["title"]) for cat in page.get("categories", []))
+                if page.get("extract") and not record.summary:
+                    record.summary = page["extract"]
+                if page.get("lastrevid"):
+                    record.revid = page["lastrevid"]
+        return {title: records.get(_resolve(title, aliases)) for title in titles}
+
+    def fetch_revisions(self, titles: Iterable[str]) -> Dict[str, Optional[int]]:
+        """Latest revision id for each of `titles`, a cheap check for whether cached data is current."""
+        titles = list(dict.fromkeys(titles))
+        results: Dict[str, Optional[int]] = {}
+        for i in range(0, len(titles), self.batch_size):
+            batch = titles[i:i + self.batch_size]
+            aliases: Dict[str, str] = {}
+            revisions: Dict[str, int] = {}
+            for query in self._query({"action": "query", "prop": "info", "titles": "|".join(batch), "redirects": 1}):
+                for entry in query.get("normalized", []) + query.get("redirects", []):
+                    aliases[entry["from"]] = entry["to"]
+                for page in query.get("pages", []):
+                    if page.get("lastrevid"):
+                        revisions[page["title"]] = page["lastrevid"]
+            results.update({title: revisions.get(_resolve(title, aliases)) for title in batch})
+        return results
+
+    def resolve_titles(self, titles: Iterable[str]) -> Dict[str, Optional[str]]:
+        """The article each of `titles` lands on after normalization and redirects.
+
+        Missing pages and disambiguation pages map to None. Only page properties are
+        requested, so this is much cheaper than `fetch_pages`.
+        """
+        titles = list(dict.fromkeys(titles))
+        results: Dict[str, Optional[str]] = {}
+        for i in range(0, len(titles), self.batch_size):
+            batch = titles[i:i + self.batch_size]
+            aliases: Dict[str, str] = {}
+            articles = set()
+            params = {"action": "query", "prop": "pageprops", "ppprop": "disambiguation", "titles": "|".join(batch), "redirects": 1}
+            for query in self._query(params):
+                for entry in query.get("normalized", []) + query.get("redirects", []):
+                    aliases[entry["from"]] = entry["to"]
+                for page in query.get("pages", []):
+                    if not (page.get("missing") or page.get("invalid") or "disambiguation" in page.get("pageprops", {})):
+                        articles.add(page["title"])
+            results.update({title: _resolve(title, aliases) if _resolve(title, aliases) in articles else None for title in batch})
+        return results
+
+    def fetch_backlinks(self, titles: Iterable[str], limit: int = 500) -> Dict[str, Optional[List[str]]]:
+        """Articles linking to each of `titles` (at most `limit` each), via `prop=linkshere`.
+
+        Redirects to a page are left out. Missing pages map to None.
+        """
+        titles = list(dict.fromkeys(titles))
+        results: Dict[str, Optional[List[str]]] = {}
+        for i in range(0, len(titles), self.batch_size):
+            batch = titles[i:i + self.batch_size]
+            aliases, backlinks, complete = self._linkshere(batch, limit)
+            for title in batch:
+                sources = backlinks.get(_resolve(title, aliases))
+                # Paging stopped before the batch finished, so a short list may be one it never reached
+                if not complete and sources is not None and len(sources) < limit:
+                    single_aliases, single, _ = self._linkshere([title], limit)
+                    sources = single.get(_resolve(title, single_aliases))
+                results[title] = sources[:limit] if sources is not None else None
+        return results
+
+    def _linkshere(self, batch: List[str], limit: int) -> Tuple[Dict[str, str], Dict[str, List[str]], bool]:
+        """Aliases and backlinks for one batch, and whether paging ran to the end.
+
+        Continuation walks the batch one page at a time, so paging stops once the batch has
+        gathered `limit` backlinks for each title rather than follow one large page to its end.
+        """
+        params = {
+            "action": "query",
+            "prop": "linkshere",
+            "titles": "|".join(batch),
+            "redirects": 1,
+            "lhnamespace": 0,
+            "lhshow": "!redirect",
+            "lhprop": "title",
+            "lhlimit": "max",
+        }
+        aliases: Dict[str, str] = {}
+        backlinks: Dict[str, List[str]] = {}
+        for query in self._query(params):
+            for entry in query.get("normalized", []) + query.get("redirects", []):
+                aliases[entry["from"]] = entry["to"]
+            for page in query.get("pages", []):
+                if page.get("missing") or page.get("invalid"):
+                    continue
+                backlinks.setdefault(page["title"], []).extend(link["title"] for link in page.get("linkshere", []))
+            if sum(len(sources) for sources in backlinks.values()) >= limit * len(batch):
+                return aliases, backlinks, False
+        return aliases, backlinks, True
+
+    def _query(self, params: Dict) -> Iterator[Dict]:
+        """Yield each `query` block, following `continue` tokens until the result is complete."""
+        params = dict(params, format="json", formatversion=2)
+        continuation: Dict = {}
+        while True:
+            response = self.session.get(self.api_url, params={**params, **continuation}, timeout=self.timeout)
+            self.requests_made += 1
+            tracing.count("api_calls")
+            response.raise_for_status()
+            data = response.json()
+            if "error" in data:
+                raise requests.RequestException(data["error"].get("info", "MediaWiki API error"))
+            yield data.get("query", {})
+            if "continue" not in data:
+                return
+            continuation = data["continue"]
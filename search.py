@@ -0,0 +1,275 @@
+import heapq
+import itertools
+import math
+import threading
+import time
+import tracing
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Sequence, Set, Tuple
+
+# Returns the neighbours of a page in one direction of the search.
+NeighbourFn = Callable[[str], List[str]]
+# Orders candidate pages by closeness to a goal page, best first, as (page, score) pairs.
+# It may drop weak candidates to limit branching; dropped pages still count as discovered.
+RankFn = Callable[[List[str], str], List[Tuple[str, float]]]
+# Returns True if there is a link from the first page to the second.
+EdgeFn = Callable[[str, str], bool]
+# Starts loading pages the search is about to expand; must not block.
+PrefetchFn = Callable[[List[str]], None]
+# Lower bounds on the hops between each candidate page and a goal page, in the direction of search
+# (candidate to goal going forwards, goal to candidate going backwards); infinity if there is no path.
+BoundFn = Callable[[List[str], str], Sequence[float]]
+
+@dataclass
+class SearchResult:
+    """Outcome of a single path search."""
+    path: Optional[List[str]]
+    reason: str  # "found", "timeout", "expansion_limit" or "exhausted"
+    expansions: int = 0
+    elapsed: float = 0.0
+
+@dataclass
+class _Frontier:
+    """One half of the bidirectional search: a priority queue plus the tree it has grown."""
+    root: str
+    goal: str
+    expand: NeighbourFn
+    parents: Dict[str, Optional[str]] = field(default_factory=dict)
+    depths: Dict[str, int] = field(default_factory=dict)
+    queue: List = field(default_factory=list)
+
+    def __post_init__(self):
+        self.parents[self.root] = None
+        self.depths[self.root] = 0
+        self.queue.append(((0.0, 0.0), 0, self.root))
+
+    def chain(self, node: str) -> List[str]:
+        """Walk parent pointers from `node` back to the root."""
+        chain = []
+        while node is not None:
+            chain.append(node)
+            node = self.parents[node]
+        return chain
+
+@dataclass
+class SearchTree:
+    """The forward half of earlier searches from `root`, kept so searches to new targets resume it.
+
+    Holds every page discovered going forwards with its parent and depth, and which pages
+    have been expanded. Searches copy it when they start and merge what they found back in
+    when they end; it stops growing at `max_nodes` pages.
+    """
+    root: str
+    max_nodes: int = 100_000
+    parents: Dict[str, Optional[str]] = field(default_factory=dict)
+    depths: Dict[str, int] = field(default_factory=dict)
+    expanded: Set[str] = field(default_factory=set)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def __len__(self) -> int:
+        return len(self.parents)
+
+    def snapshot(self) -> Tuple[Dict[str, Optional[str]], Dict[str, int], Set[str]]:
+        with self._lock:
+            return dict(self.parents), dict(self.depths), set(self.expanded)
+
+    def merge(self, parents: Dict[str, Optional[str]], depths: Dict[str, int], expanded: Set[str]):
+        """Add pages the tree does not have yet. A page is discovered after its parent, so in
+        insertion order every page's parent is already in the tree when the page is added."""
+        with self._lock:
+            for node, parent in parents.items():
+                if node in self.parents:
+                    continue
+                if len(self.parents) >= self.max_nodes:
+                    break
+                self.parents[node] = parent
+                self.depths[node] = depths[node]
+            self.expanded.update(node for node in expanded if node in self.parents)
+
+def bidirectional_search(
+    start: str,
+    target: str,
+    neighbours: NeighbourFn,
+    reverse_neighbours: NeighbourFn,
+    rank: Optional[RankFn] = None,
+    has_edge: Optional[EdgeFn] = None,
+    prefetch: Optional[PrefetchFn] = None,
+    reverse_prefetch: Optional[PrefetchFn] = None,
+    bound: Optional[BoundFn] = None,
+    prefetch_k: int = 8,
+    max_expansions: int = 200,
+    time_budget: float = 10.0,
+    max_depth: int = 15,
+    tree: Optional[SearchTree] = None,
+) -> SearchResult:
+    """Grow best-first frontiers from both ends until they meet.
+
+    `reverse_neighbours` should return pages linking *to* a page. If it can only
+    propose candidates (for example, outgoing links assumed to be reciprocal),
+    pass `has_edge` and every backward hop is confirmed before it is used.
+
+    After each expansion, the `prefetch_k` best candidates on each frontier are handed
+    to `prefetch` so their links can load in parallel while the search carries on.
+    Backward candidates go to `reverse_prefetch` instead, when given, to load their backlinks.
+
+    With `bound`, candidates are ordered as in A* (hops so far plus the bound, then rank),
+    and any that cannot lie on a path within `max_depth` pages are dropped.
+
+    With a `tree` rooted at `start`, the forward frontier resumes from it: every page it
+    holds can meet the backward frontier, and its unexpanded pages are queued again, ranked
+    against the new target. What this search discovers going forwards is merged back into it.
+
+    Under a trace (see tracing), every expansion is recorded with its frontier sizes and time.
+    """
+    began = time.monotonic()
+    trace = tracing.current()
+    if start == target:
+        return SearchResult([start], "found")
+
+    forward = _Frontier(start, target, neighbours)
+    backward = _Frontier(target, start, reverse_neighbours)
+    # Backward nodes whose link to their child has been confirmed, or refuted.
+    confirmed = {target}
+    refuted = set()
+    counter = itertools.count(1)
+    expansions = 0
+    prefetched = {start, target}
+    reverse_prefetched = {start, target}
+    # Forward pages whose neighbours are all in forward.parents already
+    expanded: Set[str] = set()
+
+    def result(path: Optional[List[str]], reason: str) -> SearchResult:
+        if tree is not None and tree.root == start:
+            # The backward half of a path found is reachable from the start too
+            for before, after in zip(path or [], (path or [])[1:]):
+                if after not in forward.parents:
+                    forward.parents[after] = before
+                    forward.depths[after] = forward.depths[before] + 1
+            tree.merge(forward.parents, forward.depths, expanded)
+        return SearchResult(path, reason, expansions, time.monotonic() - began)
+
+    def confirm(node: str) -> bool:
+        if has_edge is None or node in confirmed:
+            return True
+        if node in refuted:
+            return False
+        if has_edge(node, backward.parents[node]):
+            confirmed.add(node)
+            return True
+        refuted.add(node)
+        return False
+
+    def meet(before: str, after: str) -> Optional[List[str]]:
+        """Join the frontiers across the link `before` -> `after`."""
+        path = list(reversed(forward.chain(before))) + backward.chain(after)
+        return path if len(path) <= max_depth else None
+
+    def enqueue(side: _Frontier, candidates: List[str], keep_all: bool = False):
+        """Queue `candidates` by rank toward the side's goal, dropping those too deep to lie on a path.
+        With `keep_all`, candidates the ranking leaves out are queued after the rest instead of dropped."""
+        if not candidates:
+            return
+        ranked = rank(candidates, side.goal) if rank else [(candidate, 0.0) for candidate in candidates]
+        if keep_all:
+            kept = {candidate for candidate, _ in ranked}
+            ranked = list(ranked) + [(candidate, -math.inf) for candidate in candidates if candidate not in kept]
+        bounds = dict(zip(candidates, bound(candidates, side.goal))) if bound else {}
+        for candidate, value in ranked:
+            if bound:
+                estimate = side.depths[candidate] + bounds[candidate]
+                if estimate + 1 > max_depth:
+                    tracing.count("depth_pruned")
+                    continue
+                priority = (estimate, -value)
+            else:
+                priority = (0.0, -value)
+            heapq.heappush(side.queue, (priority, next(counter), candidate))
+
+    def prefetch_upcoming():
+        """Start loading the best queued pages on each frontier that have not been asked for yet."""
+        if not (prefetch or reverse_prefetch):
+            return
+        upcoming = [entry[2] for entry in heapq.nsmallest(prefetch_k, forward.queue)]
+        reverse_upcoming = [entry[2] for entry in heapq.nsmallest(prefetch_k, backward.queue)]
+        if reverse_prefetch is None:
+            upcoming, reverse_upcoming = upcoming + reverse_upcoming, []
+        for load, titles, seen in ((prefetch, upcoming, prefetched), (reverse_prefetch, reverse_upcoming, reverse_prefetched)):
+            titles = [title for title in titles if title not in seen]
+            if load and titles:
+                seen.update(titles)
+                load(titles)
+
+    resumed = tree is not None and tree.root == start and len(tree) > 0
+    if resumed:
+        forward.parents, forward.depths, expanded = tree.snapshot()
+        tracing.count("resumed_pages", len(forward.parents))
+        if target in forward.parents:
+            path = list(reversed(forward.chain(target)))
+            if len(path) <= max_depth:
+                return result(path, "found")
+        # An earlier search may have stopped partway through any page, the start included
+        forward.queue.clear()
+        enqueue(forward, [node for node in forward.parents if node not in expanded], keep_all=True)
+        prefetch_upcoming()
+
+    # A resumed tree holds pages never queued, which the backward frontier can still reach
+    while backward.queue and (forward.queue or resumed):
+        if time.monotonic() - began > time_budget:
+            return result(None, "timeout")
+        if expansions >= max_expansions:
+            return result(None, "expansion_limit")
+
+        is_forward = bool(forward.queue) and len(forward.queue) <= len(backward.queue)
+        side = forward if is_forward else backward
+        _, _, node = heapq.heappop(side.queue)
+
+        # An assumed backlink that does not exist prunes the whole branch.
+        if not is_forward and not confirm(node):
+            continue
+        if side.depths[node] + 2 > max_depth:
+            continue
+
+        expansions += 1
+        if trace is not None:
+            expanded_at, phases_before = time.perf_counter(), trace.snapshot()
+        candidates = []
+        for neighbour in side.expand(node):
+            if neighbour in side.parents:
+                continue
+            if is_forward and neighbour in backward.parents and confirm(neighbour):
+                path = meet(node, neighbour)
+                if path:
+                    return result(path, "found")
+            if not is_forward and neighbour in forward.parents:
+                if has_edge is None or has_edge(neighbour, node):
+                    path = meet(neighbour, node)
+                    if path:
+                        return result(path, "found")
+                # Too long through the forward tree's route to it (as in a resumed tree); a shorter one may exist
+                if len(forward.chain(neighbour)) + len(backward.chain(node)) <= max_depth:
+                    continue
+            side.parents[neighbour] = node
+            side.depths[neighbour] = side.depths[node] + 1
+            candidates.append(neighbour)
+
+        if is_forward:
+            expanded.add(node)
+        enqueue(side, candidates)
+
+        prefetch_upcoming()
+
+        if trace is not None:
+            phases_after = trace.snapshot()
+            trace.event(
+                "expansion",
+                direction="forward" if is_forward else "backward",
+                node=node,
+                depth=side.depths[node],
+                candidates=len(candidates),
+                forward_frontier=len(forward.queue),
+                backward_frontier=len(backward.queue),
+                seconds=round(time.perf_counter() - expanded_at, 6),
+                phases={name: round(seconds - phases_before.get(name, 0.0), 6) for name, seconds in phases_after.items() if seconds > phases_before.get(name, 0.0)},
+            )
+
+    return result(None, "exhausted")
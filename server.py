@@ -0,0 +1,210 @@
+import argparse
+import asyncio
+import functools
+import json
+import os
+import time
+import tracing
+import uuid
+from cache import LRUCache
+from concurrent.futures import ThreadPoolExecutor
+from main import GRAPH_PATH, path_length, random_page, winner
+from startpages import StartPagePool
+from typing import Any, Dict, List, Optional, Tuple
+from wiki import SEARCH_WORKERS, estimate_path_length, find_short_paths, get_page, start_page_pool, use_link_graph
+
+# Runs the blocking page lookups and searches for every session. The path searches themselves
+# run on wiki's search pool, two per round, so a thread per round it can score at once is enough
+request_pool = ThreadPoolExecutor(max_workers=max(SEARCH_WORKERS // 2, 1), thread_name_prefix="game-request")
+
+# Largest request body we accept
+MAX_BODY = 64 * 1024
+
+class HttpError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+def _describe(page) -> Dict[str, str]:
+    return {"title": page.title, "summary": page.summary[:500]}
+
+class Round:
+    """One game: a start page and the computer's page, then the player's page and both scores."""
+
+    def __init__(self, start_page, computer_page, hard_mode: bool):
+        self.id = uuid.uuid4().hex
+        self.start_page = start_page
+        self.computer_page = computer_page
+        self.user_page = None
+        self.hard_mode = hard_mode
+        self.created = time.time()
+        self.estimates: Optional[Dict[str, Any]] = None
+        self.paths: Optional[Tuple[List[str], List[str]]] = None
+        self.verified: Tuple[bool, bool] = (False, False)
+        self.scoring: Optional[asyncio.Task] = None
+        self.traces: List[tracing.Trace] = []
+
+    @property
+    def status(self) -> str:
+        if self.user_page is None:
+            return "waiting"
+        return "done" if self.paths is not None else "scoring"
+
+    def to_json(self) -> Dict[str, Any]:
+        result = {
+            "id": self.id,
+            "hard_mode": self.hard_mode,
+            "status": self.status,
+            "start": _describe(self.start_page),
+            "computer": _describe(self.computer_page),
+            "user": _describe(self.user_page) if self.user_page is not None else None,
+        }
+        if self.estimates is not None:
+            result["estimates"] = self.estimates
+        if self.paths is not None:
+            computer_path, user_path = self.paths
+            computer_verified, user_verified = self.verified
+            result["computer_path"], result["user_path"] = computer_path, user_path
+            result["computer_verified"], result["user_verified"] = computer_verified, user_verified
+            result["computer_length"], result["user_length"] = path_length(computer_path, computer_verified), path_length(user_path, user_verified)
+            result["winner"] = winner(result["computer_length"], result["user_length"])
+            if self.traces:
+                result["trace"] = tracing.summarize(self.traces)
+        return result
+
+class GameServer:
+    """Many concurrent rounds over one process, sharing wiki's page cache, embeddings and fetch pool.
+
+    Routes:
+        POST /rounds                  start a round; body {"hard_mode", "start", "computer"}, all optional
+        POST /rounds/<id>/page        submit the player's page, body {"page": "..."}; scoring starts
+        GET  /rounds/<id>             the round so far; once scored, both paths and whether each was verified
+    Rounds live in an LRU, so the oldest idle ones are dropped once `max_rounds` are open.
+    """
+
+    def __init__(self, words: List[str], max_rounds: int = 10000, pool: Optional[StartPagePool] = None):
+        self.words = words
+        self.pool = pool
+        self.rounds = LRUCache(max_rounds)
+
+    async def _blocking(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(request_pool, fn, *args)
+
+    async def _page(self, name: Optional[str]):
+        """The page for `name`, or a random dictionary page without one."""
+        if name is None:
+            page = await self._blocking(random_page, self.words, 10, self.pool)
+            if page is None:
+                raise HttpError(503, "Could not find a random page, try again")
+            return page
+        if not isinstance(name, str) or not name.strip():
+            raise HttpError(400, "Page names must be non-empty strings")
+        page = await self._blocking(get_page, name)
+        if page is None:
+            raise HttpError(404, f"Could not find the page {name!r}")
+        return page
+
+    def _round(self, round_id: str) -> Round:
+        game = self.rounds.get(round_id)
+        if game is None:
+            raise HttpError(404, f"No round {round_id!r}")
+        return game
+
+    async def start_round(self, body: Dict[str, Any]) -> Round:
+        start_page, computer_page = await asyncio.gather(self._page(body.get("start")), self._page(body.get("computer")))
+        game = Round(start_page, computer_page, bool(body.get("hard_mode", False)))
+        self.rounds.put(game.id, game)
+        return game
+
+    async def submit_page(self, game: Round, body: Dict[str, Any]) -> Round:
+        if game.user_page is not None:
+            raise HttpError(409, "This round already has the player's page")
+        user_page = await self._page(body.get("page") or "")
+        if game.user_page is not None:
+            raise HttpError(409, "This round already has the player's page")
+        game.user_page = user_page
+
+        computer_estimate, user_estimate = await asyncio.gather(
+            self._blocking(estimate_path_length, game.start_page.title, game.computer_page.title, game.hard_mode),
+            self._blocking(estimate_path_length, game.start_page.title, user_page.title, game.hard_mode),
+        )
+        if computer_estimate and user_estimate:
+            game.estimates = {"computer": computer_estimate, "user": user_estimate}
+        game.scoring = asyncio.create_task(self._score(game))
+        return game
+
+    async def _score(self, game: Round):
+        verified = []
+        try:
+            computer_path, user_path = await self._blocking(functools.partial(find_short_paths, traces=game.traces, verified=verified), game.start_page, [game.computer_page, game.user_page], game.hard_mode)
+            game.verified = tuple(verified)
+        except Exception as e:
+            computer_path = user_path = [f"Error: {e}"]
+        game.paths = (computer_path, user_path)
+
+    async def handle(self, method: str, path: str, body: Dict[str, Any]) -> Tuple[int, Dict[str, Any]]:
+        """Route one request; returns the status code and the JSON response."""
+        parts = [part for part in path.split("?")[0].split("/") if part]
+        if parts == ["rounds"] and method == "POST":
+            return 201, (await self.start_round(body)).to_json()
+        if len(parts) == 2 and parts[0] == "rounds" and method == "GET":
+            return 200, self._round(parts[1]).to_json()
+        if len(parts) == 3 and parts[0] == "rounds" and parts[2] == "page" and method == "POST":
+            return 202, (await self.submit_page(self._round(parts[1]), body)).to_json()
+        raise HttpError(404, f"No route for {method} {path}")
+
+    async def serve_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Answer one HTTP/1.1 request with JSON, then close the connection."""
+        try:
+            try:
+                head = await reader.readuntil(b"\r\n\r\n")
+                request_line, *header_lines = head.decode("latin-1").split("\r\n")
+                method, path, _ = request_line.split(" ", 2)
+                headers = {name.strip().lower(): value.strip() for name, _, value in (line.partition(":") for line in header_lines if line)}
+                length = int(headers.get("content-length", 0))
+                if length > MAX_BODY:
+                    raise HttpError(413, "Request body too large")
+                raw = await reader.readexactly(length) if length else b""
+                try:
+                    body = json.loads(raw) if raw else {}
+                except ValueError:
+                    raise HttpError(400, "Request body is not valid JSON")
+                if not isinstance(body, dict):
+                    raise HttpError(400, "Request body must be a JSON object")
+                status, payload = await self.handle(method, path, body)
+            except HttpError as e:
+                status, payload = e.status, {"error": e.message}
+            except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ValueError):
+                status, payload = 400, {"error": "Malformed request"}
+            data = json.dumps(payload).encode()
+            writer.write(f"HTTP/1.1 {status} {_REASONS.get(status, 'OK')}\r\nContent-Type: application/json\r\nContent-Length: {len(data)}\r\nConnection: close\r\n\r\n".encode() + data)
+            await writer.drain()
+        finally:
+            writer.close()
+
+_REASONS = {200: "OK", 201: "Created", 202: "Accepted", 400: "Bad Request", 404: "Not Found", 409: "Conflict", 413: "Payload Too Large", 503: "Service Unavailable"}
+
+async def serve(server: GameServer, host: str = "127.0.0.1", port: int = 8080) -> asyncio.AbstractServer:
+    return await asyncio.start_server(server.serve_connection, host, port)
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve WikiBacon rounds to many players over a JSON HTTP API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--graph", default=GRAPH_PATH, help="offline link graph directory, used if it exists")
+    args = parser.parse_args()
+    if os.path.isdir(args.graph):
+        use_link_graph(args.graph)
+    with open("dictionary.txt", "r") as f:
+        words = f.read().splitlines()
+
+    async def run():
+        listener = await serve(GameServer(words, pool=start_page_pool(words, size=64).start()), args.host, args.port)
+        print(f"Serving WikiBacon on http://{args.host}:{args.port}")
+        async with listener:
+            await listener.serve_forever()
+    asyncio.run(run())
+
+if __name__ == "__main__":
+    main()
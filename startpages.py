@@ -0,0 +1,119 @@
+import random
+import threading
+import time
+from collections import deque
+from filters import is_regular_page
+from typing import Callable, Deque, Dict, Iterable, List, Optional
+
+class StartPagePool:
+    """A ready supply of start pages, resolved from dictionary words in the background.
+
+    Words are resolved to article titles `batch_size` at a time through `resolve`, and the
+    mapping is persisted in `store`, so later runs only resolve words they have not seen.
+    Many words land on one page ("apple", "apples"), so pages are drawn uniformly from the
+    distinct titles rather than from the words. Up to `size` drawn titles are warmed with
+    `warm` ahead of time, so starting a round is just a `pop`.
+    """
+
+    def __init__(self, words: Iterable[str], resolve: Callable[[List[str]], Dict[str, Optional[str]]], store, warm: Optional[Callable[[List[str]], None]] = None, size: int = 16, batch_size: int = 500, retry_delay: float = 5.0, rng: Optional[random.Random] = None):
+        self.resolve = resolve
+        self.store = store
+        self.warm = warm
+        self.size = size
+        self.batch_size = batch_size
+        self.retry_delay = retry_delay
+        self.rng = rng or random.Random()
+        resolved = store.get_words()
+        self._unresolved = [word for word in dict.fromkeys(words) if word not in resolved]
+        self._titles: List[str] = []
+        self._known = set()
+        self._add_titles(resolved.values())
+        self._ready: Deque[str] = deque()
+        self._changed = threading.Condition()
+        self._stopped = False
+        self._worker: Optional[threading.Thread] = None
+
+    def _add_titles(self, titles: Iterable[Optional[str]]):
+        for title in titles:
+            if title is not None and title not in self._known and is_regular_page(title):
+                self._known.add(title)
+                self._titles.append(title)
+
+    def __len__(self) -> int:
+        """The number of distinct titles found so far."""
+        return len(self._titles)
+
+    @property
+    def unresolved(self) -> int:
+        return len(self._unresolved)
+
+    def start(self) -> "StartPagePool":
+        """Start resolving and warming pages on a background thread."""
+        with self._changed:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name="start-pages", daemon=True)
+                self._worker.start()
+        return self
+
+    def stop(self):
+        with self._changed:
+            self._stopped = True
+            self._changed.notify_all()
+
+    def sample(self, k: int = 1) -> List[str]:
+        """Up to `k` different titles, drawn uniformly from every distinct title found so far."""
+        with self._changed:
+            return self.rng.sample(self._titles, min(k, len(self._titles)))
+
+    def pop(self) -> Optional[str]:
+        """A warmed title if one is ready, else a fresh draw, or None if no word has resolved yet."""
+        with self._changed:
+            title = self._ready.popleft() if self._ready else None
+            self._changed.notify_all()
+        if title is None:
+            drawn = self.sample()
+            title = drawn[0] if drawn else None
+        return title
+
+    def resolve_batch(self) -> int:
+        """Resolve and persist the next batch of words; returns how many were resolved."""
+        with self._changed:
+            batch = self._unresolved[:self.batch_size]
+        if not batch:
+            return 0
+        titles = self.resolve(batch)
+        self.store.put_words({word: titles.get(word) for word in batch})
+        with self._changed:
+            del self._unresolved[:len(batch)]
+            self._add_titles(titles.get(word) for word in batch)
+            self._changed.notify_all()
+        return len(batch)
+
+    def refill(self) -> int:
+        """Draw and warm titles until `size` are ready; returns how many were added."""
+        with self._changed:
+            ready = set(self._ready)
+            wanted = self.size - len(self._ready)
+            candidates = [title for title in self.rng.sample(self._titles, min(len(self._titles), wanted + len(ready))) if title not in ready][:max(wanted, 0)]
+        if not candidates:
+            return 0
+        if self.warm is not None:
+            self.warm(candidates)
+        with self._changed:
+            self._ready.extend(candidates)
+        return len(candidates)
+
+    def _run(self):
+        while True:
+            with self._changed:
+                # Nothing left to resolve and nothing to add to the pool: sleep until a page is taken
+                while not self._stopped and not self._unresolved and len(self._ready) >= min(self.size, len(self._titles)):
+                    self._changed.wait()
+                if self._stopped:
+                    return
+            try:
+                # Keep the pool topped up first; resolving the rest of the dictionary can wait
+                if not self.refill():
+                    self.resolve_batch()
+            except Exception:
+                time.sleep(self.retry_delay)  # The API is unreachable; these words are retried
@@ -0,0 +1,16 @@
+import os
+import pytest
+import tempfile
+from fake_wikipedia import FakeWikipedia
+
+# Module-level caches open on import; keep them, and anything written to them, out of the working copy
+_cache_dir = tempfile.mkdtemp(prefix="wikibacon-test-")
+os.environ["WIKIBACON_CACHE"] = os.path.join(_cache_dir, "pages.db")
+os.environ["WIKIBACON_EMBEDDINGS"] = os.path.join(_cache_dir, "embeddings")
+
+@pytest.fixture
+def fake_wikipedia():
+    """A local HTTP server that answers MediaWiki API queries from TEST_PAGES"""
+    from test_wiki import TEST_PAGES
+    with FakeWikipedia(TEST_PAGES, redirects={"Blueberries": "Blueberry"}) as fake:
+        yield fake
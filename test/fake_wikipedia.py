@@ -0,0 +1,111 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List
+from urllib.parse import parse_qs, urlparse
+
+class FakeWikipedia:
+    """A local stand-in for the MediaWiki action API, serving pages from a dict like TEST_PAGES.
+
+    Results are split into small continuation chunks so clients have to follow `continue`.
+    """
+
+    def __init__(self, pages: Dict[str, Dict], redirects: Dict[str, str] = None, chunk_size: int = 2):
+        self.pages = pages
+        self.redirects = redirects or {}
+        self.chunk_size = chunk_size
+        self.requests: List[Dict[str, str]] = []
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                params = {key: values[-1] for key, values in parse_qs(urlparse(self.path).query).items()}
+                fake.requests.append(params)
+                body = json.dumps(fake.handle(params)).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/w/api.php"
+        self.thread = threading.Thread(target=self.server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+    @staticmethod
+    def normalize(title: str) -> str:
+        title = title.replace("_", " ").strip()
+        return title[:1].upper() + title[1:]
+
+    def handle(self, params: Dict[str, str]) -> Dict:
+        if params.get("action") != "query":
+            return {"error": {"code": "badvalue", "info": "Unsupported action"}}
+        query = {"normalized": [], "redirects": [], "pages": []}
+        resolved = []
+        for title in params.get("titles", "").split("|"):
+            normalized = self.normalize(title)
+            if normalized != title:
+                query["normalized"].append({"from": title, "to": normalized})
+            if normalized in self.redirects and params.get("redirects"):
+                query["redirects"].append({"from": normalized, "to": self.redirects[normalized]})
+                normalized = self.redirects[normalized]
+            if normalized not in resolved:
+                resolved.append(normalized)
+
+        props = params.get("prop", "").split("|")
+        # A module that finished in an earlier round is not repeated while others continue
+        first_round = not any(token in params for token in ("plcontinue", "clcontinue", "lhcontinue"))
+        continuation = {}
+        entries = {}
+        for title in resolved:
+            if title not in self.pages:
+                query["pages"].append({"ns": 0, "title": title, "missing": True})
+                continue
+            entries[title] = {"ns": 0, "title": title}
+            query["pages"].append(entries[title])
+
+        backlinks = {title: [source for source, page in self.pages.items() if title in page.get("links", [])] for title in entries}
+        for prop, key, token, ns, prefix in (
+            ("links", "links", "plcontinue", 0, ""),
+            ("categories", "categories", "clcontinue", 14, "Category:"),
+            ("linkshere", "linkshere", "lhcontinue", 0, ""),
+        ):
+            if prop not in props or not (first_round or token in params):
+                continue
+            if prop == "linkshere":
+                items = [(title, source) for title in entries for source in backlinks[title]]
+            else:
+                items = [(title, item) for title in entries for item in self.pages[title].get(key, [])]
+            offset = int(params.get(token, 0))
+            for title, item in items[offset:offset + self.chunk_size]:
+                entries[title].setdefault(key, []).append({"ns": ns, "title": prefix + item})
+            if offset + self.chunk_size < len(items):
+                continuation[token] = str(offset + self.chunk_size)
+
+        if "extracts" in props and first_round:
+            for title, entry in entries.items():
+                entry["extract"] = self.pages[title]["summary"]
+        if "pageprops" in props and first_round:
+            for title, entry in entries.items():
+                if title.endswith("(disambiguation)"):
+                    entry["pageprops"] = {"disambiguation": ""}
+        if "info" in props and first_round:
+            for title, entry in entries.items():
+                entry["lastrevid"] = self.pages[title].get("revid", 1)
+
+        response = {"batchcomplete": not continuation, "query": query}
+        if continuation:
+            continuation["continue"] = "||"
+            response["continue"] = continuation
+        return response
@@ -0,0 +1,136 @@
+import numpy as np
+import pytest
+import time
+import embeddings
+import wiki
+import cache
+from backends import ApiBackend, CacheBackend, DictBackend
+from fetcher import RateLimiter
+from mediawiki import MediaWikiClient
+from test_wiki import TEST_PAGES
+
+@pytest.fixture
+def static_vectors(tmp_path, monkeypatch):
+    """Rank with a tiny word-vector table, so searches need neither spacy nor the network"""
+    vectorizer = embeddings.StaticVectorizer({
+        "blue": np.array([1.0, 0.0], dtype=np.float32),
+        "water": np.array([0.0, 1.0], dtype=np.float32),
+    })
+    monkeypatch.setattr(embeddings, "vectorizer", vectorizer)
+    monkeypatch.setattr(embeddings, "embedding_store", embeddings.EmbeddingStore(str(tmp_path / "embeddings")))
+
+def test_neighbours_are_filtered_the_same_way_for_every_backend():
+    graph = DictBackend(TEST_PAGES)
+    assert graph.neighbours("Blueberry") == ["Apple", "Mushroom Kingdom Warp Pipe", "Fruit", "Blue Things"]
+    assert graph.neighbours("Blueberry", hard_mode=True) == ["Apple", "Mushroom Kingdom Warp Pipe"]
+    assert graph.neighbours("Orphan (graph theory)") == []
+    assert graph.neighbours("Nowhere") == []
+
+def test_dict_backend_knows_its_backlinks():
+    graph = DictBackend(TEST_PAGES)
+    assert graph.reverse_neighbours("Ocean") == ["River", "Blue Things"]
+    assert graph.reverse_neighbours("Blueberry") == ["Apple", "Mushroom Kingdom Warp Pipe", "Fruit", "Blue Things"]
+    # Hard mode only follows links, so reaching a page as a category does not count
+    assert graph.reverse_neighbours("Fruit", hard_mode=True) == []
+    # The disambiguation page links to the orphan, but is never a step on a path
+    assert graph.reverse_neighbours("Orphan (graph theory)") == []
+
+def test_search_a_local_graph(static_vectors):
+    graph = DictBackend(TEST_PAGES)
+    result = wiki.search_path("Blueberry", "Ocean", graph)
+    assert result.reason == "found"
+    assert result.path == ["Blueberry", "Blue Things", "Ocean"]
+
+    result = wiki.search_path("Blueberry", "Bridgerton", graph, hard_mode=True)
+    assert len(result.path) == 5
+    for source, dest in zip(result.path, result.path[1:]):
+        assert dest in TEST_PAGES[source]["links"]
+
+def test_fallbacks_read_through_the_backend():
+    class Page:
+        def __init__(self, title):
+            self.title = title
+
+    graph = DictBackend({"A": {"links": ["Music", "Human"]}, "B": {"links": ["Music"]}})
+    assert wiki._try_hard_mode_fallback(Page("A"), Page("B"), graph) == ["A", "Music", "B"]
+
+def test_api_backend_keeps_recent_pages(fake_wikipedia):
+    graph = ApiBackend(MediaWikiClient(fake_wikipedia.url))
+    graph.prefetch(["Apple", "Netflix"])
+    requests_made = len(fake_wikipedia.requests)
+    assert graph.links("Apple") == TEST_PAGES["Apple"]["links"]
+    assert graph.categories("Apple") == ["Fruit"]
+    assert graph.summary("Netflix").startswith("Netflix is a streaming service")
+    assert len(fake_wikipedia.requests) == requests_made
+
+def test_api_backend_requests_take_slots_from_its_limiter(fake_wikipedia):
+    limiter = RateLimiter(requests_per_second=10)
+    graph = ApiBackend(MediaWikiClient(fake_wikipedia.url), limiter=limiter)
+    began = time.monotonic()
+    graph.links("Apple")
+    graph.backlinks("River")
+    assert time.monotonic() - began >= 0.09
+    # Both requests were counted, so the next one waits its turn too
+    assert limiter.reserve() > 0.05
+
+def test_cache_backend_reads_backlinks_from_the_reverse_index(tmp_path, fake_wikipedia):
+    store = cache.TieredPageCache(cache.PageStore(str(tmp_path / "pages.db")))
+    graph = CacheBackend(store, ApiBackend(MediaWikiClient(fake_wikipedia.url)))
+    assert graph.reverse_neighbours("River") == ["Ocean", "Stream"]
+    assert {params["prop"] for params in fake_wikipedia.requests} == {"linkshere"}
+
+    # Cached category edges join the index, and each page's linkshere list is fetched once
+    store.put("Blueberry", [], ["Blue Things"])
+    assert graph.reverse_neighbours("River") == ["Ocean", "Stream"]
+    assert graph.reverse_neighbours("Blue Things") == ["Blueberry"]
+    assert graph.reverse_neighbours("Blue Things", hard_mode=True) == []
+    assert len({params["titles"] for params in fake_wikipedia.requests}) == 2
+    store.close()
+
+def test_failed_backlink_fetches_are_not_cached(tmp_path, fake_wikipedia):
+    store = cache.TieredPageCache(cache.PageStore(str(tmp_path / "pages.db")))
+    client = MediaWikiClient("http://127.0.0.1:9/w/api.php")
+    graph = CacheBackend(store, ApiBackend(client))
+    assert graph.reverse_neighbours("River") == []
+    assert not store.has_backlinks("River")
+    # Back online, the next search asks again
+    client.api_url = fake_wikipedia.url
+    assert graph.reverse_neighbours("River") == ["Ocean", "Stream"]
+    store.close()
+
+def test_missing_pages_are_cached_as_dead_ends(tmp_path, fake_wikipedia):
+    store = cache.TieredPageCache(cache.PageStore(str(tmp_path / "pages.db")))
+    client = MediaWikiClient("http://127.0.0.1:9/w/api.php")
+    graph = CacheBackend(store, ApiBackend(client))
+    # A failed fetch says nothing about the page, so it is not stored
+    assert graph.neighbours("Lake") == []
+    assert not store.is_cached("Lake")
+    client.api_url = fake_wikipedia.url
+    assert graph.neighbours("Lake") == []
+    assert graph.neighbours("Lake") == []
+    assert len(fake_wikipedia.requests) == 1
+    store.close()
+
+def test_hard_mode_reads_the_same_cached_links(tmp_path, fake_wikipedia):
+    store = cache.TieredPageCache(cache.PageStore(str(tmp_path / "pages.db")))
+    graph = CacheBackend(store, ApiBackend(MediaWikiClient(fake_wikipedia.url)))
+    assert graph.neighbours("Blueberry") == ["Apple", "Mushroom Kingdom Warp Pipe", "Fruit", "Blue Things"]
+    requests_made = len(fake_wikipedia.requests)
+    assert graph.neighbours("Blueberry", hard_mode=True) == ["Apple", "Mushroom Kingdom Warp Pipe"]
+    assert len(fake_wikipedia.requests) == requests_made
+    store.close()
+
+def test_hard_mode_refetches_pages_from_the_old_cache(tmp_path, fake_wikipedia):
+    path = str(tmp_path / "pages.db")
+    conn = cache.connect(path)
+    with conn:
+        page_id = cache._page_id(conn, "Blueberry", fetched=True)
+        cache._insert_edges(conn, page_id, ["Apple", "Fruit"], cache.LEGACY)
+    store = cache.TieredPageCache(cache.PageStore(path))
+    graph = CacheBackend(store, ApiBackend(MediaWikiClient(fake_wikipedia.url)))
+    # Old entries mixed links and categories, which is fine outside hard mode
+    assert graph.neighbours("Blueberry") == ["Apple", "Fruit"]
+    assert fake_wikipedia.requests == []
+    assert graph.neighbours("Blueberry", hard_mode=True) == ["Apple", "Mushroom Kingdom Warp Pipe"]
+    assert store.get_links("Blueberry", (cache.CATEGORY,)) == ["Fruit", "Blue Things"]
+    store.close()
@@ -0,0 +1,42 @@
+import json
+from backends import DictBackend
+from benchmark import LatencyBackend, generate_graph, regressions, run_benchmark, sample_pairs, synthetic_embeddings
+
+def test_graphs_are_reproducible_and_shaped():
+    small_world = generate_graph(300, degree=6, seed=1)
+    assert small_world == generate_graph(300, degree=6, seed=1)
+    assert len(small_world) == 300
+    hubs = generate_graph(300, degree=3, shape="hubs", seed=1)
+    in_degree = {}
+    for graph, name in ((small_world, "small_world"), (hubs, "hubs")):
+        counts = {}
+        for page in graph.values():
+            for link in page["links"]:
+                counts[link] = counts.get(link, 0) + 1
+        in_degree[name] = max(counts.values())
+    # Preferential attachment grows hubs far above the ring's even spread
+    assert in_degree["hubs"] > 3 * in_degree["small_world"]
+
+def test_latency_is_paid_once_per_page_and_batch():
+    graph = DictBackend(generate_graph(20, degree=2))
+    network = LatencyBackend(graph, latency=0.001)
+    title = next(iter(graph.pages))
+    network.links(title)
+    network.categories(title)
+    network.prefetch([other for other in graph.pages if other != title][:5])
+    network.pool.shutdown(wait=True)
+    assert (network.fetches, network.requests) == (6, 2)
+    network.reset()
+    assert (network.fetches, network.requests) == (0, 0)
+
+def test_benchmark_reports_valid_paths_as_json():
+    pages = generate_graph(200, degree=6, seed=2)
+    with synthetic_embeddings(pages, seed=2):
+        report = run_benchmark(pages, sample_pairs(pages, 3, seed=2), latency=0.001)
+    summary = json.loads(json.dumps(report))["summary"]
+    assert summary["queries"] == 3 and summary["valid_ratio"] == 1.0
+    assert summary["p50_seconds"] <= summary["p95_seconds"]
+    assert all(query["fetches"] > 0 and query["path_length"] >= 2 for query in report["queries"])
+    assert regressions(report, report) == []
+    slower = {"summary": {**summary, "p95_seconds": summary["p95_seconds"] * 2, "valid_ratio": 0.5}}
+    assert len(regressions(slower, report)) == 2
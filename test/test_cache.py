@@ -0,0 +1,341 @@
+import gc
+import json
+import pytest
+import sqlite3
+import threading
+import time
+import cache
+import filters
+from mediawiki import PageRecord
+
+def test_store_and_read_links_by_kind(tmp_path):
+    conn = cache.connect(str(tmp_path / "pages.db"))
+    assert cache.get_links(conn, "Apple") is None
+    cache.store_page(conn, "Apple", ["Apple Computer", "Blueberry"], ["Fruit"])
+    assert cache.get_links(conn, "Apple") == ["Apple Computer", "Blueberry", "Fruit"]
+    assert cache.get_links(conn, "Apple", kinds=(cache.LINK,)) == ["Apple Computer", "Blueberry"]
+    assert cache.get_links(conn, "Apple", kinds=(cache.CATEGORY,)) == ["Fruit"]
+    # Seen only as a link target, so not cached yet
+    assert cache.get_links(conn, "Blueberry") is None
+
+def test_restoring_a_page_replaces_its_edges(tmp_path):
+    conn = cache.connect(str(tmp_path / "pages.db"))
+    cache.store_page(conn, "Apple", ["Blueberry"], [])
+    cache.store_page(conn, "Apple", ["Netflix"], [])
+    assert cache.get_links(conn, "Apple") == ["Netflix"]
+    assert conn.execute("SELECT COUNT(*) FROM pages WHERE title = 'Apple'").fetchone()[0] == 1
+
+def test_pages_keep_their_id_when_stored_again(tmp_path):
+    path = str(tmp_path / "pages.db")
+    conn = cache.connect(path)
+    cache.store_page(conn, "Blueberry", ["Apple"], [])
+    apple = conn.execute("SELECT id FROM pages WHERE title = 'Apple'").fetchone()[0]
+    cache.store_page(conn, "Apple", ["Netflix"], [])
+    assert conn.execute("SELECT id FROM pages WHERE title = 'Apple'").fetchone()[0] == apple
+    assert cache.get_backlinks(conn, "Apple") == ["Blueberry"]
+
+    # Writers racing to store one page leave a single row holding one of their edge lists
+    def store(links):
+        cache.store_page(cache.connect(path), "Fruit", links, [])
+    threads = [threading.Thread(target=store, args=([f"Link {i}"],)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert conn.execute("SELECT COUNT(*) FROM pages WHERE title = 'Fruit'").fetchone()[0] == 1
+    assert len(cache.get_links(conn, "Fruit")) == 1
+
+def test_reverse_index_covers_cached_edges_and_fetched_backlinks(tmp_path):
+    conn = cache.connect(str(tmp_path / "pages.db"))
+    cache.store_page(conn, "Apple", ["Blueberry"], ["Fruit"])
+    cache.store_page(conn, "Fruit", ["Blueberry"], [])
+    assert cache.get_backlinks(conn, "Blueberry") == ["Apple", "Fruit"]
+    assert cache.get_backlinks(conn, "Fruit", kinds=(cache.LINK,)) == []
+    assert not cache.has_backlinks(conn, "Blueberry")
+
+    cache.store_backlinks(conn, "Blueberry", ["Apple", "Mushroom Kingdom Warp Pipe"])
+    assert cache.has_backlinks(conn, "Blueberry")
+    assert cache.get_backlinks(conn, "Blueberry") == ["Apple", "Fruit", "Mushroom Kingdom Warp Pipe"]
+    # The linking page itself is still not cached
+    assert cache.get_links(conn, "Mushroom Kingdom Warp Pipe") is None
+
+def test_page_store_backlinks_include_pending_writes(tmp_path):
+    store = cache.PageStore(str(tmp_path / "pages.db"), flush_size=100, flush_interval=60)
+    store.put("Apple", ["Blueberry"], [])
+    store.flush()
+    store.put("Apple", ["Netflix"], [])
+    store.put("Fruit", ["Blueberry"], [])
+    assert store.get_backlinks("Blueberry") == ["Fruit"]
+    store.flush()
+    assert store.get_backlinks("Blueberry") == ["Fruit"]
+    assert store.get_backlinks("Netflix") == ["Apple"]
+    store.close()
+
+def test_titles_resolve_by_normalized_name_then_ignoring_case(tmp_path):
+    conn = cache.connect(str(tmp_path / "pages.db"))
+    cache.store_title(conn, "river_bank", "Bank (geography)", resolved_at=10)
+    cache.store_title(conn, "foh", None, resolved_at=20)
+    assert cache.get_title(conn, "River bank") == ("Bank (geography)", 10)
+    assert cache.get_title(conn, "RIVER BANK") == ("Bank (geography)", 10)
+    assert cache.get_title(conn, "bank (Geography)") == ("Bank (geography)", 10)
+    assert cache.get_title(conn, "Foh") == (None, 20)
+    # Misses only match their exact name
+    assert cache.get_title(conn, "FOH") is None
+
+def test_filtered_edges_are_left_out_by_stored_flags(tmp_path, monkeypatch):
+    path = str(tmp_path / "pages.db")
+    conn = cache.connect(path)
+    cache.store_page(conn, "Blueberry", ["Apple", "All (disambiguation)"], ["Fruit", "Stub"])
+    cache.store_page(conn, "All (disambiguation)", ["Blueberry"], [])
+    normal, hard = filters.excluded(), filters.excluded(hard_mode=True)
+    assert cache.get_links(conn, "Blueberry", exclude=normal) == ["Apple", "Fruit"]
+    assert cache.get_links(conn, "Blueberry", (cache.LINK, cache.CATEGORY), exclude=hard) == ["Apple", "Fruit", "Stub"]
+    assert cache.get_backlinks(conn, "Blueberry", exclude=normal) == []
+
+    # Memory and pending pages carry the same flags
+    store = cache.TieredPageCache(cache.PageStore(str(tmp_path / "other.db")))
+    store.put("Blueberry", ["Apple", "All (disambiguation)"], ["Fruit", "Stub"])
+    assert store.get_links("Blueberry", exclude=normal) == ["Apple", "Fruit"]
+    store.close()
+
+    # New rules recompute the stored flags when the cache is next opened
+    rules = tmp_path / "rules.json"
+    rules.write_text(json.dumps({"meta_page": ["apple"]}))
+    monkeypatch.setattr(filters, "engine", filters.FilterEngine.load(str(rules)))
+    assert cache.get_links(cache.connect(path), "Blueberry", exclude=normal) == ["All (disambiguation)", "Fruit", "Stub"]
+
+def test_results_are_stored_by_start_target_and_mode(tmp_path, monkeypatch):
+    path = str(tmp_path / "pages.db")
+    conn = cache.connect(path)
+    cache.store_result(conn, "Apple", "Ocean", False, ["Apple", "Water", "Ocean"], found_at=100.0)
+    assert cache.get_result(conn, "Apple", "Ocean") == (["Apple", "Water", "Ocean"], 100.0)
+    assert cache.get_result(conn, "Apple", "Ocean", hard_mode=True) is None
+    assert cache.get_result(conn, "Ocean", "Apple") is None
+
+    # Paths found under other filter rules may pass through pages the new rules rule out
+    rules = tmp_path / "rules.json"
+    rules.write_text(json.dumps({"meta_page": ["water"]}))
+    monkeypatch.setattr(filters, "engine", filters.FilterEngine.load(str(rules)))
+    assert cache.get_result(cache.connect(path), "Apple", "Ocean") is None
+
+def test_lookups_use_indexes(tmp_path):
+    conn = cache.connect(str(tmp_path / "pages.db"))
+    plans = [
+        " ".join(row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + sql, args))
+        for sql, args in (
+            ("SELECT id FROM pages WHERE title = ?", ("Apple",)),
+            ("SELECT dst_id FROM edges WHERE src_id = ? AND kind = ?", (1, cache.LINK)),
+            ("SELECT src_id FROM edges WHERE dst_id = ? AND kind = ?", (1, cache.LINK)),
+        )
+    ]
+    assert all("USING" in plan and "INDEX" in plan for plan in plans)
+
+def test_migrates_legacy_json_cache(tmp_path):
+    path = str(tmp_path / "pages.db")
+    legacy = sqlite3.connect(path)
+    legacy.execute("CREATE TABLE pages (name TEXT, links TEXT)")
+    legacy.execute("INSERT INTO pages VALUES (?, ?)", ("Apple", json.dumps(["Blueberry", "Fruit"])))
+    legacy.execute("INSERT INTO pages VALUES (?, ?)", ("Apple", json.dumps(["Blueberry", "Fruit"])))
+    legacy.execute("INSERT INTO pages VALUES (?, ?)", ("Broken", "not json"))
+    legacy.commit()
+    legacy.close()
+
+    conn = cache.connect(path)
+    assert cache.get_links(conn, "Apple") == ["Blueberry", "Fruit"]
+    # Old entries cannot tell links from categories, so asking for links alone is a miss
+    assert cache.get_links(conn, "Apple", kinds=(cache.LINK,)) is None
+    assert cache.get_links(conn, "Broken") is None
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == cache.SCHEMA_VERSION
+    # Migrating again is a no-op
+    cache.migrate(conn)
+    assert cache.get_links(conn, "Apple") == ["Blueberry", "Fruit"]
+
+def test_failed_migration_step_leaves_the_schema_as_it_was(tmp_path, monkeypatch):
+    path = str(tmp_path / "pages.db")
+    cache.connect(path).close()
+
+    def half_done(conn):
+        conn.execute("ALTER TABLE pages ADD COLUMN half REAL")
+        raise sqlite3.OperationalError("interrupted")
+
+    monkeypatch.setattr(cache, "MIGRATIONS", cache.MIGRATIONS + [half_done])
+    monkeypatch.setattr(cache, "SCHEMA_VERSION", len(cache.MIGRATIONS))
+    conn = sqlite3.connect(path)
+    with pytest.raises(sqlite3.OperationalError):
+        cache.migrate(conn)
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == cache.SCHEMA_VERSION - 1
+    assert "half" not in [row[1] for row in conn.execute("PRAGMA table_info(pages)")]
+
+def test_page_store_reuses_one_connection_per_thread(tmp_path):
+    store = cache.PageStore(str(tmp_path / "pages.db"))
+    assert store.connection() is store.connection()
+    assert store.connection().execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    other = []
+    thread = threading.Thread(target=lambda: other.append(store.connection()))
+    thread.start()
+    thread.join()
+    assert other[0] is not store.connection()
+    # The thread has exited, so its connection is closed
+    gc.collect()
+    assert store._connections == [store.connection()]
+    with pytest.raises(sqlite3.ProgrammingError):
+        other[0].execute("SELECT 1")
+    store.close()
+
+def test_page_store_opens_the_database_on_first_use(tmp_path):
+    path = tmp_path / "pages.db"
+    store = cache.TieredPageCache(cache.PageStore(str(path)))
+    # Nothing to write, so exiting does not create it either
+    store.flush()
+    assert not path.exists()
+    assert store.get_links("Apple") is None
+    assert path.exists()
+    store.close()
+
+def test_page_store_batches_writes_until_size_limit(tmp_path):
+    path = str(tmp_path / "pages.db")
+    store = cache.PageStore(path, flush_size=2, flush_interval=60)
+    reader = cache.connect(path)
+    store.put("Apple", ["Blueberry"], ["Fruit"])
+    # Served from memory before it is committed
+    assert store.get_links("Apple") == ["Blueberry", "Fruit"]
+    assert store.get_links("Apple", kinds=(cache.CATEGORY,)) == ["Fruit"]
+    assert cache.get_links(reader, "Apple") is None
+    store.put("Netflix", ["Bridgerton"], [])
+    assert cache.get_links(reader, "Apple") == ["Blueberry", "Fruit"]
+    assert cache.get_links(reader, "Netflix") == ["Bridgerton"]
+    store.close()
+
+def test_page_store_flushes_after_interval(tmp_path):
+    path = str(tmp_path / "pages.db")
+    store = cache.PageStore(path, flush_size=100, flush_interval=0.05)
+    store.put("Apple", ["Blueberry"], [])
+    reader = cache.connect(path)
+    deadline = time.monotonic() + 2
+    while cache.get_links(reader, "Apple") is None and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert cache.get_links(reader, "Apple") == ["Blueberry"]
+
+    # Later batches are committed by the same flusher thread
+    flusher = store._flusher
+    store.put("Netflix", ["Bridgerton"], [])
+    deadline = time.monotonic() + 2
+    while cache.get_links(reader, "Netflix") is None and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert cache.get_links(reader, "Netflix") == ["Bridgerton"]
+    assert store._flusher is flusher and flusher.is_alive()
+    store.close()
+    assert not flusher.is_alive()
+
+def test_lru_evicts_least_recently_used():
+    lru = cache.LRUCache(2)
+    lru.put("a", 1)
+    lru.put("b", 2)
+    assert lru.get("a") == 1
+    lru.put("c", 3)
+    assert "b" not in lru
+    assert lru.get("b") is None
+    assert lru.stats() == {"hits": 1, "misses": 1, "evictions": 1, "entries": 2, "size": 2}
+
+def test_lru_respects_memory_budget():
+    lru = cache.LRUCache(10, sizeof=len)
+    lru.put("a", "x" * 6)
+    lru.put("b", "x" * 6)
+    assert "a" not in lru and lru.size == 6
+    lru.put("c", "x" * 11)
+    assert "c" not in lru
+
+def test_lru_setdefault_keeps_the_first_value_and_resize_remeasures_it():
+    lru = cache.LRUCache(10, sizeof=len)
+    first = ["x"]
+    assert lru.setdefault("a", first) is first
+    assert lru.setdefault("a", ["y"]) is first
+    first.extend("x" * 5)
+    lru.resize("a")
+    assert lru.size == 6
+    lru.put("b", "x" * 6)
+    assert "a" not in lru and lru.size == 6
+
+def test_tiered_cache_serves_repeat_lookups_from_memory(tmp_path):
+    path = str(tmp_path / "pages.db")
+    writer = cache.PageStore(path)
+    cache.store_page(writer.connection(), "Apple", ["Blueberry"], ["Fruit"])
+    tiered = cache.TieredPageCache(cache.PageStore(path))
+    assert tiered.get_links("Apple") == ["Blueberry", "Fruit"]
+    assert tiered.get_links("Apple", kinds=(cache.LINK,)) == ["Blueberry"]
+    assert tiered.get_links("Netflix") is None
+    assert tiered.stats()["hits"] == 1
+    assert tiered.stats()["misses"] == 2
+    tiered.put("Netflix", ["Bridgerton"], [])
+    assert tiered.get_links("Netflix") == ["Bridgerton"]
+    assert tiered.stats()["hits"] == 2
+
+def test_pages_record_freshness(tmp_path):
+    store = cache.PageStore(str(tmp_path / "pages.db"))
+    cache.store_page(store.connection(), "Apple", ["Blueberry"], [], revid=7, fetched_at=100.0)
+    page = store.get("Apple")
+    assert (page.revid, page.fetched_at) == (7, 100.0)
+    assert page.is_stale(ttl=10, now=200.0)
+    assert not page.is_stale(ttl=1000, now=200.0)
+    store.touch("Apple", 8, fetched_at=150.0)
+    page = store.get("Apple")
+    assert (page.revid, page.fetched_at) == (8, 150.0)
+    assert page.links() == ["Blueberry"]
+
+def test_stale_pages_are_served_and_queued_for_refresh(tmp_path):
+    stale = []
+    tiered = cache.TieredPageCache(cache.PageStore(str(tmp_path / "pages.db")), ttl=60, on_stale=stale.append)
+    tiered.put("Apple", ["Blueberry"], [], revid=1, fetched_at=time.time() - 120)
+    tiered.put("Netflix", ["Bridgerton"], [], revid=1)
+    assert tiered.get_links("Apple") == ["Blueberry"]
+    assert tiered.get_links("Netflix") == ["Bridgerton"]
+    assert stale == ["Apple"]
+
+def test_revalidator_only_redownloads_changed_pages(tmp_path):
+    tiered = cache.TieredPageCache(cache.PageStore(str(tmp_path / "pages.db")), ttl=60)
+    old = time.time() - 120
+    tiered.put("Apple", ["Blueberry"], [], revid=1, fetched_at=old)
+    tiered.put("Netflix", ["Stream"], [], revid=1, fetched_at=old)
+    downloaded = []
+
+    def fetch_pages(titles):
+        downloaded.extend(titles)
+        return {title: PageRecord(title, ["Bridgerton"], [], revid=2) for title in titles}
+
+    revalidator = cache.Revalidator(tiered, fetch_revisions=lambda titles: {"Apple": 1, "Netflix": 2}, fetch_pages=fetch_pages)
+    revalidator.submit("Apple")
+    revalidator.submit("Netflix")
+    revalidator.submit("Apple")
+    revalidator.join()
+    assert downloaded == ["Netflix"]
+    assert not tiered.get("Apple").is_stale(60)
+    assert tiered.get_links("Apple") == ["Blueberry"]
+    assert tiered.get_links("Netflix") == ["Bridgerton"]
+    assert (revalidator.revalidated, revalidator.refreshed) == (1, 1)
+
+def test_revalidator_evicts_missing_pages_and_backs_off_after_failures(tmp_path):
+    tiered = cache.TieredPageCache(cache.PageStore(str(tmp_path / "pages.db")), ttl=60)
+    old = time.time() - 120
+    tiered.put("Apple", ["Blueberry"], [], revid=1, fetched_at=old)
+    tiered.put("Netflix", ["Stream"], [], revid=1, fetched_at=old)
+    tiered.flush()
+    revalidator = cache.Revalidator(tiered, fetch_revisions=lambda titles: {"Apple": None}, fetch_pages=lambda titles: {})
+    revalidator.submit("Apple")
+    revalidator.join()
+    # A page the API no longer has is dropped instead of going stale again on every read
+    assert not tiered.is_cached("Apple") and tiered.get_links("Apple") is None
+    assert revalidator.evicted == 1
+
+    calls = []
+
+    def failing(titles):
+        calls.append(titles)
+        raise ConnectionError("offline")
+
+    revalidator = cache.Revalidator(tiered, fetch_revisions=failing, fetch_pages=lambda titles: {}, retry_after=60)
+    revalidator.submit("Netflix")
+    revalidator.join()
+    revalidator.submit("Netflix")
+    revalidator.join()
+    assert calls == [["Netflix"]]
+    assert tiered.get_links("Netflix") == ["Stream"]
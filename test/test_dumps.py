@@ -0,0 +1,81 @@
+import gzip
+import dumps
+from cache import CATEGORY, LINK
+
+PAGE_DUMP = """-- MySQL dump
+INSERT INTO `page` VALUES (1,0,'Blueberry',0,0,0.5,'20240101000000',NULL,1,10,'wikitext',NULL),(2,0,'Apple',0,0,0.1,'20240101000000',NULL,2,10,'wikitext',NULL),(3,0,'Bowser\\'s_Castle_(level)',0,0,0.2,'20240101000000',NULL,3,10,'wikitext',NULL);
+INSERT INTO `page` VALUES (4,0,'Apples',1,0,0.3,'20240101000000',NULL,4,10,'wikitext',NULL),(5,1,'Apple',0,0,0.4,'20240101000000',NULL,5,10,'wikitext',NULL);
+"""
+
+PAGELINKS_DUMP = """INSERT INTO `pagelinks` VALUES (1,0,'Apples',0),(1,0,'Bowser\\'s_Castle_(level)',0),(2,0,'Blueberry',0),(5,0,'Blueberry',1),(1,0,'Nowhere',0),(4,0,'Blueberry',0);
+"""
+
+CATEGORYLINKS_DUMP = """INSERT INTO `categorylinks` VALUES (1,'Blue_things','BLUEBERRY','2024-01-01 00:00:00','','uppercase','page'),(2,'Fruit','APPLE','2024-01-01 00:00:00','','uppercase','page'),(1,'Fruit','BLUEBERRY','2024-01-01 00:00:00','','uppercase','page');
+"""
+
+REDIRECT_DUMP = """INSERT INTO `redirect` VALUES (4,0,'Apple','',''); 
+"""
+
+def write(path, text):
+    with gzip.open(path, "wt", encoding="utf-8") as f:
+        f.write(text)
+    return str(path)
+
+def test_iter_rows_unescapes_strings(tmp_path):
+    rows = list(dumps.iter_rows(write(tmp_path / "page.sql.gz", PAGE_DUMP), "page"))
+    assert [row[:4] for row in rows] == [
+        (1, 0, "Blueberry", 0), (2, 0, "Apple", 0), (3, 0, "Bowser's_Castle_(level)", 0),
+        (4, 0, "Apples", 1), (5, 1, "Apple", 0),
+    ]
+    assert rows[0][5] == 0.5 and rows[0][7] is None
+
+def test_iter_rows_reads_floats_in_exponent_form(tmp_path):
+    dump = "INSERT INTO `page` VALUES (1,0,'Blueberry',1e-05,-2.5E+3,7);\n"
+    assert list(dumps.iter_rows(write(tmp_path / "page.sql.gz", dump), "page")) == [(1, 0, "Blueberry", 1e-05, -2500.0, 7)]
+
+def test_build_link_graph(tmp_path):
+    graph = dumps.build_link_graph(
+        write(tmp_path / "page.sql.gz", PAGE_DUMP),
+        write(tmp_path / "pagelinks.sql.gz", PAGELINKS_DUMP),
+        str(tmp_path / "graph"),
+        categorylinks_dump=write(tmp_path / "categorylinks.sql.gz", CATEGORYLINKS_DUMP),
+        redirect_dump=write(tmp_path / "redirect.sql.gz", REDIRECT_DUMP),
+    )
+    # Redirects are resolved, talk pages and red links dropped, categories kept apart
+    assert graph.neighbours("Blueberry") == ["Apple", "Bowser's Castle (level)", "Blue things", "Fruit"]
+    assert graph.neighbours("Blueberry", kinds=(LINK,)) == ["Apple", "Bowser's Castle (level)"]
+    assert graph.neighbours("Apple", kinds=(CATEGORY,)) == ["Fruit"]
+    assert graph.neighbours("Fruit") == []
+    assert graph.neighbours("Apples") is None
+    assert graph.num_edges == 6
+    assert graph.reverse_neighbours("Blueberry") == ["Apple"]
+    assert graph.reverse_neighbours("Fruit") == ["Apple", "Blueberry"]
+    assert graph.reverse_neighbours("Fruit", kinds=(LINK,)) == []
+
+def test_graphs_without_reverse_arrays_group_backlinks_on_load(tmp_path):
+    dumps.build_link_graph(
+        write(tmp_path / "page.sql.gz", PAGE_DUMP), write(tmp_path / "pagelinks.sql.gz", PAGELINKS_DUMP),
+        str(tmp_path / "graph"), categorylinks_dump=write(tmp_path / "categorylinks.sql.gz", CATEGORYLINKS_DUMP),
+    )
+    for name in ("reverse_offsets.npy", "reverse_targets.npy", "reverse_kinds.npy"):
+        (tmp_path / "graph" / name).unlink()
+    graph = dumps.LinkGraph(str(tmp_path / "graph"))
+    assert sorted(graph.reverse_neighbours("Fruit")) == ["Apple", "Blueberry"]
+    assert graph.reverse_neighbours("Bowser's Castle (level)", kinds=(LINK,)) == ["Blueberry"]
+
+def test_link_graph_is_memory_mapped(tmp_path):
+    dumps.build_link_graph(write(tmp_path / "page.sql.gz", PAGE_DUMP), write(tmp_path / "pagelinks.sql.gz", PAGELINKS_DUMP), str(tmp_path / "graph"))
+    graph = dumps.LinkGraph(str(tmp_path / "graph"))
+    assert graph.targets.dtype.name == "int32" and graph.offsets.dtype.name == "int64"
+    assert graph.targets.base is not None
+    assert graph.neighbours("Apple") == ["Blueberry"]
+
+def test_newer_pagelinks_layout_uses_linktarget(tmp_path):
+    pagelinks = "INSERT INTO `pagelinks` VALUES (1,0,10),(2,0,11);\n"
+    linktarget = "INSERT INTO `linktarget` VALUES (10,0,'Apple'),(11,0,'Blueberry');\n"
+    graph = dumps.build_link_graph(
+        write(tmp_path / "page.sql.gz", PAGE_DUMP), write(tmp_path / "pagelinks.sql.gz", pagelinks),
+        str(tmp_path / "graph"), linktarget_dump=write(tmp_path / "linktarget.sql.gz", linktarget),
+    )
+    assert graph.neighbours("Blueberry") == ["Apple"]
+    assert graph.neighbours("Apple") == ["Blueberry"]
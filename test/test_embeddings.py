@@ -0,0 +1,115 @@
+import numpy as np
+import os
+import subprocess
+import sys
+import pytest
+import embeddings
+
+@pytest.fixture
+def known_vectors(tmp_path, monkeypatch):
+    """Pre-seed a fresh embedding store so ranking is exact and spacy never runs"""
+    vectors = {
+        "goal": [1.0, 0.0],
+        "close": [0.9, 0.1],
+        "far": [0.0, 1.0],
+        "opposite": [-1.0, 0.0],
+        "empty": [0.0, 0.0],
+    }
+    store = embeddings.EmbeddingStore(str(tmp_path / "embeddings"))
+    store.add_many(list(vectors), np.array(list(vectors.values()), dtype=np.float32))
+    monkeypatch.setattr(embeddings, "embedding_store", store)
+    return vectors
+
+def test_similarities_are_cosine(known_vectors):
+    scores = embeddings.similarities(["close", "far", "opposite", "empty"], "goal")
+    assert scores == pytest.approx([0.9 / np.hypot(0.9, 0.1), 0.0, -1.0, 0.0])
+
+def test_rank_candidates_best_first(known_vectors):
+    ranked = embeddings.rank_candidates(["far", "opposite", "close"], "goal")
+    assert [title for title, _ in ranked] == ["close", "far", "opposite"]
+
+def test_rank_candidates_top_k(known_vectors):
+    ranked = embeddings.rank_candidates(["far", "opposite", "close", "empty"], "goal", top_k=2)
+    assert [title for title, _ in ranked] == ["close", "far"] or [title for title, _ in ranked] == ["close", "empty"]
+    assert embeddings.rank_candidates(["far"], "goal", top_k=0) == []
+
+def test_embed_batch_stacks_rows(known_vectors):
+    matrix = embeddings.embed_batch(["goal", "far", "goal"])
+    assert matrix.shape == (3, 2)
+    assert matrix.dtype == np.float32
+    assert (matrix[0] == matrix[2]).all()
+
+def test_store_persists_across_reopen(tmp_path):
+    path = str(tmp_path / "embeddings")
+    store = embeddings.EmbeddingStore(path, initial_capacity=2)
+    store.add_many(["a", "b"], np.array([[1, 2], [3, 4]], dtype=np.float32))
+    store.add_many(["b", "c\nwith newline"], np.array([[9, 9], [5, 6]], dtype=np.float32))
+    reopened = embeddings.EmbeddingStore(path)
+    assert len(reopened) == 3
+    assert reopened.get_many(["c\nwith newline", "b", "a"]).tolist() == [[5, 6], [3, 4], [1, 2]]
+
+def test_read_only_store_sees_appended_rows(tmp_path):
+    path = str(tmp_path / "embeddings")
+    writer = embeddings.EmbeddingStore(path, initial_capacity=1)
+    writer.add_many(["a"], np.array([[1, 2]], dtype=np.float32))
+    reader = embeddings.EmbeddingStore(path, read_only=True)
+    with pytest.raises(ValueError):
+        reader.add_many(["b"], np.array([[3, 4]], dtype=np.float32))
+    writer.add_many(["b", "c"], np.array([[3, 4], [5, 6]], dtype=np.float32))
+    assert "b" not in reader
+    reader.refresh()
+    assert reader.get_many(["c", "a"]).tolist() == [[5, 6], [1, 2]]
+
+def test_store_recovers_from_interrupted_index_writes(tmp_path):
+    path = str(tmp_path / "embeddings")
+    store = embeddings.EmbeddingStore(path)
+    store.add_many(["a", "b"], np.array([[1, 2], [3, 4]], dtype=np.float32))
+    index = tmp_path / "embeddings" / "index.jsonl"
+    # A writer died halfway through a line
+    with open(index, "ab") as f:
+        f.write(b'"hal')
+    reopened = embeddings.EmbeddingStore(path)
+    reopened.add_many(["c"], np.array([[5, 6]], dtype=np.float32))
+    assert embeddings.EmbeddingStore(path).get_many(["a", "b", "c"]).tolist() == [[1, 2], [3, 4], [5, 6]]
+
+    # A garbled line still takes up its row, so the rows after it stay in place
+    with open(index, "ab") as f:
+        f.write(b'"gar"bled"\n')
+    reopened = embeddings.EmbeddingStore(path)
+    reopened.add_many(["d"], np.array([[7, 8]], dtype=np.float32))
+    assert embeddings.EmbeddingStore(path).get_many(["d", "c"]).tolist() == [[7, 8], [5, 6]]
+
+def test_float16_store(tmp_path):
+    store = embeddings.EmbeddingStore(str(tmp_path / "embeddings"), dtype="float16")
+    store.add_many(["a"], np.array([[0.1, 0.2]], dtype=np.float32))
+    row = store.get_many(["a"])
+    assert row.dtype == np.float32
+    assert row == pytest.approx(np.array([[0.1, 0.2]]), abs=1e-3)
+    assert np.load(str(tmp_path / "embeddings" / "vectors.npy"), mmap_mode="r").dtype == np.float16
+
+def test_store_rejects_mismatched_dimensions(tmp_path):
+    store = embeddings.EmbeddingStore(str(tmp_path / "embeddings"))
+    store.add_many(["a"], np.array([[1, 2]], dtype=np.float32))
+    with pytest.raises(ValueError):
+        store.add_many(["b"], np.array([[1, 2, 3]], dtype=np.float32))
+
+def test_static_vectorizer_averages_known_words(tmp_path):
+    table = tmp_path / "vectors.txt"
+    table.write_text("apple 1 0\nfruit 0 1\n")
+    vectorizer = embeddings.StaticVectorizer.from_text(str(table))
+    assert vectorizer.name == "vectors"
+    rows = vectorizer.vectorize(["Apple fruit", "unknown words", "APPLE"])
+    assert rows.tolist() == [[0.5, 0.5], [0.0, 0.0], [1.0, 0.0]]
+
+def test_set_vectorizer_switches_store(tmp_path, monkeypatch):
+    monkeypatch.setattr(embeddings, "vectorizer", embeddings.vectorizer)
+    monkeypatch.setattr(embeddings, "embedding_store", embeddings.embedding_store)
+    vectorizer = embeddings.StaticVectorizer({"red": np.array([1.0, 0.0]), "blue": np.array([0.0, 1.0])})
+    embeddings.set_vectorizer(vectorizer, store_path=str(tmp_path / "static"))
+    ranked = embeddings.rank_candidates(["blue sky", "red apple"], "a red fruit")
+    assert [title for title, _ in ranked] == ["red apple", "blue sky"]
+    assert "red apple" in embeddings.EmbeddingStore(str(tmp_path / "static"))
+
+def test_importing_wiki_does_not_load_spacy():
+    code = "import sys, wiki; assert 'spacy' not in sys.modules, 'spacy was imported'"
+    subprocess.run([sys.executable, "-c", code], check=True, cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,104 @@
+import threading
+import time
+from fetcher import AsyncFetcher, RateLimiter, SingleFlight
+from mediawiki import normalize_title
+
+class SlowBatches:
+    """A blocking batch fetch that records how many batches overlap"""
+
+    def __init__(self, delay=0.05):
+        self.delay = delay
+        self.active = 0
+        self.peak = 0
+        self.batches = []
+        self.lock = threading.Lock()
+
+    def __call__(self, titles):
+        with self.lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+            self.batches.append(titles)
+        time.sleep(self.delay)
+        with self.lock:
+            self.active -= 1
+        return {title: title.upper() for title in titles}
+
+def test_fetch_runs_batches_concurrently_within_limit():
+    fetch_batch = SlowBatches()
+    fetcher = AsyncFetcher(fetch_batch, host="concurrency.test", max_concurrency=2, requests_per_second=0, batch_size=2)
+    titles = [f"page {i}" for i in range(8)]
+    results = fetcher.fetch(titles)
+    assert results == {title: title.upper() for title in titles}
+    assert len(fetch_batch.batches) == 4
+    assert fetch_batch.peak == 2
+
+def test_rate_limiter_spaces_requests_per_host():
+    limiter = RateLimiter.for_host("rate.test", requests_per_second=20)
+    assert RateLimiter.for_host("rate.test", requests_per_second=1) is limiter
+    delays = [limiter.reserve() for _ in range(3)]
+    assert delays[0] == 0
+    assert 0.09 < delays[2] <= 0.1
+
+def test_rate_limit_holds_one_fetcher_below_the_host_rate():
+    fetch_batch = SlowBatches(delay=0)
+    fetcher = AsyncFetcher(fetch_batch, host="background.test", requests_per_second=0, batch_size=1, rate_limit=20)
+    began = time.monotonic()
+    fetcher.fetch(["a", "b", "c"])
+    assert time.monotonic() - began >= 0.09
+
+def test_prefetch_returns_immediately_and_wait_joins_it():
+    fetch_batch = SlowBatches(delay=0.2)
+    fetcher = AsyncFetcher(fetch_batch, host="prefetch.test", requests_per_second=0)
+    began = time.monotonic()
+    fetcher.prefetch(["Apple", "Netflix"])
+    assert time.monotonic() - began < 0.1
+    fetcher.prefetch(["Apple"])  # already in flight, not fetched again
+    assert fetcher.wait("Apple") is True
+    assert fetcher.wait("Apple") is False
+    assert fetch_batch.batches == [["Apple", "Netflix"]]
+
+def test_concurrent_fetches_share_in_flight_titles():
+    fetch_batch = SlowBatches(delay=0.2)
+    fetcher = AsyncFetcher(fetch_batch, host="shared.test", requests_per_second=0)
+    results = {}
+    threads = [
+        threading.Thread(target=lambda name=name, titles=titles: results.__setitem__(name, fetcher.fetch(titles)))
+        for name, titles in (("computer", ["Start", "Apple"]), ("user", ["Start", "Ocean"]))
+    ]
+    for thread in threads:
+        thread.start()
+        time.sleep(0.05)
+    for thread in threads:
+        thread.join()
+    assert results["computer"] == {"Start": "START", "Apple": "APPLE"}
+    assert results["user"] == {"Start": "START", "Ocean": "OCEAN"}
+    assert sorted(title for batch in fetch_batch.batches for title in batch) == ["Apple", "Ocean", "Start"]
+
+def test_in_flight_titles_are_shared_by_key():
+    fetch_batch = SlowBatches(delay=0.2)
+    fetcher = AsyncFetcher(fetch_batch, host="keyed.test", requests_per_second=0, key=normalize_title)
+    fetcher.prefetch(["River_bank"])
+    time.sleep(0.05)
+    assert fetcher.fetch(["river bank"]) == {"river bank": "RIVER_BANK"}
+    assert fetch_batch.batches == [["River_bank"]]
+
+def test_single_flight_runs_one_call_per_key():
+    flight = SingleFlight(key=normalize_title)
+    calls = []
+
+    def call(title):
+        calls.append(title)
+        time.sleep(0.1)
+        return title.upper()
+
+    results = []
+    threads = [threading.Thread(target=lambda title=title: results.append(flight.do(title, lambda: call(title)))) for title in ["Apple", "apple", "Apple"]]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert calls == ["Apple"]
+    assert results == ["APPLE"] * 3
+    # Once it has finished, the next call runs again
+    assert flight.do("apple", lambda: call("apple")) == "APPLE"
+    assert len(calls) == 2
@@ -0,0 +1,29 @@
+import json
+import filters
+from filters import CATEGORY_REASONS, FilterEngine, MALFORMED, META_CATEGORY, META_PAGE, WEAK_CATEGORY
+
+def test_classify_reports_every_reason():
+    engine = FilterEngine.load()
+    assert engine.classify("Apple") == 0
+    assert engine.classify("All (disambiguation)") == META_PAGE | META_CATEGORY
+    # "article" is a meta page term; the longer "articles with" inside the same words is a meta category
+    assert engine.classify("Articles with dead links") == META_PAGE | META_CATEGORY
+    assert engine.classify("Stub") == META_CATEGORY
+    assert engine.classify("A") == MALFORMED
+    assert engine.classify("X (a) (b) (c)") == MALFORMED
+    assert engine.classify("Category:Fruit") == META_PAGE | META_CATEGORY
+
+def test_rules_come_from_data(tmp_path):
+    path = tmp_path / "rules.json"
+    path.write_text(json.dumps({"meta_page": ["list"], "weak_category": {"prefix": "theme:", "unless": ["fish"]}}))
+    engine = FilterEngine.load(str(path))
+    assert engine.classify("List of rivers") == META_PAGE
+    assert engine.classify("Theme:Birds") == WEAK_CATEGORY
+    assert engine.classify("Theme:Fish") == 0
+    assert engine.version != FilterEngine.load().version
+
+def test_helpers_apply_the_mode():
+    assert filters.is_allowed("Stub", hard_mode=True)
+    assert not filters.is_allowed("Stub")
+    assert filters.is_regular_page("Stub") and not filters.is_good_category("Stub")
+    assert filters.excluded(hard_mode=True) & CATEGORY_REASONS == 0
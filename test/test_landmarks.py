@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+import dumps
+import landmarks
+import wiki
+from cache import CATEGORY, LINK
+
+EDGES = [
+    ("Alpha", "Beta", LINK), ("Beta", "Gamma", LINK), ("Gamma", "Delta", LINK), ("Delta", "Epsilon", LINK), ("Epsilon", "Alpha", LINK),
+    ("Beta", "Hub", LINK), ("Hub", "Delta", LINK), ("Hub", "Beta", LINK), ("Gamma", "Hub", LINK),
+    # A shortcut through a disambiguation page, which the game never steps onto
+    ("Alpha", "Epsilon (disambiguation)", LINK), ("Epsilon (disambiguation)", "Epsilon", LINK),
+    ("Island", "Alpha", LINK), ("Alpha", "Things", CATEGORY), ("Things", "Epsilon", LINK),
+]
+
+@pytest.fixture
+def graph(tmp_path):
+    builder = dumps._Builder()
+    for source, target, kind in EDGES:
+        builder.edge(builder.node(source), builder.node(target), kind)
+    dumps.write_link_graph(builder, str(tmp_path / "graph"))
+    return dumps.LinkGraph(str(tmp_path / "graph"))
+
+def all_distances(graph, hard_mode):
+    allowed = landmarks.allowed_nodes(graph, hard_mode)
+    return np.stack([landmarks.bfs(graph, node, allowed, hard_mode) for node in range(len(graph))])
+
+def test_bfs_follows_the_game_rules(graph):
+    distances = all_distances(graph, hard_mode=False)
+    ids = graph.ids
+    assert distances[ids["Alpha"], ids["Epsilon"]] == 2  # Through the category, not the disambiguation page
+    assert distances[ids["Alpha"], ids["Epsilon (disambiguation)"]] == landmarks.UNREACHABLE
+    assert distances[ids["Alpha"], ids["Island"]] == landmarks.UNREACHABLE
+    assert all_distances(graph, hard_mode=True)[ids["Alpha"], ids["Epsilon"]] == 4
+
+def test_distances_to_a_landmark_match_distances_from_every_page(graph):
+    allowed = landmarks.allowed_nodes(graph)
+    forward = all_distances(graph, hard_mode=False)
+    for node in np.flatnonzero(allowed):
+        np.testing.assert_array_equal(landmarks.bfs(graph, node, allowed, reverse=True)[allowed], forward[allowed, node])
+
+def test_bounds_hold_for_every_pair(graph):
+    exact = all_distances(graph, hard_mode=False)
+    table = landmarks.build_landmarks(graph, count=2)
+    assert [graph.titles[node] for node in table.landmarks] == ["Alpha", "Beta"]
+    titles = [title for title in graph.titles if landmarks.allowed_nodes(graph)[graph.ids[title]]]
+    for source in titles:
+        lower = table.lower_bounds([source], titles)
+        for target, bound in zip(titles, lower):
+            true = exact[graph.ids[source], graph.ids[target]]
+            true = np.inf if true == landmarks.UNREACHABLE else true
+            assert bound <= true
+            upper = table.upper_bound(source, target)
+            assert upper is None or upper >= true
+
+def test_every_page_as_a_landmark_gives_exact_distances(graph):
+    exact = all_distances(graph, hard_mode=True)
+    table = landmarks.build_landmarks(graph, count=len(graph), hard_mode=True)
+    assert table.estimate("Alpha", "Epsilon") == (4, 4)
+    assert table.estimate("Alpha", "Island")[0] == np.inf
+    assert table.lower_bounds(["Alpha", "Beta", "Gamma"], ["Epsilon"]).tolist() == [exact[graph.ids[page], graph.ids["Epsilon"]] for page in ["Alpha", "Beta", "Gamma"]]
+    # Pages outside the graph are unbounded
+    assert table.lower_bounds(["Nowhere"], ["Epsilon"]).tolist() == [0]
+
+def test_tables_load_with_the_link_graph(graph):
+    landmarks.build_landmarks(graph, count=len(graph))
+    wiki.use_link_graph(graph.path)
+    try:
+        assert wiki.estimate_path_length("Alpha", "Epsilon") == (3, 3)
+        assert wiki.estimate_path_length("Alpha", "Epsilon", hard_mode=True) is None
+    finally:
+        wiki.use_link_graph(None)
+    assert wiki.estimate_path_length("Alpha", "Epsilon") is None
@@ -6,7 +6,10 @@ from main import main
 def mock_wiki_functions():
     """Fixture to mock Wikipedia-related functions"""
     with patch('main.get_page') as mock_get_page, \
-         patch('main.find_short_path') as mock_find_path:
+         patch('main.find_short_paths') as mock_find_path, \
+         patch('main.start_page_pool') as mock_pool:
+        # An empty start page pool, so no background resolver reaches the network
+        mock_pool.return_value.start.return_value.pop.return_value = None
         
         # Create mock page
         mock_page = MagicMock()
@@ -14,12 +17,16 @@ def mock_wiki_functions():
         mock_page.summary = "Test summary"
         mock_get_page.return_value = mock_page
         
-        # Create mock path
-        mock_find_path.return_value = ["Start", "End"]
+        # Create mock path, with both paths verified
+        def find_short_paths(start_page, end_pages, hard_mode, traces=None, verified=None):
+            verified.extend([True, True])
+            return [["Start", "End"], ["Start", "End"]]
+        mock_find_path.side_effect = find_short_paths
         
         yield {
             'get_page': mock_get_page,
-            'find_short_path': mock_find_path
+            'find_short_paths': mock_find_path,
+            'start_page_pool': mock_pool,
         }
 
 @pytest.fixture
@@ -0,0 +1,69 @@
+from mediawiki import MediaWikiClient
+
+def test_fetch_pages_batches_titles(fake_wikipedia):
+    client = MediaWikiClient(fake_wikipedia.url)
+    records = client.fetch_pages(["Apple", "Netflix", "Bridgerton"])
+    assert records["Apple"].links == ["Apple Computer", "Blueberry", "All (disambiguation)"]
+    assert records["Apple"].categories == ["Fruit"]
+    assert records["Netflix"].summary.startswith("Netflix is a streaming service")
+    assert records["Bridgerton"].links == ["Netflix", "All (disambiguation)"]
+    # One batch, but the fake server splits the links and categories across continuations
+    titles = {params["titles"] for params in fake_wikipedia.requests}
+    assert titles == {"Apple|Netflix|Bridgerton"}
+    assert client.requests_made == len(fake_wikipedia.requests) > 1
+
+def test_fetch_pages_splits_large_batches(fake_wikipedia):
+    client = MediaWikiClient(fake_wikipedia.url, batch_size=2)
+    records = client.fetch_pages(["Apple", "Netflix", "Bridgerton"])
+    assert set(records) == {"Apple", "Netflix", "Bridgerton"}
+    assert {params["titles"] for params in fake_wikipedia.requests} == {"Apple|Netflix", "Bridgerton"}
+
+def test_fetch_pages_resolves_normalization_and_redirects(fake_wikipedia):
+    client = MediaWikiClient(fake_wikipedia.url)
+    records = client.fetch_pages(["blueberries", "apple_Computer"])
+    assert records["blueberries"].title == "Blueberry"
+    assert records["apple_Computer"].title == "Apple Computer"
+
+def test_fetch_pages_reports_missing_pages(fake_wikipedia):
+    client = MediaWikiClient(fake_wikipedia.url)
+    records = client.fetch_pages(["Apple", "Lake"])
+    assert records["Lake"] is None
+    assert records["Apple"].title == "Apple"
+
+def test_fetch_revisions_is_a_cheap_info_query(fake_wikipedia):
+    fake_wikipedia.pages = dict(fake_wikipedia.pages, Apple=dict(fake_wikipedia.pages["Apple"], revid=42))
+    client = MediaWikiClient(fake_wikipedia.url)
+    assert client.fetch_pages(["Apple"])["Apple"].revid == 42
+    fake_wikipedia.requests.clear()
+    assert client.fetch_revisions(["Apple", "blueberries", "Lake"]) == {"Apple": 42, "blueberries": 1, "Lake": None}
+    assert [params["prop"] for params in fake_wikipedia.requests] == ["info"]
+
+def test_fetch_backlinks_follows_continuation(fake_wikipedia):
+    client = MediaWikiClient(fake_wikipedia.url)
+    backlinks = client.fetch_backlinks(["Netflix", "blueberries", "Lake"])
+    assert backlinks["Netflix"] == ["Apple Computer", "Stream", "Bridgerton", "Bowser's Castle Warp Pipe", "All (disambiguation)"]
+    assert backlinks["blueberries"] == ["Apple", "Mushroom Kingdom Warp Pipe", "Fruit", "Blue Things", "All (disambiguation)"]
+    assert backlinks["Lake"] is None
+    assert all(params["prop"] == "linkshere" for params in fake_wikipedia.requests)
+    assert len({params["titles"] for params in fake_wikipedia.requests}) == 1
+
+def test_fetch_backlinks_limits_each_title_separately(fake_wikipedia):
+    client = MediaWikiClient(fake_wikipedia.url)
+    backlinks = client.fetch_backlinks(["Netflix", "blueberries", "Lake"], limit=2)
+    assert backlinks["Netflix"] == ["Apple Computer", "Stream"]
+    assert backlinks["blueberries"] == ["Apple", "Mushroom Kingdom Warp Pipe"]
+    assert backlinks["Lake"] is None
+
+    # Lists that end within the limit come back whole
+    assert len(client.fetch_backlinks(["Netflix", "blueberries"], limit=5)["blueberries"]) == 5
+    assert client.fetch_backlinks(["Netflix"], limit=6)["Netflix"] == backlinks["Netflix"] + ["Bridgerton", "Bowser's Castle Warp Pipe", "All (disambiguation)"]
+
+def test_resolve_titles_skips_disambiguation_and_missing_pages(fake_wikipedia):
+    client = MediaWikiClient(fake_wikipedia.url)
+    assert client.resolve_titles(["blueberries", "river", "All (disambiguation)", "Nowhere"]) == {
+        "blueberries": "Blueberry",
+        "river": "River",
+        "All (disambiguation)": None,
+        "Nowhere": None,
+    }
+    assert [params["prop"] for params in fake_wikipedia.requests] == ["pageprops"]
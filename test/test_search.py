@@ -0,0 +1,134 @@
+from search import SearchTree, bidirectional_search
+
+GRAPH = {
+    "A": ["B", "C"],
+    "B": ["D"],
+    "C": ["A", "E"],
+    "D": ["F"],
+    "E": ["C"],
+    "F": [],
+    "G": ["A"],
+}
+
+def neighbours(page):
+    return GRAPH.get(page, [])
+
+def reverse_neighbours(page):
+    return [source for source, links in GRAPH.items() if page in links]
+
+def has_edge(source, dest):
+    return dest in GRAPH.get(source, [])
+
+def test_finds_path_through_true_backlinks():
+    result = bidirectional_search("A", "F", neighbours, reverse_neighbours)
+    assert result.reason == "found"
+    assert result.path == ["A", "B", "D", "F"]
+
+def test_same_start_and_target():
+    assert bidirectional_search("A", "A", neighbours, reverse_neighbours).path == ["A"]
+
+def test_unreachable_target_is_exhausted():
+    result = bidirectional_search("F", "A", neighbours, reverse_neighbours)
+    assert result.path is None
+    assert result.reason == "exhausted"
+
+def test_assumed_backlinks_are_confirmed():
+    # Outgoing links stand in for backlinks; C -> A exists but A -> C -> E must be checked hop by hop
+    result = bidirectional_search("G", "E", neighbours, neighbours, has_edge=has_edge)
+    assert result.path == ["G", "A", "C", "E"]
+    for source, dest in zip(result.path, result.path[1:]):
+        assert has_edge(source, dest)
+
+def test_unconfirmed_backlinks_are_never_used():
+    # B links to D but D does not link back, so D must not appear before B
+    result = bidirectional_search("E", "B", neighbours, neighbours, has_edge=has_edge)
+    assert result.path == ["E", "C", "A", "B"]
+
+def test_expansion_budget():
+    result = bidirectional_search("A", "F", neighbours, reverse_neighbours, max_expansions=1)
+    assert result.path is None
+    assert result.reason == "expansion_limit"
+
+def test_prefetches_best_candidates_on_both_frontiers():
+    requested = []
+    result = bidirectional_search("A", "F", neighbours, reverse_neighbours, prefetch=requested.append, prefetch_k=1)
+    assert result.path == ["A", "B", "D", "F"]
+    prefetched = [title for batch in requested for title in batch]
+    assert "A" not in prefetched and "F" not in prefetched
+    assert len(prefetched) == len(set(prefetched))
+    assert {"B", "D"} & set(prefetched)
+
+def test_backward_candidates_can_prefetch_separately():
+    forward, backward = [], []
+    result = bidirectional_search("A", "F", neighbours, reverse_neighbours, prefetch=forward.extend, reverse_prefetch=backward.extend, prefetch_k=1)
+    assert result.path == ["A", "B", "D", "F"]
+    assert set(forward) <= {"B", "C", "D", "E"}
+    assert backward and set(backward) <= {"B", "D"}
+
+def test_bound_prunes_branches_that_cannot_reach_the_goal():
+    distances = {"A": 3, "B": 2, "C": float("inf"), "D": 1, "E": float("inf"), "F": 0}
+    expanded = []
+
+    def expand(page):
+        expanded.append(page)
+        return neighbours(page)
+
+    def bound(candidates, goal):
+        # Backwards, nothing is known about the distance from A
+        return [distances[candidate] if goal == "F" else 0 for candidate in candidates]
+
+    # C is ranked first, but can never reach F
+    rank = lambda candidates, goal: sorted(((candidate, 1.0 if candidate == "C" else 0.0) for candidate in candidates), key=lambda pair: -pair[1])
+    result = bidirectional_search("A", "F", expand, reverse_neighbours, rank=rank, bound=bound)
+    assert result.path == ["A", "B", "D", "F"]
+    assert "C" not in expanded
+
+    # A bound longer than the depth limit allows rules the target out at once
+    result = bidirectional_search("A", "F", neighbours, reverse_neighbours, bound=lambda candidates, goal: [10] * len(candidates), max_depth=4)
+    assert result.path is None and result.reason == "exhausted"
+
+def test_searches_resume_the_tree_from_their_start():
+    tree = SearchTree("A")
+    expanded = []
+
+    def expand(page):
+        expanded.append(page)
+        return neighbours(page)
+
+    assert bidirectional_search("A", "F", expand, reverse_neighbours, tree=tree).path == ["A", "B", "D", "F"]
+    assert "A" in tree.expanded and tree.parents["D"] == "B"
+
+    # A target the tree already reached needs no expansions at all
+    expanded.clear()
+    result = bidirectional_search("A", "D", expand, reverse_neighbours, tree=tree)
+    assert (result.path, result.expansions, expanded) == (["A", "B", "D"], 0, [])
+
+    # A new target carries on from the pages the tree has not expanded, never from A again
+    result = bidirectional_search("A", "E", expand, reverse_neighbours, tree=tree)
+    assert result.path == ["A", "C", "E"] and "A" not in expanded
+    assert tree.parents["E"] == "C"
+
+    # Trees from other starts are left alone
+    assert bidirectional_search("G", "E", neighbours, reverse_neighbours, tree=tree).path == ["G", "A", "C", "E"]
+    assert "G" not in tree.parents
+
+def test_resumed_searches_reach_pages_an_earlier_search_stopped_short_of():
+    graph = {0: [2, 3], 2: [0, 3], 3: [0, 5], 5: [2, 4], 4: [0]}
+    forwards = lambda page: graph.get(page, [])
+    backwards = lambda page: [source for source, links in graph.items() if page in links]
+
+    # The first search returns partway through expanding the start
+    tree = SearchTree(0)
+    assert bidirectional_search(0, 3, forwards, backwards, tree=tree).path == [0, 3]
+    assert bidirectional_search(0, 5, forwards, backwards, tree=tree).path == [0, 3, 5]
+
+    # Pages the ranking left out of the queue can still meet the backward frontier
+    tree = SearchTree(0)
+    keep_one = lambda candidates, goal: [(candidates[0], 1.0)]
+    assert bidirectional_search(0, 2, forwards, backwards, rank=keep_one, tree=tree).path == [0, 2]
+    assert bidirectional_search(0, 5, forwards, backwards, rank=keep_one, tree=tree).path == [0, 3, 5]
+
+def test_tree_stops_growing_at_its_limit():
+    tree = SearchTree("A", max_nodes=3)
+    tree.merge({"A": None, "B": "A", "C": "A", "D": "B"}, {"A": 0, "B": 1, "C": 1, "D": 2}, {"A", "B"})
+    assert list(tree.parents) == ["A", "B", "C"] and tree.expanded == {"A", "B"}
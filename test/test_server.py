@@ -0,0 +1,91 @@
+import asyncio
+import json
+import threading
+import time
+import pytest
+from unittest.mock import MagicMock, patch
+import server
+
+def page(title):
+    mock_page = MagicMock()
+    mock_page.title = title
+    mock_page.summary = f"{title} summary"
+    return mock_page
+
+@pytest.fixture
+def game_server():
+    searches = []
+    lock = threading.Lock()
+
+    def find_short_paths(start_page, end_pages, hard_mode, traces=None, verified=None):
+        with lock:
+            searches.append(end_pages[1].title)
+        time.sleep(0.1)
+        verified.extend([True, end_pages[1].title != "Unverified"])
+        return [[start_page.title, end_pages[0].title], [start_page.title, "Middle", end_pages[1].title]]
+
+    with patch("server.get_page", side_effect=lambda name: page(name.title()) if name != "Nowhere" else None), \
+         patch("server.random_page", side_effect=lambda words, *args: page(words[0])), \
+         patch("server.estimate_path_length", return_value=None), \
+         patch("server.find_short_paths", side_effect=find_short_paths):
+        yield server.GameServer(["Apple"]), searches
+
+async def request(port, method, path, body=None):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    data = json.dumps(body).encode() if body is not None else b""
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: localhost\r\nContent-Length: {len(data)}\r\n\r\n".encode() + data)
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    head, _, payload = response.partition(b"\r\n\r\n")
+    return int(head.split()[1]), json.loads(payload)
+
+def test_rounds_are_played_over_http(game_server):
+    game, searches = game_server
+
+    async def play():
+        listener = await server.serve(game, port=0)
+        port = listener.sockets[0].getsockname()[1]
+        async with listener:
+            status, started = await request(port, "POST", "/rounds", {"start": "river", "hard_mode": True})
+            assert status == 201
+            assert started["start"]["title"] == "River"
+            assert started["computer"]["title"] == "Apple"
+            assert started["status"] == "waiting"
+
+            status, submitted = await request(port, "POST", f"/rounds/{started['id']}/page", {"page": "ocean"})
+            assert (status, submitted["status"]) == (202, "scoring")
+            await game.rounds.get(started["id"]).scoring
+
+            status, done = await request(port, "GET", f"/rounds/{started['id']}")
+            assert done["computer_path"] == ["River", "Apple"]
+            assert (done["computer_length"], done["user_length"], done["winner"]) == (2, 3, "user")
+            assert done["computer_verified"] and done["user_verified"]
+
+            # A path with a hop that is not a real link scores nothing
+            started = (await request(port, "POST", "/rounds", {"start": "River"}))[1]
+            await request(port, "POST", f"/rounds/{started['id']}/page", {"page": "unverified"})
+            await game.rounds.get(started["id"]).scoring
+            done = (await request(port, "GET", f"/rounds/{started['id']}"))[1]
+            assert (done["user_verified"], done["user_length"], done["winner"]) == (False, 0, "computer")
+
+            assert (await request(port, "POST", f"/rounds/{started['id']}/page", {"page": "Fish"}))[0] == 409
+            assert (await request(port, "POST", "/rounds", {"start": "Nowhere"}))[0] == 404
+            assert (await request(port, "GET", "/rounds/missing"))[0] == 404
+    asyncio.run(play())
+
+def test_sessions_are_scored_concurrently(game_server):
+    game, searches = game_server
+
+    async def play():
+        rounds = await asyncio.gather(*(game.start_round({"start": "River"}) for _ in range(8)))
+        started = time.monotonic()
+        for number, playing in enumerate(rounds):
+            await game.handle("POST", f"/rounds/{playing.id}/page", {"page": f"Page {number}"})
+        await asyncio.gather(*(playing.scoring for playing in rounds))
+        return time.monotonic() - started, rounds
+
+    elapsed, rounds = asyncio.run(play())
+    assert sorted(searches) == sorted(f"Page {number}" for number in range(8))
+    assert elapsed < 0.5
+    assert all(playing.status == "done" for playing in rounds)
@@ -0,0 +1,56 @@
+import random
+import time
+from collections import Counter
+import cache
+from startpages import StartPagePool
+
+TITLES = {"apple": "Apple", "apples": "Apple", "Apple": "Apple", "river": "River", "ocean": "Ocean", "foh": None, "all": "All (disambiguation)"}
+
+class Resolver:
+    def __init__(self):
+        self.batches = []
+
+    def __call__(self, words):
+        self.batches.append(list(words))
+        return {word: TITLES.get(word) for word in words}
+
+def test_words_are_resolved_in_batches_and_remembered(tmp_path):
+    store = cache.PageStore(str(tmp_path / "pages.db"))
+    resolver = Resolver()
+    pool = StartPagePool(TITLES, resolver, store, batch_size=4)
+    while pool.resolve_batch():
+        pass
+    assert [len(batch) for batch in resolver.batches] == [4, 3]
+    # Disambiguation pages and words without a page never start a round
+    assert sorted(pool.sample(10)) == ["Apple", "Ocean", "River"]
+    assert store.get_words()["foh"] is None
+
+    again = StartPagePool(list(TITLES) + ["stream"], resolver, store, batch_size=4)
+    assert (len(again), again.unresolved) == (3, 1)
+    store.close()
+
+def test_titles_are_drawn_uniformly_not_by_word(tmp_path):
+    store = cache.PageStore(str(tmp_path / "pages.db"))
+    pool = StartPagePool(TITLES, Resolver(), store, rng=random.Random(0))
+    pool.resolve_batch()
+    counts = Counter(pool.sample()[0] for _ in range(3000))
+    # Three words resolve to Apple, but it is drawn no more often than River or Ocean
+    assert all(900 < count < 1100 for count in counts.values())
+    store.close()
+
+def test_background_pool_keeps_warmed_pages_ready(tmp_path):
+    store = cache.PageStore(str(tmp_path / "pages.db"))
+    warmed = []
+    pool = StartPagePool(TITLES, Resolver(), store, warm=warmed.extend, size=2).start()
+    deadline = time.monotonic() + 2
+    while len(warmed) < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    title = pool.pop()
+    assert title in warmed[:2]
+    # The page taken is replaced by a warmed page other than the one still waiting
+    waiting = next(other for other in warmed[:2] if other != title)
+    while len(warmed) < 3 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert len(warmed) == 3 and warmed[2] != waiting
+    pool.stop()
+    store.close()
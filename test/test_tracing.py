@@ -0,0 +1,62 @@
+import io
+import json
+import threading
+import time
+import tracing
+from search import bidirectional_search
+
+def test_nested_phases_are_exclusive():
+    trace = tracing.Trace("A", "B")
+    with tracing.tracing(trace):
+        with tracing.phase("cache"):
+            time.sleep(0.02)
+            with tracing.phase("network"):
+                time.sleep(0.05)
+            time.sleep(0.02)
+    assert 0.035 <= trace.phases["cache"] < 0.06
+    assert 0.045 <= trace.phases["network"] < 0.07
+
+def test_no_trace_collects_nothing():
+    with tracing.phase("cache"):
+        tracing.count("api_calls")
+    assert tracing.current() is None
+
+def test_background_work_counts_without_time():
+    trace = tracing.Trace("A", "B")
+    with tracing.tracing(trace):
+        def work():
+            with tracing.phase("network"):
+                tracing.count("api_calls")
+        worker = threading.Thread(target=tracing.bind(work))
+    worker.start()
+    worker.join()
+    assert trace.counters == {"api_calls": 1}
+    assert trace.phases == {}
+
+def test_search_records_expansions():
+    graph = {"A": ["B", "C"], "B": ["D"], "C": [], "D": ["E"], "E": []}
+    trace = tracing.Trace("A", "E")
+    with tracing.tracing(trace):
+        result = bidirectional_search("A", "E", lambda page: graph[page], lambda page: [source for source, links in graph.items() if page in links])
+    trace.finish(result.reason, result.path)
+    expansions = [event for event in trace.events if event["event"] == "expansion"]
+    assert expansions and {event["direction"] for event in expansions} <= {"forward", "backward"}
+    summary = trace.summary()
+    assert (summary["reason"], summary["path_length"], summary["expansions"]) == ("found", 4, len(expansions))
+
+def test_traces_write_as_json_lines():
+    first, second = tracing.Trace("A", "B"), tracing.Trace("A", "C")
+    for trace, reason in ((first, "found"), (second, "timeout")):
+        with tracing.tracing(trace):
+            tracing.count("cache_memory_hits", 3)
+            tracing.count("cache_misses")
+        trace.event("expansion", forward_frontier=2, backward_frontier=1)
+        trace.finish(reason)
+    out = io.StringIO()
+    tracing.write_jsonl([first, second], out)
+    lines = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert [line["event"] for line in lines] == ["expansion", "summary", "expansion", "summary", "game"]
+    assert lines[1]["max_frontier"] == 3 and lines[1]["cache_hit_ratio"] == 0.75
+    game = lines[-1]
+    assert [search["reason"] for search in game["searches"]] == ["found", "timeout"]
+    assert game["counters"] == {"cache_memory_hits": 6, "cache_misses": 2}
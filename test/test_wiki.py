@@ -1,6 +1,13 @@
+import threading
+import time
 import pytest
 from unittest.mock import patch, MagicMock
 import wiki
+import cache
+import dumps
+import embeddings
+import tracing
+from backends import CacheBackend, DictBackend
 
 # Our hill-climbing algorithm should be able to traverse across both links and categories. Because it is greedy, it should miss the shortcut through the apparently unrelated Warp Pipe pages.
 
@@ -90,8 +97,8 @@ TEST_PAGES = {
 }
 
 @pytest.fixture
-def mock_wikipedia_library():
-    """Fixture to mock both get_page and get_page_links_with_cache"""
+def mock_wikipedia_library(fake_wikipedia, tmp_path, monkeypatch):
+    """Fixture to mock both get_page and get_page_links_with_cache, over an empty page cache and embedding store"""
     mock_pages = {}
     for page_name, page_data in TEST_PAGES.items():
         mock_page = MagicMock()
@@ -101,9 +108,21 @@ def mock_wikipedia_library():
         mock_page.categories = page_data["categories"]
         mock_pages[page_name] = mock_page
 
-    with patch('wikipedia.page') as mock_page:
+    wiki.page_cache.clear()
+    wiki.api.records.clear()
+    wiki.search_trees.clear()
+    store = cache.TieredPageCache(cache.PageStore(str(tmp_path / "pages.db")), ttl=wiki.CACHE_TTL, on_stale=wiki._revalidate)
+    cached = CacheBackend(store, wiki.api, fetcher=wiki.fetcher, backlink_fetcher=wiki.backlink_fetcher)
+    monkeypatch.setattr(wiki, "store", store)
+    monkeypatch.setattr(wiki, "cached", cached)
+    monkeypatch.setattr(wiki, "backend", cached)
+    monkeypatch.setattr(wiki.revalidator, "cache", store)
+    monkeypatch.setattr(embeddings, "embedding_store", embeddings.EmbeddingStore(str(tmp_path / "embeddings")))
+    with patch('wikipedia.page') as mock_page, \
+         patch.object(wiki.client, 'api_url', fake_wikipedia.url):
         mock_page.side_effect = lambda page_name, **kwargs: mock_pages[page_name]
         yield mock_page
+    store.close()
 
 def test_get_page(mock_wikipedia_library):
     """Test get_page function"""
@@ -113,6 +132,40 @@ def test_get_page(mock_wikipedia_library):
     assert page.links == TEST_PAGES["Apple"]["links"]
     assert page.categories == TEST_PAGES["Apple"]["categories"]
 
+def test_concurrent_get_page_calls_resolve_once(mock_wikipedia_library):
+    pages = mock_wikipedia_library.side_effect
+    def slow_page(page_name, **kwargs):
+        time.sleep(0.1)
+        return pages(page_name)
+    mock_wikipedia_library.side_effect = slow_page
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(wiki.get_page("Apple"))) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert mock_wikipedia_library.call_count == 1
+    assert [page.title for page in results] == ["Apple"] * 4
+
+def test_get_page_remembers_what_names_resolve_to(mock_wikipedia_library):
+    with patch('wikipedia.search') as mock_search:
+        mock_search.return_value = []
+        assert wiki.get_page("Nowhere") is None
+        assert wiki.get_page("blueberries").title == "Blueberry"
+        wiki.page_cache.clear()
+        calls = mock_wikipedia_library.call_count
+
+        # Misses are not retried until they expire; other spellings of a known page skip resolution
+        assert wiki.get_page("Nowhere") is None
+        assert mock_search.call_count == 1
+        assert wiki.get_page("BLUEBERRIES").title == "Blueberry"
+        assert wiki.get_page("BLUEBERRY").title == "Blueberry"
+        assert [call.args[0] for call in mock_wikipedia_library.call_args_list[calls:]] == ["Blueberry", "Blueberry"]
+
+        with patch('time.time', return_value=time.time() + wiki.NOT_FOUND_TTL + 1):
+            assert wiki.get_page("Nowhere") is None
+        assert mock_search.call_count == 2
+
 def test_get_page_search(mock_wikipedia_library):
     with patch('wikipedia.search') as mock_search:
         mock_search.return_value = []
@@ -139,10 +192,110 @@ def test_do_not_link_through_meta_pages(mock_wikipedia_library):
     except Exception as e:
         pass
 
-def test_greedy_search(mock_wikipedia_library):
+def test_search_finds_valid_path(mock_wikipedia_library):
     start_page = wiki.get_page("Blueberry")
     end_page = wiki.get_page("Bridgerton")
     path = wiki.find_short_path(start_page, end_page)
-    print(path)
-    # Doesn't find the shortcut through the Warp Pipes, because it's greedy
-    assert path == ["Blueberry", "Apple", "Apple Computer", "Netflix", "Bridgerton"]
+    # Either the Apple route or the Warp Pipe route; both are five pages long
+    assert path[0] == "Blueberry" and path[-1] == "Bridgerton"
+    assert len(path) == 5
+    for source, dest in zip(path, path[1:]):
+        assert dest in TEST_PAGES[source]["links"] + TEST_PAGES[source]["categories"]
+
+def test_find_short_paths_scores_both_pages_at_once(mock_wikipedia_library, fake_wikipedia):
+    start_page = wiki.get_page("Blueberry")
+    paths = wiki.find_short_paths(start_page, [wiki.get_page("Ocean"), wiki.get_page("Bridgerton")])
+    assert paths[0] == ["Blueberry", "Blue Things", "Ocean"]
+    assert paths[1][0] == "Blueberry" and paths[1][-1] == "Bridgerton"
+    # Pages both searches needed were requested once between them
+    for prop in ("links", "linkshere"):
+        first_rounds = [params for params in fake_wikipedia.requests if prop in params["prop"].split("|") and "continue" not in params]
+        fetched = [title for params in first_rounds for title in params["titles"].split("|")]
+        assert len(fetched) == len(set(fetched))
+
+def test_link_graph_answers_without_network(tmp_path):
+    from test_dumps import PAGE_DUMP, PAGELINKS_DUMP, CATEGORYLINKS_DUMP, write
+    dumps.build_link_graph(
+        write(tmp_path / "page.sql.gz", PAGE_DUMP), write(tmp_path / "pagelinks.sql.gz", PAGELINKS_DUMP),
+        str(tmp_path / "graph"), categorylinks_dump=write(tmp_path / "categorylinks.sql.gz", CATEGORYLINKS_DUMP),
+    )
+    wiki.use_link_graph(str(tmp_path / "graph"))
+    try:
+        with patch.object(wiki.api, 'record') as fetch:
+            assert wiki.get_page_links_with_cache("Blueberry") == ["Bowser's Castle (level)", "Blue things", "Fruit"]
+            assert wiki.get_page_links_with_cache("Blueberry", hard_mode=True) == ["Bowser's Castle (level)"]
+            fetch.assert_not_called()
+    finally:
+        wiki.use_link_graph(None)
+
+def test_find_short_paths_collects_a_trace_per_search(mock_wikipedia_library, fake_wikipedia):
+    start_page = wiki.get_page("Blueberry")
+    traces = []
+    wiki.find_short_paths(start_page, [wiki.get_page("Ocean"), wiki.get_page("Bridgerton")], traces=traces)
+    assert [trace.target for trace in traces] == ["Ocean", "Bridgerton"]
+    assert all(trace.reason == "found" and trace.events for trace in traces)
+    assert all(trace.counters.get("api_calls", 0) + trace.counters.get("cache_memory_hits", 0) > 0 for trace in traces)
+
+def test_verified_paths_are_remembered(mock_wikipedia_library, fake_wikipedia):
+    start_page, end_page = wiki.get_page("Blueberry"), wiki.get_page("Ocean")
+    # Each test starts from its own empty cache, with no results from earlier runs
+    assert wiki.store.get_result("Blueberry", "Ocean") is None
+    path, verified = wiki.find_verified_path(start_page, end_page)
+    assert (path, verified) == (["Blueberry", "Blue Things", "Ocean"], True)
+    requests = len(fake_wikipedia.requests)
+    trace = tracing.Trace("Blueberry", "Ocean")
+    assert wiki.find_verified_path(start_page, end_page, trace=trace) == (path, True)
+    assert trace.reason == "cached" and len(fake_wikipedia.requests) == requests
+    # Hard mode is searched and remembered on its own
+    assert wiki.store.get_result("Blueberry", "Ocean", hard_mode=True) is None
+
+def test_fetches_are_stored_under_normalized_titles(mock_wikipedia_library, fake_wikipedia):
+    assert wiki.backend.links("river") == TEST_PAGES["River"]["links"]
+    requests = len(fake_wikipedia.requests)
+    assert wiki.backend.links("River") == TEST_PAGES["River"]["links"]
+    assert wiki.prefetch_pages(["River", "river"]) == 0
+    assert len(fake_wikipedia.requests) == requests
+
+def test_pages_with_no_article_are_dead_ends_in_the_graph(mock_wikipedia_library):
+    # get_page searches for a name with no page, but the graph never borrows the hit's links
+    with patch('wikipedia.search') as mock_search:
+        mock_search.return_value = ["Ocean"]
+        assert wiki.get_page("Lake").title == "Ocean"
+        assert wiki.backend.neighbours("Lake") == []
+        assert not wiki.verify_path(["Lake", "River"], "Lake", "River")
+
+def test_red_links_are_asked_about_once(mock_wikipedia_library, fake_wikipedia):
+    assert wiki.backend.neighbours("Lake") == []
+    requests = len(fake_wikipedia.requests)
+    assert wiki.backend.neighbours("Lake") == []
+    assert wiki.backend.neighbours("Lake", hard_mode=True) == []
+    assert len(fake_wikipedia.requests) == requests
+    assert requests == 1
+
+def test_made_up_hops_fail_verification():
+    graph = DictBackend({"Apple": {"links": ["Fruit"]}, "Fruit": {"links": ["Ocean"]}, "Ocean": {}})
+    assert wiki.verify_path(["Apple", "Fruit", "Ocean"], "Apple", "Ocean", graph=graph)
+    assert not wiki.verify_path(["Apple", "Wikipedia", "Ocean"], "Apple", "Ocean", graph=graph)
+    assert not wiki.verify_path(["Apple", "Fruit"], "Apple", "Ocean", graph=graph)
+    assert not wiki.verify_path(["No path found between Apple and Ocean"], "Apple", "Ocean", graph=graph)
+
+def test_concurrent_searches_from_one_start_get_one_tree():
+    wiki.search_trees.clear()
+    graph = DictBackend({})
+    trees = []
+    threads = [threading.Thread(target=lambda: trees.append(wiki.search_tree("Apple", graph=graph))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert all(tree is trees[0] for tree in trees)
+
+def test_searches_from_one_start_share_their_exploration(mock_wikipedia_library, fake_wikipedia):
+    start_page = wiki.get_page("Blueberry")
+    assert wiki.find_short_path(start_page, wiki.get_page("Ocean")) == ["Blueberry", "Blue Things", "Ocean"]
+    assert "Ocean" in wiki.search_tree("Blueberry").parents
+    trace = tracing.Trace("Blueberry", "Blue Things")
+    assert wiki.find_short_path(start_page, wiki.get_page("Blue Things"), trace=trace) == ["Blueberry", "Blue Things"]
+    assert trace.counters["resumed_pages"] > 0 and trace.summary()["expansions"] == 0
+    # Hard mode follows other edges, so it keeps a tree of its own
+    assert len(wiki.search_tree("Blueberry", hard_mode=True)) == 0
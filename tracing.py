@@ -0,0 +1,169 @@
+import contextvars
+import json
+import threading
+import time
+from contextlib import contextmanager
+from typing import IO, Any, Dict, Iterable, Iterator, List, Optional
+
+# The trace collecting for the code running now, if any. Fetches a search starts carry it to their threads
+_current: "contextvars.ContextVar[Optional[Trace]]" = contextvars.ContextVar("trace", default=None)
+# Open phases in this context, innermost last, as [name, resumed_at]; None where time is not counted
+_open: "contextvars.ContextVar[Optional[tuple]]" = contextvars.ContextVar("trace_phases", default=())
+
+class Trace:
+    """Where one path search spent its time, and what it ended with.
+
+    Time is split by phase ("cache", "network", "embedding", "scoring", "landmarks",
+    "verification"); phases are exclusive, so a cache miss that waits on the network counts
+    as network time only.
+    Counters track cache hits, API calls and the like. The search adds one event per
+    expansion, with the frontier sizes and the phase time spent on that expansion.
+    """
+
+    def __init__(self, start: str, target: str, hard_mode: bool = False):
+        self.start = start
+        self.target = target
+        self.hard_mode = hard_mode
+        self.began = time.monotonic()
+        self.elapsed: Optional[float] = None
+        self.reason: Optional[str] = None
+        self.path: Optional[List[str]] = None
+        self.phases: Dict[str, float] = {}
+        self.counters: Dict[str, int] = {}
+        self.events: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    def add(self, phase: str, seconds: float):
+        with self._lock:
+            self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+
+    def count(self, name: str, n: int = 1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def snapshot(self) -> Dict[str, float]:
+        with self._lock:
+            return dict(self.phases)
+
+    def event(self, kind: str, **fields):
+        with self._lock:
+            self.events.append({"event": kind, "t": round(time.monotonic() - self.began, 6), **fields})
+
+    def finish(self, reason: str, path: Optional[List[str]] = None):
+        """Record why the search ended: "found", "timeout", "expansion_limit", "exhausted", "fallback", "cached" or "error"."""
+        self.reason = reason
+        self.path = path
+        self.elapsed = time.monotonic() - self.began
+
+    def summary(self) -> Dict[str, Any]:
+        elapsed = self.elapsed if self.elapsed is not None else time.monotonic() - self.began
+        phases = {phase: round(seconds, 6) for phase, seconds in self.snapshot().items()}
+        phases["other"] = round(max(elapsed - sum(phases.values()), 0.0), 6)
+        return {
+            "event": "summary",
+            "start": self.start,
+            "target": self.target,
+            "hard_mode": self.hard_mode,
+            "reason": self.reason,
+            "path_length": len(self.path) if self.path else 0,
+            "elapsed": round(elapsed, 6),
+            "expansions": sum(1 for event in self.events if event["event"] == "expansion"),
+            "max_frontier": max((event["forward_frontier"] + event["backward_frontier"] for event in self.events if event["event"] == "expansion"), default=0),
+            "phases": phases,
+            "counters": dict(self.counters),
+            "cache_hit_ratio": _hit_ratio(self.counters),
+        }
+
+    def lines(self) -> Iterator[str]:
+        """The trace as JSON lines: every event, then the summary."""
+        labels = {"start": self.start, "target": self.target}
+        for event in list(self.events):
+            yield json.dumps({**labels, **event})
+        yield json.dumps(self.summary())
+
+def _hit_ratio(counters: Dict[str, int]) -> Optional[float]:
+    hits = counters.get("cache_memory_hits", 0) + counters.get("cache_disk_hits", 0)
+    lookups = hits + counters.get("cache_misses", 0)
+    return round(hits / lookups, 4) if lookups else None
+
+def current() -> Optional[Trace]:
+    return _current.get()
+
+@contextmanager
+def tracing(trace: Optional[Trace], timed: bool = True):
+    """Collect into `trace` for the code inside the block (nothing happens with None).
+
+    Without `timed`, only counters are collected: for background work running alongside
+    the search, whose time would otherwise be counted twice.
+    """
+    token = _current.set(trace)
+    phases = _open.set(() if timed else None)
+    try:
+        yield trace
+    finally:
+        _open.reset(phases)
+        _current.reset(token)
+
+@contextmanager
+def phase(name: str):
+    """Count the time inside the block as `name`, pausing any phase it is nested in."""
+    trace = _current.get()
+    stack = _open.get()
+    if trace is None or stack is None:
+        yield
+        return
+    now = time.perf_counter()
+    if stack:
+        trace.add(stack[-1][0], now - stack[-1][1])
+    frame = [name, now]
+    token = _open.set(stack + (frame,))
+    try:
+        yield
+    finally:
+        now = time.perf_counter()
+        trace.add(name, now - frame[1])
+        _open.reset(token)
+        if stack:
+            stack[-1][1] = now
+
+def count(name: str, n: int = 1):
+    trace = _current.get()
+    if trace is not None:
+        trace.count(name, n)
+
+def bind(fn):
+    """`fn`, to be run in the background but counted toward the current trace, if there is one."""
+    trace = _current.get()
+    if trace is None:
+        return fn
+
+    def run(*args, **kwargs):
+        with tracing(trace, timed=False):
+            return fn(*args, **kwargs)
+    return run
+
+def summarize(traces: Iterable[Trace]) -> Dict[str, Any]:
+    """One summary for a game's searches: totals by phase and counter, plus each search's outcome."""
+    summaries = [trace.summary() for trace in traces]
+    phases: Dict[str, float] = {}
+    counters: Dict[str, int] = {}
+    for summary in summaries:
+        for name, seconds in summary["phases"].items():
+            phases[name] = round(phases.get(name, 0.0) + seconds, 6)
+        for name, value in summary["counters"].items():
+            counters[name] = counters.get(name, 0) + value
+    return {
+        "event": "game",
+        "searches": [{key: summary[key] for key in ("target", "reason", "path_length", "elapsed", "expansions")} for summary in summaries],
+        "elapsed": max((summary["elapsed"] for summary in summaries), default=0.0),
+        "phases": phases,
+        "counters": counters,
+        "cache_hit_ratio": _hit_ratio(counters),
+    }
+
+def write_jsonl(traces: List[Trace], out: IO[str]):
+    """Append each trace's events and summary to `out`, then the game summary."""
+    for trace in traces:
+        for line in trace.lines():
+            out.write(line + "\n")
+    out.write(json.dumps(summarize(traces)) + "\n")
@@ -1,47 +1,119 @@
 import wikipedia # https://wikipedia.readthedocs.io/en/latest/code.html#api
-import json
-import sqlite3
-import spacy
+import requests
+import atexit
+import cache
+import os
 import time
 import random
-from sklearn.metrics.pairwise import cosine_similarity
+import tracing
+from backends import ApiBackend, CacheBackend, GraphBackend, LinkGraphBackend
+from concurrent.futures import ThreadPoolExecutor
+from dumps import LinkGraph
+from embeddings import encode_text, get_cached_embedding, rank_candidates
+from fetcher import AsyncFetcher, SingleFlight
+from filters import is_good_category, is_regular_page
+from mediawiki import API_URL, MediaWikiClient, PageRecord, normalize_title
+from search import SearchResult, SearchTree, bidirectional_search
+from startpages import StartPagePool
 from typing import List, Optional, Tuple, Dict, Any
+from urllib.parse import urlparse
 
-# Load spacy model once at module level
-nlp = spacy.load("en_core_web_sm")
+# Batched MediaWiki API client used to fill the page cache
+client = MediaWikiClient()
 
-# create the database if it doesn't exist
-conn = sqlite3.connect("pages.db")
-cursor = conn.cursor()
-cursor.execute("CREATE TABLE IF NOT EXISTS pages (name TEXT, links TEXT)")
-conn.commit()
+# Cached pages older than this are refreshed in the background while the stale copy is used
+CACHE_TTL = 7 * 24 * 60 * 60
 
-def encode_text(text: str) -> Any:
-    """Encode text using spacy's sentence vectors"""
-    doc = nlp(text)
-    return doc.vector.reshape(1, -1)
+def _revalidate(page_name: str):
+    revalidator.submit(page_name)
 
-# Cache for embeddings to avoid recomputation
-embedding_cache = {}
+# Where the page cache lives; tests point this at a temporary directory
+CACHE_PATH = os.environ.get("WIKIBACON_CACHE", "pages.db")
 
-def get_cached_embedding(text: str) -> Any:
-    """Get embedding with caching to avoid recomputation."""
-    if text not in embedding_cache:
-        embedding_cache[text] = encode_text(text)
-    return embedding_cache[text]
+# Shared page cache: hot pages in memory, everything in SQLite. Pending writes are committed on exit
+store = cache.TieredPageCache(cache.PageStore(CACHE_PATH), memory_budget=64 * 1024 * 1024, ttl=CACHE_TTL, on_stale=_revalidate)
+atexit.register(store.flush)
+
+# Refreshes stale pages, downloading them again only when their revision id has changed.
+# Its requests share the API host's rate limit with the fetchers
+revalidator = cache.Revalidator(
+    store,
+    fetch_revisions=lambda page_names: _paced(client.fetch_revisions, page_names),
+    fetch_pages=lambda page_names: _paced(client.fetch_pages, page_names),
+)
+
+# Recently resolved pages, so repeat get_page calls for the same name skip the network
+page_cache = cache.LRUCache(256)
+
+# One resolution per title at a time: concurrent searches asking for the same page share it
+resolving = SingleFlight(key=normalize_title)
+
+# Names that found no page are not looked up again for this long
+NOT_FOUND_TTL = 24 * 60 * 60
+
+# Failures that say nothing about whether a page exists, so their names are not cached as missing
+TRANSIENT_ERRORS = (requests.RequestException, wikipedia.exceptions.HTTPTimeoutError)
 
 def get_page(page_name: str) -> Optional[wikipedia.WikipediaPage]:
     """Get a specific Wikipedia page by name. Before, it would default to the "Python" page if the page was not found"""
+    page = page_cache.get(page_name)
+    if page is None:
+        with tracing.phase("network"):
+            page = resolving.do(page_name, lambda: _lookup_page(page_name))
+        if page is not None:
+            page_cache.put(page_name, page)
+    return page
+
+def _lookup_page(page_name: str) -> Optional[wikipedia.WikipediaPage]:
+    """Resolve a name through the stored title table first, and record what the API finds."""
+    known = store.get_title(page_name)
+    if known is not None:
+        title, resolved_at = known
+        if title is None and time.time() - resolved_at < NOT_FOUND_TTL:
+            return None
+        if title is not None:
+            try:
+                return wikipedia.page(title, auto_suggest=False, redirect=False)
+            except TRANSIENT_ERRORS:
+                return None
+            except Exception:
+                pass  # The page has moved or gone since; resolve the name again
+
+    try:
+        page = _resolve_page(page_name)
+    except TRANSIENT_ERRORS:
+        return None
+    store.put_title(page_name, page.title if page is not None else None)
+    return page
+
+def _resolve_page(page_name: str) -> Optional[wikipedia.WikipediaPage]:
+    # One cheap query follows normalization and redirects, and rules out missing and disambiguation pages
+    try:
+        title = _paced(client.resolve_titles, [page_name]).get(page_name)
+    except requests.RequestException:
+        title = None
+    if title is not None:
+        try:
+            return wikipedia.page(title, auto_suggest=False, redirect=False)
+        except TRANSIENT_ERRORS:
+            raise
+        except Exception:
+            pass
+
     try:
         return wikipedia.page(page_name, auto_suggest=False, redirect=False)
     except wikipedia.exceptions.DisambiguationError as e:
         # Try the first option from disambiguation
         try:
             return wikipedia.page(e.options[0], auto_suggest=False, redirect=False)
+        except TRANSIENT_ERRORS:
+            raise
         except:
             pass
     except wikipedia.exceptions.PageError:
         pass
+    except TRANSIENT_ERRORS:
+        raise
     except Exception:
         pass
     
@@ -51,221 +123,261 @@ def get_page(page_name: str) -> Optional[wikipedia.WikipediaPage]:
             choice = search_results[0]
             page = wikipedia.page(choice, auto_suggest=False, redirect=False)
             return page
+    except TRANSIENT_ERRORS:
+        raise
     except Exception:
         pass
     
     # Return None instead of defaulting to Python page
     return None
 
-def get_page_links_with_cache(page_name: str, hard_mode: bool = False) -> List[str]:
-    conn = sqlite3.connect("pages.db")
-    cursor = conn.cursor()
-    cached_page = cursor.execute("SELECT * FROM pages WHERE name = ?", (page_name,)).fetchone()
-
-    if not cached_page:
-        page = get_page(page_name)
-        if page is None:
-            return []
-        links = page.links
-        categories = page.categories
-        cursor.execute("INSERT INTO pages (name, links) VALUES (?, ?)", (page_name, json.dumps(links + categories)))
-        conn.commit()
-        cached_page = cursor.execute("SELECT * FROM pages WHERE name = ?", (page_name,)).fetchone()
-
-    all_links = json.loads(cached_page[1])
-    
-    # In hard mode, only use direct page links, not categories
-    if hard_mode:
-        page = get_page(page_name)
-        if page is None:
-            return []
-        links = page.links
-        filtered = [link for link in links if is_regular_page(link)]
+def _uncached(page_names: List[str]) -> List[str]:
+    return [name for name in dict.fromkeys(page_names) if not store.is_cached(normalize_title(name))]
+
+def _fetch_and_store(page_names: List[str]) -> Dict[str, Optional[PageRecord]]:
+    """Fetch one batch of pages through the API client and write them to the page cache,
+    under the normalized titles the fetchers share requests by. Pages that do not exist
+    are stored with no edges, and evicted again once they go stale."""
+    try:
+        records = client.fetch_pages(page_names)
+    except requests.RequestException:
+        return {}
+    for name, record in records.items():
+        if record is None:
+            store.put(normalize_title(name), [], [])
+        else:
+            store.put(normalize_title(name), record.links, record.categories, record.revid)
+    return records
+
+def _fetch_and_store_backlinks(page_names: List[str]) -> Dict[str, Optional[List[str]]]:
+    """Fetch one batch of backlink lists and add them to the cache's reverse index."""
+    try:
+        backlinks = client.fetch_backlinks(page_names)
+    except requests.RequestException:
+        return {}
+    for name, sources in backlinks.items():
+        store.put_backlinks(normalize_title(name), sources or [])
+    return backlinks
+
+# Runs cache fills concurrently in the background, paced per API host. Titles are shared in
+# flight by their normalized form, so "river" and "River" are fetched once
+fetcher = AsyncFetcher(_fetch_and_store, host=urlparse(API_URL).netloc, key=normalize_title)
+backlink_fetcher = AsyncFetcher(_fetch_and_store_backlinks, host=urlparse(API_URL).netloc, key=normalize_title)
+
+def _paced(call, page_names: List[str]):
+    """Make one request outside the fetchers, in a slot from the API host's rate limiter."""
+    fetcher.limiter.wait()
+    return call(page_names)
+
+# Live pages from the API, for summaries and for filling the cache. Only get_page falls back to
+# searching; inside the graph a title with no page is a dead end, never another page's edges
+api = ApiBackend(client, limiter=fetcher.limiter)
+
+def prefetch_pages(page_names: List[str], wait: bool = True) -> int:
+    """Fill the page cache for many pages at once, 50 titles per API request.
+
+    With `wait=False` the fetch runs in the background and this returns immediately.
+    Returns the number of pages that were not cached yet.
+    """
+    missing = _uncached(page_names)
+    if not missing:
+        return 0
+    if wait:
+        fetcher.fetch(missing)
     else:
-        # In normal mode, use both links and filtered categories
-        filtered = [link for link in all_links if is_regular_page(link) and is_good_category(link)]
-    
-    if page_name in filtered:
-        filtered.remove(page_name)
-    return filtered
+        fetcher.prefetch(missing)
+    return len(missing)
 
-def is_regular_page(page_name: str) -> bool:
-    """Filter out meta pages and disambiguation pages"""
-    page_name_lower = page_name.lower()
-    
-    # Filter out disambiguation and meta pages
-    if any(term in page_name_lower for term in [
-        "disambiguation", "automatic", "article", "page", "identifier",
-        "short description", "wikidata", "template:", "user:", "talk:",
-        "file:", "category:", "help:", "portal:", "special:", "mediawiki:"
-    ]):
-        return False
-    
-    # Filter out pages with too many special characters or numbers
-    if len(page_name) < 2 or page_name.count("(") > 2 or page_name.count(")") > 2:
-        return False
-    
-    return True
+# Requests per second the dictionary resolver may take from the API host's budget, leaving the rest to searches
+TITLE_RESOLVE_RATE = 1.0
 
-def is_good_category(page_name: str) -> bool:
-    """Filter out meta categories that don't create meaningful thematic connections"""
-    page_name_lower = page_name.lower()
-    
-    # Filter out meta categories
-    bad_category_terms = [
-        "short description", "wikidata", "unsourced", "script error", "dead link",
-        "external link", "citation needed", "cleanup", "stub", "orphan",
-        "disambiguation", "redirect", "template", "user:", "talk:", "file:",
-        "category:", "help:", "portal:", "special:", "mediawiki:", "wikipedia:",
-        "articles with", "pages with", "all articles", "good articles",
-        "featured articles", "lists of", "outline of", "index of"
-    ]
-    
-    if any(term in page_name_lower for term in bad_category_terms):
-        return False
-    
-    # Keep categories that are likely to create meaningful connections
-    good_category_terms = [
-        "category:", "list of", "types of", "kinds of", "forms of",
-        "examples of", "species of", "genus", "family", "order", "class",
-        "phylum", "kingdom", "domain", "group", "set", "collection"
-    ]
-    
-    # If it's a category, it should contain one of the good terms
-    if page_name_lower.startswith("category:"):
-        return any(term in page_name_lower for term in good_category_terms)
-    
-    return True
+# Resolves dictionary words to article titles in bulk, one request at a time, paced with the other API traffic
+title_resolver = AsyncFetcher(lambda page_names: client.resolve_titles(page_names), host=urlparse(API_URL).netloc, max_concurrency=1, rate_limit=TITLE_RESOLVE_RATE)
 
-def _find_short_path(start_path: List[str], end_path: List[str], start_time: float = None, max_depth: int = 15, hard_mode: bool = False) -> Optional[List[str]]:
-    """Improved method to find a short path between two Wikipedia pages with timeout and better error handling."""
-    
-    if start_time is None:
-        start_time = time.time()
-    
-    # Timeout after 10 seconds
-    if time.time() - start_time > 10:
-        return None
-    
-    start_leaf = start_path[-1]
-    end_leaf = end_path[0]
+def _warm_start_pages(page_names: List[str]):
+    """Load start pages ahead of their round: their page objects, and their links for the search."""
+    prefetch_pages(page_names)
+    for page_name in page_names:
+        get_page(page_name)
+
+def start_page_pool(words: List[str], size: int = 16) -> StartPagePool:
+    """A pool of start pages drawn from `words`, with the word to title mapping kept in the page cache."""
+    return StartPagePool(words, title_resolver.fetch, store, warm=_warm_start_pages, size=size)
+
+# The default backend: the SQLite page cache, filled from the API. Both modes read the same stored edges
+cached = CacheBackend(store, api, fetcher=fetcher, backlink_fetcher=backlink_fetcher)
 
-    # Base cases: we've reached the end or exceeded depth
-    if len(start_path) + len(end_path) > max_depth:
+# Where path search reads the page graph from
+backend: GraphBackend = cached
+
+def use_backend(new_backend: Optional[GraphBackend]):
+    """Search through `new_backend` from now on (or the page cache again, with None)."""
+    global backend
+    backend = new_backend or cached
+
+def use_link_graph(path: Optional[str]):
+    """Answer pages in the offline link graph at `path` with no network at all (or stop, with None)."""
+    use_backend(LinkGraphBackend(LinkGraph(path), fallback=cached) if path else None)
+
+def estimate_path_length(start: str, end: str, hard_mode: bool = False) -> Optional[Tuple[float, Optional[int]]]:
+    """Instant bounds on the number of pages in the shortest path, from the backend's landmark tables.
+
+    Returns (lower, upper), where lower is infinity if there is no path at all and upper
+    is None if no landmark connects the pages, or None if the backend has no tables.
+    """
+    table = backend.landmarks(hard_mode)
+    if table is None:
         return None
+    lower, upper = table.estimate(start, end)
+    return lower + 1, None if upper is None else upper + 1
 
-    if start_leaf == end_leaf:
-        return start_path + end_path
-    
-    # Get links with error handling
-    try:
-        links = get_page_links_with_cache(start_leaf, hard_mode)
-        if not links:
-            return None
-            
-        if end_leaf in links:
-            return start_path + end_path
-        
-        # Get backlinks with error handling
-        backlinks = get_page_links_with_cache(end_leaf, hard_mode)
-        if not backlinks:
-            return None
-            
-        if start_leaf in backlinks:
-            return start_path + end_path
-        
-        # Check for intersection
-        intersection = list(set(links) & set(backlinks))
-        if len(intersection) > 0:
-            return start_path + [intersection[0]] + end_path
-        
-        # Try to find a path through common categories (only in normal mode)
-        if not hard_mode:
-            # Get categories for both pages
-            start_page = get_page(start_leaf)
-            end_page = get_page(end_leaf)
-            
-            if start_page and end_page:
-                start_categories = [cat for cat in start_page.categories if is_good_category(cat)]
-                end_categories = [cat for cat in end_page.categories if is_good_category(cat)]
-                
-                # Find common categories
-                common_categories = list(set(start_categories) & set(end_categories))
-                if common_categories:
-                    # Use the first common category as a bridge
-                    bridge_category = common_categories[0]
-                    return start_path + [bridge_category] + end_path
-        
-        # Use cached embeddings for better performance
-        end_leaf_page = get_page(end_leaf)
-        if end_leaf_page is None:
-            return None
-            
-        end_embedding = get_cached_embedding(end_leaf_page.summary)
-        
-        # Score links and take top candidates
-        scored_links = []
-        for link in links: 
-            try:
-                link_embedding = get_cached_embedding(link)
-                score = cosine_similarity(link_embedding, end_embedding)[0][0]
-                scored_links.append((link, score))
-            except Exception:
-                continue
-        
-        if not scored_links:
-            return None
-            
-        scored_links.sort(key=lambda x: x[1], reverse=True)
-        next_page = scored_links[0][0]
+# Forward exploration from recent start pages, by (backend, start, hard mode), so searches to new
+# targets resume it. Bounded by the pages held across every tree; each tree by SearchTree.max_nodes.
+# Paths found through it are still verified against the current edges before they are scored
+search_trees = cache.LRUCache(250_000, sizeof=len)
 
-        # Score backlinks
-        start_leaf_page = get_page(start_leaf)
-        if start_leaf_page is None:
-            return None
-            
-        start_embedding = get_cached_embedding(start_leaf_page.summary)
-        
-        scored_backlinks = []
-        for backlink in backlinks[:50]:  # Limit to top 50 backlinks
-            try:
-                backlink_embedding = get_cached_embedding(backlink)
-                score = cosine_similarity(backlink_embedding, start_embedding)[0][0]
-                scored_backlinks.append((backlink, score))
-            except Exception:
-                continue
-        
-        if not scored_backlinks:
-            return None
-            
-        scored_backlinks.sort(key=lambda x: x[1], reverse=True)
-        previous_page = scored_backlinks[0][0]
+def search_tree(start: str, hard_mode: bool = False, graph: Optional[GraphBackend] = None) -> SearchTree:
+    """The exploration tree kept for searches from `start`, made empty if there is none yet."""
+    # One step, so searches from one start running side by side always share a tree
+    return search_trees.setdefault((graph or backend, start, hard_mode), SearchTree(start, max_nodes=50_000))
 
-        return _find_short_path(start_path + [next_page], [previous_page] + end_path, start_time, max_depth, hard_mode)
-        
+def get_page_links_with_cache(page_name: str, hard_mode: bool = False) -> List[str]:
+    return backend.neighbours(page_name, hard_mode)
+
+def search_path(start: str, end: str, graph: Optional[GraphBackend] = None, hard_mode: bool = False, goals: Optional[Dict[str, str]] = None, max_depth: int = 15, max_expansions: int = 200, time_budget: float = 10.0, branching: int = 50, tree: Optional[SearchTree] = None) -> SearchResult:
+    """Search `graph` (the current backend by default) for a path from both ends at once.
+
+    Only the `branching` candidates closest to the goal are queued from each expansion.
+    Goal texts default to the backend's summaries of `start` and `end`.
+    With `tree`, the forward search resumes earlier searches from `start` (see SearchTree).
+    """
+    graph = graph or backend
+    goals = goals or {start: graph.summary(start), end: graph.summary(end)}
+
+    def neighbours(page_name: str) -> List[str]:
+        return graph.neighbours(page_name, hard_mode)
+
+    def reverse_neighbours(page_name: str) -> List[str]:
+        return graph.reverse_neighbours(page_name, hard_mode)
+
+    def rank(candidates: List[str], goal: str) -> List[Tuple[str, float]]:
+        return rank_candidates(candidates, goals[goal], top_k=branching)
+
+    table = graph.landmarks(hard_mode)
+
+    def bound(candidates: List[str], goal: str) -> List[float]:
+        with tracing.phase("landmarks"):
+            if goal == end:
+                return list(table.lower_bounds(candidates, [end]))
+            return list(table.lower_bounds([start], candidates))
+
+    return bidirectional_search(
+        start, end, neighbours, reverse_neighbours, rank=rank,
+        prefetch=graph.prefetch, reverse_prefetch=graph.prefetch_backlinks,
+        bound=bound if table is not None else None,
+        max_expansions=max_expansions, time_budget=time_budget, max_depth=max_depth, tree=tree,
+    )
+
+def _find_short_path(start_page: wikipedia.WikipediaPage, end_page: wikipedia.WikipediaPage, hard_mode: bool = False, graph: Optional[GraphBackend] = None, max_depth: int = 15, max_expansions: int = 200, time_budget: float = 10.0, branching: int = 50) -> Optional[List[str]]:
+    goals = {start_page.title: start_page.summary, end_page.title: end_page.summary}
+    tree = search_tree(start_page.title, hard_mode, graph)
+    try:
+        result = search_path(
+            start_page.title, end_page.title, graph, hard_mode=hard_mode, goals=goals,
+            max_depth=max_depth, max_expansions=max_expansions, time_budget=time_budget, branching=branching, tree=tree,
+        )
     except Exception as e:
         print(f"Error in path finding: {e}")
+        trace = tracing.current()
+        if trace is not None:
+            trace.event("error", error=repr(e))
+            trace.finish("error")
         return None
+    # The tree has grown, so measure it against the budget again
+    search_trees.resize((graph or backend, start_page.title, hard_mode))
+    trace = tracing.current()
+    if trace is not None:
+        trace.finish(result.reason, result.path)
+    return result.path
 
-def find_short_path(start_page: wikipedia.WikipediaPage, end_page: wikipedia.WikipediaPage, hard_mode: bool = False) -> List[str]:
-    """Find a short path between two Wikipedia pages with improved error handling."""
-    
-    
-    start_path = [start_page.title]
-    end_path = [end_page.title]
-
-    result = _find_short_path(start_path, end_path, hard_mode=hard_mode)
-    if result is None:
-        # Fallback: try to find a simple path through common topics
-        fallback_result = _try_fallback_path(start_page, end_page, hard_mode)
-        if fallback_result:
-            return fallback_result
-        return [f"No path found between {start_page.title} and {end_page.title}"]
-    
-    return result
+def verify_path(path: List[str], start: str, target: str, hard_mode: bool = False, graph: Optional[GraphBackend] = None) -> bool:
+    """Whether `path` runs from `start` to `target` and every hop in it is a real edge in this mode."""
+    if not path or path[0] != start or path[-1] != target:
+        return False
+    with tracing.phase("verification"):
+        return (graph or backend).verify_path(path, hard_mode)
+
+def find_short_path(start_page: wikipedia.WikipediaPage, end_page: wikipedia.WikipediaPage, hard_mode: bool = False, graph: Optional[GraphBackend] = None, trace: Optional[tracing.Trace] = None) -> List[str]:
+    """Find a short path between two Wikipedia pages with improved error handling.
+
+    With `trace`, the search's phase timings, counters and expansions are collected into it.
+    """
+    return find_verified_path(start_page, end_page, hard_mode, graph, trace)[0]
+
+def find_verified_path(start_page: wikipedia.WikipediaPage, end_page: wikipedia.WikipediaPage, hard_mode: bool = False, graph: Optional[GraphBackend] = None, trace: Optional[tracing.Trace] = None) -> Tuple[List[str], bool]:
+    """A path as find_short_path finds it, and whether every hop in it was verified as a real link.
+
+    Searches of the game's own backend remember verified paths in the page cache by start,
+    target and mode, and answer from there while the result is younger than CACHE_TTL.
+    """
+    remember = graph is None
+    with tracing.tracing(trace):
+        if remember:
+            stored = store.get_result(start_page.title, end_page.title, hard_mode)
+            if stored is not None and time.time() - stored[1] < CACHE_TTL:
+                tracing.count("result_cache_hits")
+                if trace is not None:
+                    trace.finish("cached", stored[0])
+                return stored[0], True
+
+        path = _find_short_path(start_page, end_page, hard_mode=hard_mode, graph=graph)
+        if path is None:
+            # Fallback: try to find a simple path through common topics
+            path = _try_fallback_path(start_page, end_page, hard_mode, graph)
+            if not path:
+                return [f"No path found between {start_page.title} and {end_page.title}"], False
+            if trace is not None:
+                trace.finish("fallback", path)
+
+        verified = verify_path(path, start_page.title, end_page.title, hard_mode, graph)
+        if verified and remember:
+            store.put_result(start_page.title, end_page.title, hard_mode, path)
+        elif not verified:
+            tracing.count("unverified_paths")
+        if trace is not None:
+            # Finish again, so the search's time includes its verification
+            trace.event("verification", verified=verified)
+            trace.finish(trace.reason, path)
+        return path, verified
+
+# Searches running at once across every caller; each round scores two pages, side by side
+SEARCH_WORKERS = int(os.environ.get("WIKIBACON_SEARCH_WORKERS", "32"))
+
+# Runs the searches for each round's pages side by side; they share the page cache and its in-flight fetches
+search_pool = ThreadPoolExecutor(max_workers=SEARCH_WORKERS, thread_name_prefix="path-search")
+
+def find_short_paths(start_page: wikipedia.WikipediaPage, end_pages: List[wikipedia.WikipediaPage], hard_mode: bool = False, graph: Optional[GraphBackend] = None, traces: Optional[List[tracing.Trace]] = None, verified: Optional[List[bool]] = None) -> List[List[str]]:
+    """Find paths from one start page to each of `end_pages` concurrently, in order.
+
+    The start page is expanded once up front, so every search finds its links already cached.
+    The searches run side by side, so each resumes the start page's search tree as it was
+    before the round; later rounds from the same start page resume what both found.
+    With `traces`, a trace for each search is appended to it, in the order of `end_pages`;
+    with `verified`, whether each path was verified (see find_verified_path), in the same order.
+    """
+    (graph or backend).neighbours(start_page.title, hard_mode)
+    searches = [tracing.Trace(start_page.title, end_page.title, hard_mode) if traces is not None else None for end_page in end_pages]
+    if traces is not None:
+        traces.extend(searches)
+    futures = [search_pool.submit(find_verified_path, start_page, end_page, hard_mode, graph, trace) for end_page, trace in zip(end_pages, searches)]
+    results = [future.result() for future in futures]
+    if verified is not None:
+        verified.extend(ok for _, ok in results)
+    return [path for path, _ in results]
 
-def _try_fallback_path(start_page: wikipedia.WikipediaPage, end_page: wikipedia.WikipediaPage, hard_mode: bool) -> Optional[List[str]]:
+def _try_fallback_path(start_page: wikipedia.WikipediaPage, end_page: wikipedia.WikipediaPage, hard_mode: bool, graph: Optional[GraphBackend] = None) -> Optional[List[str]]:
     """Fallback strategy to find a simple path when the main algorithm fails."""
+    graph = graph or backend
     try:
         # Try to find a path through common broad categories
         if not hard_mode:
@@ -277,8 +389,8 @@ def _try_fallback_path(start_page: wikipedia.WikipediaPage, end_page: wikipedia.
                 "Category:Entertainment", "Category:Business", "Category:Politics"
             ]
             
-            start_categories = [cat for cat in start_page.categories if any(broad in cat for broad in common_broad_categories)]
-            end_categories = [cat for cat in end_page.categories if any(broad in cat for broad in common_broad_categories)]
+            start_categories = [cat for cat in graph.categories(start_page.title) if any(broad in cat for broad in common_broad_categories)]
+            end_categories = [cat for cat in graph.categories(end_page.title) if any(broad in cat for broad in common_broad_categories)]
             
             # Find any common broad category
             common_broad = list(set(start_categories) & set(end_categories))
@@ -287,7 +399,7 @@ def _try_fallback_path(start_page: wikipedia.WikipediaPage, end_page: wikipedia.
         else:
             print("Hard mode: Trying to find meaningful connections without categories")
             # For hard mode, try to find meaningful connections through common topics
-            return _try_hard_mode_fallback(start_page, end_page)
+            return _try_hard_mode_fallback(start_page, end_page, graph)
         
         # If no common categories, try a simple 2-hop path through a common topic
         # This is a simplified approach that might work for many cases
@@ -296,9 +408,10 @@ def _try_fallback_path(start_page: wikipedia.WikipediaPage, end_page: wikipedia.
     except Exception:
         return None
 
-def _try_hard_mode_fallback(start_page: wikipedia.WikipediaPage, end_page: wikipedia.WikipediaPage) -> List[str]:
+def _try_hard_mode_fallback(start_page: wikipedia.WikipediaPage, end_page: wikipedia.WikipediaPage, graph: Optional[GraphBackend] = None) -> List[str]:
     """Find meaningful connections for hard mode without using categories."""
     print('Falling back given hard mode...')
+    graph = graph or backend
     try:
         # Strategy 1: Try to find a path through common high-level concepts
         common_concepts = [
@@ -308,8 +421,8 @@ def _try_hard_mode_fallback(start_page: wikipedia.WikipediaPage, end_page: wikip
         ]
         
         # Check if both pages link to any common concept
-        start_links = set(start_page.links)
-        end_links = set(end_page.links)
+        start_links = set(graph.links(start_page.title))
+        end_links = set(graph.links(end_page.title))
         
         for concept in common_concepts:
             if concept in start_links and concept in end_links: